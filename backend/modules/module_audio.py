@@ -18,56 +18,454 @@ KEY FUNCTIONS:
   align_audio_tracks(track1_path, track2_path, output1_path, output2_path) → tuple
     - Returns: (aligned_track1_path, aligned_track2_path)
     - Pads beginning of earlier track, ensures equal length
+    - Returns the input paths untouched when the lag is within one sample
     - Falls back gracefully if numpy/scipy unavailable
   
   mix_audio_tracks(track1_path, track2_path, output_path, volume1, volume2) → str | None
     - Returns: path to mixed output file
     - Applies volume scaling, adds signals, normalizes if clipping
 
+  align_and_mix_tracks(track1_path, track2_path, output_path, volume1, volume2) → str | None
+    - Returns: path to the mixed output file
+    - Same lag search as align_audio_tracks, then offset + weight + sum + peak
+      normalize in one pass over in-memory mono buffers; no aligned WAVs on disk
+
+  gcc_phat_lag(audio1, sr1, audio2, sr2, max_delay_seconds, analysis_rate, device) → tuple
+    - Returns: (delay_samples, delay_ms), same convention as calculate_audio_lag
+    - Whitened (PHAT) FFT cross-correlation of mono signals resampled to 8 kHz
+    - device="cuda" runs the FFTs in torch on the GPU (CPU fallback)
+
+  concat_audio_segments(segment_paths, output_path, overlap_seconds, expected_seconds) → str
+    - Returns: output_path once all segments are joined
+    - Streams PCM blocks of each segment into one output file (no ffmpeg)
+    - Crops overlap_seconds at each inner boundary (overlap-split segments)
+    - Raises ValueError for a segment whose length differs from expected_seconds
+
+  split_audio_segments(input_path, output_dir, segment_seconds) → list
+    - Returns: paths of part_000.wav, part_001.wav, ... in order
+    - Cuts at exact frame positions with a single sequential read (no ffmpeg);
+      one ffmpeg -f segment pass for inputs soundfile can't decode
+
+  iter_audio_segments(input_path, output_dir, segment_seconds, flac, overlap_seconds) → iterator
+    - Same split, yielding each segment path as soon as it is fully written
+    - flac=True writes fast-compressed FLAC segments (part_000.flac, ...)
+    - overlap_seconds adds context on each inner boundary (cropped by concat);
+      only for inputs where can_overlap_segments() is True
+
 ALGORITHM:
   1. Convert to mono envelopes (50ms window average)
-  2. FFT-based cross-correlation
+  2. Decimate envelopes 50x and run FFT-based cross-correlation (scipy.fft),
+     computing only the ±MAX_DELAY_SECONDS lag window
   3. Find peak in correlation window (±2 seconds)
   4. Validate peak strength (>2x mean correlation)
+  4b. Refine the peak at full rate with a narrow direct correlation
+  0. Fast path: if the first 10 s already correlate at lag ~0 (>0.99), use both tracks as-is
   5. Pad earlier track with zeros at beginning
   6. Ensure both tracks have equal length
 
 DEPENDENCIES:
   - numpy: Array operations, correlation
-  - scipy.signal: Resampling, correlation
+  - scipy.signal: Polyphase resampling (resample_poly), decimation
+  - scipy.fft: rfft/irfft cross-correlation
+  - pyfftw (optional): FFTW backend for scipy.fft with cached plans
+  - numba (optional): compiled lag refinement, GCC-PHAT whitening and fused align+mix, numpy otherwise
   - soundfile: Audio read/write
-  - module_ffmpeg: FFMPEG_EXE for fallback operations
+  - module_ffmpeg: FFMPEG_EXE for the segment-muxer split fallback (imported lazily)
+  - module_log: Colored console logger shared with the other pipeline modules
 """
+import math
+import os
+
 import numpy as np
+from scipy import fft as sp_fft
 from scipy import signal
 import soundfile as sf
-from colorama import Fore, Style
+from module_log import get_logger
+
+log = get_logger(__name__)
+
+# Optional: FFTW through its scipy.fft backend, with plans cached between calls.
+# Lag-detection inputs are capped at 120 s and padded to next_fast_len, so
+# repeated alignments in a batch mostly reuse the same transform sizes.
+try:
+    import pyfftw
+    import pyfftw.interfaces.scipy_fft
+    pyfftw.interfaces.cache.enable()
+    pyfftw.interfaces.cache.set_keepalive_time(300)
+    FFT_BACKEND = pyfftw.interfaces.scipy_fft
+except ImportError:
+    FFT_BACKEND = 'scipy'
+
+# Optional: compiled, SIMD-vectorized refinement of the lag estimate
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+# Frames per block when streaming segments through soundfile (~1.5s at 44.1kHz)
+STREAM_BLOCK_FRAMES = 1 << 16
+
+# A separated segment may differ from its source by this many frames (resampling rounding);
+# anything more means the model dropped audio and the join would drift out of sync
+SEGMENT_LENGTH_TOLERANCE_FRAMES = 32
+
+# Integer PCM subtypes are copied as integers so joins are bit-exact
+_BUFFER_DTYPES = {'PCM_16': 'int16', 'PCM_24': 'int32', 'PCM_32': 'int32'}
+
+# FLAC segments: integer subtypes FLAC can hold, and libsndfile's 0-1 compression scale.
+# The low end (about ffmpeg's level 1) encodes several times faster than the default and
+# still roughly halves a 16-bit WAV
+FLAC_SUBTYPES = frozenset({'PCM_S8', 'PCM_16', 'PCM_24'})
+FLAC_SEGMENT_COMPRESSION = 0.125
+
+# Largest offset between the two model outputs that alignment searches for
+MAX_DELAY_SECONDS = 2.0
+
+# Lags up to this many samples are treated as zero (no aligned copies are written)
+MAX_IGNORED_LAG_SAMPLES = 1
+
+# Fast path: if the first seconds of both tracks already line up (normalized
+# correlation peak within a few samples of zero), alignment is skipped entirely
+HEAD_CHECK_SECONDS = 10
+HEAD_CHECK_MAX_LAG = 10
+HEAD_CHECK_MIN_CORRELATION = 0.99
+
+# GCC-PHAT sync check: signals are correlated at this rate, and the peak must exceed
+# the mean absolute correlation by this factor to be trusted
+GCC_PHAT_RATE = 8000
+GCC_PHAT_MIN_PEAK_RATIO = 5.0
+
+# Envelopes are decimated by this factor for the coarse lag search,
+# then the peak is refined at full rate within +/- one decimation step
+LAG_DECIMATION_FACTOR = 50
+
+
+def concat_audio_segments(segment_paths, output_path, overlap_seconds=0.0, expected_seconds=None):
+    """
+    Joins audio segments into a single file by streaming their samples.
+    All segments come from the same source split, so the sample rate, channel
+    count and subtype of the first segment are used for the output header. Raw
+    buffers are copied as-is; a segment in another layout is converted through
+    float32 instead, and a sample rate or channel mismatch raises ValueError.
+    overlap_seconds undoes iter_audio_segments' overlap: that much is cropped from
+    each inner boundary (not the start of the first or the end of the last segment).
+    expected_seconds, if given, holds the length of each segment's source: a separated
+    segment that came back shorter or longer raises ValueError instead of shifting
+    every later segment.
+    """
+    with sf.SoundFile(segment_paths[0]) as first:
+        samplerate, channels, subtype = first.samplerate, first.channels, first.subtype
+
+    # Copy raw sample buffers in a dtype that holds the subtype losslessly
+    dtype = _BUFFER_DTYPES.get(subtype, 'float32')
+    margin = int(round(overlap_seconds * samplerate))
+    last = len(segment_paths) - 1
+    with sf.SoundFile(output_path, 'w', samplerate=samplerate, channels=channels, subtype=subtype) as writer:
+        for index, path in enumerate(segment_paths):
+            with sf.SoundFile(path) as reader:
+                if reader.samplerate != samplerate or reader.channels != channels:
+                    raise ValueError(f"Segment {path} is {reader.samplerate} Hz / {reader.channels} ch, "
+                                     f"expected {samplerate} Hz / {channels} ch")
+                if expected_seconds is not None:
+                    expected_frames = round(expected_seconds[index] * samplerate)
+                    if abs(reader.frames - expected_frames) > SEGMENT_LENGTH_TOLERANCE_FRAMES:
+                        raise ValueError(f"Segment {path} has {reader.frames} frames, "
+                                         f"expected {expected_frames} from its source")
+                head = margin if index > 0 else 0
+                tail = margin if index < last else 0
+                remaining = max(0, reader.frames - head - tail)
+                if head:
+                    reader.seek(head)
+                raw = reader.subtype == subtype
+                while remaining > 0:
+                    n = min(STREAM_BLOCK_FRAMES, remaining)
+                    if raw:
+                        buffer = reader.buffer_read(n, dtype=dtype)
+                        if not buffer:
+                            break
+                        writer.buffer_write(buffer, dtype=dtype)
+                        remaining -= n
+                    else:
+                        block = reader.read(n, dtype='float32', always_2d=True)
+                        if len(block) == 0:
+                            break
+                        writer.write(block)
+                        remaining -= len(block)
+    return output_path
+
+
+def can_overlap_segments(input_path):
+    """True if iter_audio_segments can cut input_path with overlap (soundfile reads it)."""
+    try:
+        sf.info(input_path)
+        return True
+    except sf.LibsndfileError:
+        return False
+
+
+def split_audio_segments(input_path, output_dir, segment_seconds, prefix="part"):
+    """
+    Splits an audio file into consecutive segments of segment_seconds each.
+    The source is read once, front to back, and each segment keeps the source's
+    sample rate, channel count and subtype. Inputs soundfile cannot decode are
+    split by a single ffmpeg segment-muxer pass instead.
+    """
+    return list(iter_audio_segments(input_path, output_dir, segment_seconds, prefix))
+
+
+def iter_audio_segments(input_path, output_dir, segment_seconds, prefix="part", flac=False, overlap_seconds=0.0):
+    """
+    Generator form of split_audio_segments: yields each segment path as soon as the
+    segment is completely written, so callers can start work on it while the next
+    one is cut. The ffmpeg fallback yields all paths after its single pass.
+    With flac=True the segments are fast-compressed FLAC instead of WAV (lossless,
+    roughly half the bytes to write and read back); float sources become 16-bit.
+    overlap_seconds extends every segment by that much context into its neighbours,
+    so a model's edge effects land in audio concat_audio_segments crops away again.
+    The ffmpeg fallback cuts without overlap; callers check can_overlap_segments()
+    first and join with overlap_seconds=0 when it is False.
+    """
+    try:
+        reader = sf.SoundFile(input_path)
+    except sf.LibsndfileError:
+        # libsndfile can't decode this container/codec
+        yield from _split_with_ffmpeg(input_path, output_dir, segment_seconds, prefix, flac)
+        return
+
+    with reader:
+        frames_per_segment = int(segment_seconds * reader.samplerate)
+        if flac:
+            ext = "flac"
+            subtype = reader.subtype if reader.subtype in FLAC_SUBTYPES else 'PCM_16'
+            writer_options = {'compression_level': FLAC_SEGMENT_COMPRESSION}
+        else:
+            ext = "wav"
+            subtype = reader.subtype
+            writer_options = {}
+        margin = int(round(overlap_seconds * reader.samplerate))
+        for segment_index, start in enumerate(range(0, reader.frames, frames_per_segment)):
+            segment_path = os.path.join(output_dir, f"{prefix}_{segment_index:03d}.{ext}")
+            end = min(start + frames_per_segment, reader.frames)
+            # Context on both sides, except before the first and after the last segment
+            first_frame = start - margin if start > 0 else 0
+            last_frame = end + margin if end < reader.frames else end
+            reader.seek(first_frame)
+            remaining = last_frame - first_frame
+            with sf.SoundFile(segment_path, 'w', samplerate=reader.samplerate,
+                              channels=reader.channels, subtype=subtype, **writer_options) as writer:
+                while remaining > 0:
+                    block = reader.read(min(STREAM_BLOCK_FRAMES, remaining), dtype='float32', always_2d=True)
+                    if len(block) == 0:
+                        break
+                    writer.write(block)
+                    remaining -= len(block)
+            yield segment_path
+
+
+def _split_with_ffmpeg(input_path, output_dir, segment_seconds, prefix, flac=False):
+    """Splits any ffmpeg-readable input into 16-bit WAV (or FLAC) segments with one segment-muxer run."""
+    import glob
+    import subprocess
+    from module_ffmpeg import FFMPEG_EXE
+    try:
+        from services.process_manager import tracked_run
+    except ImportError:
+        tracked_run = subprocess.run
+
+    ffmpeg_split_cmd = [
+        FFMPEG_EXE, "-y",
+        "-loglevel", "error",
+        "-i", input_path,
+        "-f", "segment",
+        "-segment_time", str(segment_seconds),
+        "-reset_timestamps", "1",
+    ]
+    if flac:
+        ffmpeg_split_cmd += ["-c:a", "flac", "-sample_fmt", "s16", "-compression_level", "1"]
+    else:
+        ffmpeg_split_cmd += ["-c:a", "pcm_s16le"]
+    ext = "flac" if flac else "wav"
+    ffmpeg_split_cmd.append(os.path.join(output_dir, f"{prefix}_%03d.{ext}"))
+    tracked_run(ffmpeg_split_cmd, check=True)
+    return sorted(glob.glob(os.path.join(output_dir, f"{prefix}_*.{ext}")))
+
+
+def _to_mono(audio):
+    """
+    Averages the channels of (frames, channels) audio into a preallocated float32
+    mono buffer, without the full-size temporary that audio.mean(axis=1) creates.
+    """
+    if audio.ndim == 1:
+        return audio
+    mono = np.empty(audio.shape[0], dtype=np.float32)
+    if audio.shape[1] == 2:
+        np.add(audio[:, 0], audio[:, 1], out=mono)
+        mono *= 0.5
+    else:
+        np.sum(audio, axis=1, out=mono)
+        mono /= audio.shape[1]
+    return mono
+
+
+def _resample(audio, sr_from, sr_to):
+    """
+    Resamples audio along the frame axis with a polyphase FIR (resample_poly).
+    Unlike FFT-based signal.resample, the cost does not depend on the prime
+    factors of the signal length.
+    """
+    g = math.gcd(sr_from, sr_to)
+    return signal.resample_poly(audio, sr_to // g, sr_from // g, axis=0, window=('kaiser', 5.0))
+
 
+def _windowed_cross_correlate(a, b, max_lag):
+    """
+    Cross-correlation of a and b via real FFTs, for lags in [-max_lag, max_lag] only
+    (clipped to the lags where the signals overlap). Returns (correlation, first_lag).
+    The transform length only needs to cover max(len) + max_lag to keep those lags
+    free of circular wrap-around, instead of the len(a) + len(b) - 1 of a full correlation.
+    """
+    lo = min(max_lag, len(b) - 1)
+    hi = min(max_lag, len(a) - 1)
+    # Pad to a 2/3/5-smooth length so the transform stays on the fast path
+    nfft = sp_fft.next_fast_len(max(len(a), len(b)) + max_lag, real=True)
+    with sp_fft.set_backend(FFT_BACKEND):
+        spec_a = sp_fft.rfft(a, n=nfft, workers=-1)
+        spec_b = sp_fft.rfft(b, n=nfft, workers=-1)
+        circular = sp_fft.irfft(spec_a * np.conj(spec_b), n=nfft, workers=-1)
+    # Circular layout is [lag 0, 1, ..., -2, -1]; take [-lo .. hi]
+    return np.concatenate((circular[nfft - lo:], circular[:hi + 1])), -lo
+
+
+def _find_correlation_peak(env1, env2, search_half_width):
+    """
+    Finds the lag (in samples of the given envelopes) of the strongest correlation
+    within +/- search_half_width. Returns (lag, is_reliable); the peak is considered
+    unreliable when it is not clearly above the mean correlation in the window.
+    """
+    windowed_corr, first_lag = _windowed_cross_correlate(env1, env2, search_half_width)
+    peak_idx_in_window = np.argmax(windowed_corr)
+    lag = first_lag + peak_idx_in_window
 
-def calculate_audio_lag(audio1, sr1, audio2, sr2, max_delay_seconds=2.0):
+    # Sanity check
+    corr_max = windowed_corr[peak_idx_in_window]
+    corr_mean = np.mean(np.abs(windowed_corr))
+    return int(lag), bool(corr_max >= 2.0 * corr_mean)
+
+
+if NUMBA_AVAILABLE:
+    @njit(fastmath=True, cache=True, parallel=True)
+    def _lag_scores_numba(env1, env2, first_lag, n_lags):
+        """Dot product of the overlapping parts of env1 and env2 for each of n_lags consecutive lags."""
+        len1, len2 = env1.shape[0], env2.shape[0]
+        scores = np.empty(n_lags, dtype=np.float64)
+        for j in prange(n_lags):
+            lag = first_lag + j
+            if lag >= 0:
+                overlap, off1, off2 = min(len1 - lag, len2), lag, 0
+            else:
+                overlap, off1, off2 = min(len1, len2 + lag), 0, -lag
+            if overlap <= 0:
+                scores[j] = -np.inf
+                continue
+            acc = 0.0
+            for i in range(overlap):
+                acc += env1[off1 + i] * env2[off2 + i]
+            scores[j] = acc
+        return scores
+
+
+if NUMBA_AVAILABLE:
+    @njit(fastmath=True, cache=True, parallel=True)
+    def _align_mix_numba(a, b, offset_a, offset_b, out_len, volume_a, volume_b):
+        """Places a and b at their offsets in an out_len buffer, weighted and summed in one pass."""
+        out = np.empty(out_len, dtype=np.float32)
+        len_a, len_b = a.shape[0], b.shape[0]
+        for i in prange(out_len):
+            acc = np.float32(0.0)
+            ia = i - offset_a
+            if ia >= 0 and ia < len_a:
+                acc += a[ia] * volume_a
+            ib = i - offset_b
+            if ib >= 0 and ib < len_b:
+                acc += b[ib] * volume_b
+            out[i] = acc
+        return out
+
+
+if NUMBA_AVAILABLE:
+    @njit(fastmath=True, cache=True, parallel=True)
+    def _phat_whiten_numba(cross):
+        """Scales each cross-spectrum bin to unit magnitude in place (the PHAT weighting)."""
+        for i in prange(cross.shape[0]):
+            re, im = cross[i].real, cross[i].imag
+            # One reciprocal and two multiplies instead of a complex division
+            inv = 1.0 / (math.sqrt(re * re + im * im) + 1e-12)
+            cross[i] = complex(re * inv, im * inv)
+
+
+def _align_mix(a, b, offset_a, offset_b, volume_a, volume_b):
+    """
+    Mixes mono buffers a and b with their first samples at offset_a / offset_b,
+    weighted by volume_a / volume_b. Returns a float32 buffer long enough for both.
+    """
+    out_len = max(offset_a + len(a), offset_b + len(b))
+    if NUMBA_AVAILABLE:
+        return _align_mix_numba(a, b, offset_a, offset_b, out_len,
+                                np.float32(volume_a), np.float32(volume_b))
+    out = np.zeros(out_len, dtype=np.float32)
+    out[offset_a:offset_a + len(a)] = a * np.float32(volume_a)
+    out[offset_b:offset_b + len(b)] += b * np.float32(volume_b)
+    return out
+
+
+def _refine_lag(env1, env2, center_lag, radius):
+    """
+    Direct cross-correlation of env1 against env2 for lags in
+    [center_lag - radius, center_lag + radius]; returns the best lag.
+    """
+    if NUMBA_AVAILABLE:
+        scores = _lag_scores_numba(env1, env2, center_lag - radius, 2 * radius + 1)
+        return center_lag - radius + int(np.argmax(scores))
+
+    len1, len2 = len(env1), len(env2)
+    best_lag, best_value = center_lag, -np.inf
+    for lag in range(center_lag - radius, center_lag + radius + 1):
+        if lag >= 0:
+            overlap = min(len1 - lag, len2)
+            value = np.dot(env1[lag:lag + overlap], env2[:overlap]) if overlap > 0 else -np.inf
+        else:
+            overlap = min(len1, len2 + lag)
+            value = np.dot(env1[:overlap], env2[-lag:-lag + overlap]) if overlap > 0 else -np.inf
+        if value > best_value:
+            best_lag, best_value = lag, value
+    return best_lag
+
+
+def calculate_audio_lag(audio1, sr1, audio2, sr2, max_delay_seconds=MAX_DELAY_SECONDS):
     """
     Calculates the lag between two audio signals.
     Positive result means audio1 is delayed relative to audio2 (audio2 starts earlier).
     """
+    # Single precision is plenty for locating a correlation peak and halves FFT bandwidth
+    audio1 = np.asarray(audio1, dtype=np.float32)
+    audio2 = np.asarray(audio2, dtype=np.float32)
+
     # Standardize sample rates for correlation
     if sr1 != sr2:
         if sr1 < sr2:
-            num = int(audio2.shape[0] * sr1 / sr2)
-            audio2 = signal.resample(audio2, num)
+            audio2 = _resample(audio2, sr2, sr1).astype(np.float32, copy=False)
             sr2 = sr1
         else:
-            num = int(audio1.shape[0] * sr2 / sr1)
-            audio1 = signal.resample(audio1, num)
+            audio1 = _resample(audio1, sr1, sr2).astype(np.float32, copy=False)
             sr1 = sr2
             
     # Prepare envelopes for more robust correlation
     def get_envelope(audio, sr):
-        if audio.ndim > 1:
-            audio = audio.mean(axis=1)
-        envelope = np.abs(audio)
+        envelope = np.abs(_to_mono(audio))
         win_size = int(sr * 0.05)
         if win_size > 1:
-            envelope = np.convolve(envelope, np.ones(win_size)/win_size, mode='same')
+            envelope = np.convolve(envelope, np.full(win_size, 1.0 / win_size, dtype=np.float32), mode='same')
         envelope = envelope - np.mean(envelope)
         std = np.std(envelope)
         if std > 0:
@@ -78,149 +476,219 @@ def calculate_audio_lag(audio1, sr1, audio2, sr2, max_delay_seconds=2.0):
     env1 = get_envelope(audio1[:limit_samples], sr1)
     env2 = get_envelope(audio2[:limit_samples], sr1)
 
-    correlation = signal.correlate(env1, env2, mode='full', method='fft')
-    center_idx = len(env2) - 1
-    
-    search_half_width = int(sr1 * max_delay_seconds)
-    search_start = max(0, center_idx - search_half_width)
-    search_end = min(len(correlation), center_idx + search_half_width + 1)
-    
-    windowed_corr = correlation[search_start:search_end]
-    peak_idx_in_window = np.argmax(windowed_corr)
-    peak_idx = search_start + peak_idx_in_window
-    
-    delay_samples = peak_idx - center_idx
-    
-    # Sanity check
-    corr_max = windowed_corr[peak_idx_in_window]
-    corr_mean = np.mean(np.abs(windowed_corr))
-    if corr_max < 2.0 * corr_mean:
-        return 0, 0
-        
+    q = LAG_DECIMATION_FACTOR
+    if q > 1 and min(len(env1), len(env2)) >= q * 32:
+        # Coarse pass: correlate the decimated envelopes (~q times less FFT work)
+        coarse_env1 = signal.decimate(env1, q, ftype='fir').astype(np.float32, copy=False)
+        coarse_env2 = signal.decimate(env2, q, ftype='fir').astype(np.float32, copy=False)
+        coarse_lag, is_reliable = _find_correlation_peak(coarse_env1, coarse_env2, int(sr1 * max_delay_seconds / q))
+        if not is_reliable:
+            return 0, 0
+        # Fine pass: direct correlation at full rate around the coarse estimate
+        delay_samples = _refine_lag(env1, env2, coarse_lag * q, q)
+    else:
+        delay_samples, is_reliable = _find_correlation_peak(env1, env2, int(sr1 * max_delay_seconds))
+        if not is_reliable:
+            return 0, 0
+
     delay_ms = (delay_samples / sr1) * 1000
     return delay_samples, delay_ms
 
+def _gcc_phat_circular_torch(x, y, nfft, device):
+    """
+    Whitened circular cross-correlation of x and y on a torch device (the GPU the
+    separators just used). Returns a float32 numpy array, or None if torch or the
+    device is unavailable so the caller falls back to the CPU path.
+    """
+    try:
+        import torch
+        u = torch.from_numpy(x).to(device)
+        v = torch.from_numpy(y).to(device)
+        cross = torch.fft.rfft(u, n=nfft) * torch.conj(torch.fft.rfft(v, n=nfft))
+        cross /= cross.abs() + 1e-12
+        return torch.fft.irfft(cross, n=nfft).cpu().numpy()
+    # AssertionError: torch builds without CUDA support
+    except (ImportError, RuntimeError, AssertionError):
+        return None
+
+
+def gcc_phat_lag(audio1, sr1, audio2, sr2, max_delay_seconds=1.0, analysis_rate=GCC_PHAT_RATE, device=None):
+    """
+    Lag between two signals by GCC-PHAT: both are downmixed to mono and resampled to
+    analysis_rate, and the cross-spectrum is whitened (U * conj(V) / |U * conj(V)|) so
+    the correlation collapses to a sharp peak regardless of level or spectral balance.
+    With device (e.g. "cuda") the FFTs run in torch there, falling back to the CPU.
+    Same convention as calculate_audio_lag: returns (delay_samples at sr1, delay_ms),
+    positive when audio1 is delayed; (0, 0) when the peak doesn't stand out.
+    """
+    x = _to_mono(np.asarray(audio1, dtype=np.float32))
+    y = _to_mono(np.asarray(audio2, dtype=np.float32))
+    if sr1 != analysis_rate:
+        x = _resample(x, sr1, analysis_rate).astype(np.float32, copy=False)
+    if sr2 != analysis_rate:
+        y = _resample(y, sr2, analysis_rate).astype(np.float32, copy=False)
+
+    max_lag = int(analysis_rate * max_delay_seconds)
+    lo = min(max_lag, len(y) - 1)
+    hi = min(max_lag, len(x) - 1)
+    if lo < 0 or hi < 0:
+        return 0, 0
+    nfft = sp_fft.next_fast_len(max(len(x), len(y)) + max_lag, real=True)
+    circular = _gcc_phat_circular_torch(x, y, nfft, device) if device is not None else None
+    if circular is None:
+        with sp_fft.set_backend(FFT_BACKEND):
+            cross = sp_fft.rfft(x, n=nfft, workers=-1) * np.conj(sp_fft.rfft(y, n=nfft, workers=-1))
+            if NUMBA_AVAILABLE:
+                _phat_whiten_numba(cross)
+            else:
+                cross /= np.abs(cross) + 1e-12
+            circular = sp_fft.irfft(cross, n=nfft, workers=-1)
+    # Circular layout is [lag 0, 1, ..., -2, -1]; take [-lo .. hi]
+    window = np.concatenate((circular[nfft - lo:], circular[:hi + 1]))
+
+    peak = int(np.argmax(window))
+    if window[peak] < GCC_PHAT_MIN_PEAK_RATIO * np.mean(np.abs(window)):
+        return 0, 0
+    delay_samples = int(round((peak - lo) * sr1 / analysis_rate))
+    return delay_samples, (delay_samples / sr1) * 1000
+
+
+def _read_mono(path, max_frames=None):
+    """
+    Reads up to max_frames of a file as float32 mono by streaming blocks into
+    one preallocated buffer, so the multi-channel signal is never held in full.
+    Returns (mono, samplerate).
+    """
+    with sf.SoundFile(path) as reader:
+        frames = reader.frames if max_frames is None else min(reader.frames, max_frames)
+        mono = np.empty(frames, dtype=np.float32)
+        pos = 0
+        while pos < frames:
+            block = reader.read(min(STREAM_BLOCK_FRAMES, frames - pos), dtype='float32', always_2d=True)
+            if len(block) == 0:
+                break
+            mono[pos:pos + len(block)] = _to_mono(block)
+            pos += len(block)
+        return mono[:pos], reader.samplerate
+
+
+def _write_at_offset(src_path, dst_path, offset, total_len):
+    """
+    Writes src_path to dst_path with its first sample at offset, zero-padded or cut to
+    exactly total_len frames. Samples are streamed block by block instead of loading the whole track.
+    """
+    with sf.SoundFile(src_path) as reader, \
+            sf.SoundFile(dst_path, 'w', samplerate=reader.samplerate, channels=reader.channels) as writer:
+        silence = np.zeros((STREAM_BLOCK_FRAMES, reader.channels), dtype=np.float32)
+        written = 0
+        while written < min(offset, total_len):
+            n = min(STREAM_BLOCK_FRAMES, offset - written, total_len - written)
+            writer.write(silence[:n])
+            written += n
+        for block in reader.blocks(blocksize=STREAM_BLOCK_FRAMES, dtype='float32', always_2d=True):
+            if written >= total_len:
+                break
+            block = block[:total_len - written]
+            writer.write(block)
+            written += len(block)
+        while written < total_len:
+            n = min(STREAM_BLOCK_FRAMES, total_len - written)
+            writer.write(silence[:n])
+            written += n
+
+
+def _heads_already_aligned(track1_path, track2_path):
+    """
+    Correlates the first HEAD_CHECK_SECONDS of both tracks over a few samples of lag.
+    True when the peak sits within HEAD_CHECK_MAX_LAG of zero with a normalized
+    correlation above HEAD_CHECK_MIN_CORRELATION.
+    """
+    sr1 = sf.info(track1_path).samplerate
+    sr2 = sf.info(track2_path).samplerate
+    if sr1 != sr2:
+        return False
+
+    head1, _ = _read_mono(track1_path, max_frames=HEAD_CHECK_SECONDS * sr1)
+    head2, _ = _read_mono(track2_path, max_frames=HEAD_CHECK_SECONDS * sr2)
+    energy = np.sqrt(np.dot(head1, head1) * np.dot(head2, head2))
+    if energy == 0:
+        return False
+
+    correlation, first_lag = _windowed_cross_correlate(head1, head2, HEAD_CHECK_MAX_LAG)
+    peak = int(np.argmax(correlation))
+    return abs(first_lag + peak) < HEAD_CHECK_MAX_LAG and correlation[peak] / energy > HEAD_CHECK_MIN_CORRELATION
+
+
+def _detect_track_lag(track1_path, sr1, track2_path, sr2):
+    """
+    Lag of track1 relative to track2 from their first 2 minutes, downmixed to mono
+    while streaming from disk. Returns (delay_samples, delay_ms) like calculate_audio_lag.
+    """
+    audio1_segment, _ = _read_mono(track1_path, max_frames=int(sr1 * 120))
+    audio2_segment, _ = _read_mono(track2_path, max_frames=int(sr2 * 120))
+    delay_samples, delay_ms = calculate_audio_lag(audio1_segment, sr1, audio2_segment, sr2)
+
+    if delay_ms == 0:
+        log.warning("Warning: Weak correlation or no delay detected.")
+    else:
+        log.info("Calculated audio delay: %.2f ms (%s samples)", delay_ms, delay_samples)
+    return delay_samples, delay_ms
+
+
 def align_audio_tracks(track1_path, track2_path, output_aligned_track1_path, output_aligned_track2_path):
     """
     Aligns two audio tracks using FFT-based cross-correlation.
     Pads the beginning of the track that starts earlier.
     Saves the aligned tracks to new paths.
 
-    Returns the paths to the aligned tracks, or None if alignment fails.
+    Returns the paths to the aligned tracks, or None if alignment fails. When the tracks
+    already line up (lag within MAX_IGNORED_LAG_SAMPLES) nothing is written and the
+    input paths are returned as they are.
     """
-    # Check for dependencies once at the start of the function
+    log.info("\nAttempting to align audio tracks using FFT cross-correlation...")
     try:
-        import numpy as np
-        from scipy import signal
-        import soundfile as sf
-        NUMPY_SCIPY_AVAILABLE = True
-    except ImportError:
-        NUMPY_SCIPY_AVAILABLE = False
+        # Fast path: tracks of the same source usually start together already
+        if _heads_already_aligned(track1_path, track2_path):
+            log.info("Track heads already match. Skipping alignment.")
+            return track1_path, track2_path
 
-    if not NUMPY_SCIPY_AVAILABLE:
-        print(f"{Fore.RED}Cannot align audio tracks: numpy, scipy, or soundfile not available.{Style.RESET_ALL}")
-        return track1_path, track2_path
-
-    print(f"\n{Fore.CYAN}Attempting to align audio tracks using FFT cross-correlation...{Style.RESET_ALL}")
-    try:
-        # Optimization: Read only the first 2 minutes for lag calculation
-        # We need the sample rate first
         info1 = sf.info(track1_path)
-        sr1 = info1.samplerate
         info2 = sf.info(track2_path)
-        sr2 = info2.samplerate
-
-        # Read only up to 120 seconds of frames
-        max_frames1 = int(sr1 * 120)
-        max_frames2 = int(sr2 * 120)
-        
-        audio1_segment, _ = sf.read(track1_path, frames=max_frames1)
-        audio2_segment, _ = sf.read(track2_path, frames=max_frames2)
+        delay_samples, delay_ms = _detect_track_lag(track1_path, info1.samplerate, track2_path, info2.samplerate)
 
-        delay_samples, delay_ms = calculate_audio_lag(audio1_segment, sr1, audio2_segment, sr2)
-        
-        if delay_ms == 0:
-            print(f"{Fore.YELLOW}Warning: Weak correlation or no delay detected.{Style.RESET_ALL}")
-        else:
-            print(f"{Fore.BLUE}Calculated audio delay: {delay_ms:.2f} ms ({delay_samples} samples){Style.RESET_ALL}")
+        # Both models separate the same input; a lag within one sample is below what
+        # padding can correct, so the inputs are used as they are
+        if abs(delay_samples) <= MAX_IGNORED_LAG_SAMPLES:
+            log.info("Tracks are already aligned. No padding needed.")
+            return track1_path, track2_path
 
-        # Now read the FULL audio only if we actually need to pad/align
-        audio1, _ = sf.read(track1_path)
-        audio2, _ = sf.read(track2_path)
-
-        aligned_audio1 = audio1
-        aligned_audio2 = audio2
+        # Place each track at its offset within the final length; tracks are streamed, never fully loaded
+        offset1 = max(0, -delay_samples)
+        offset2 = max(0, delay_samples)
+        final_len = max(offset1 + info1.frames, offset2 + info2.frames)
 
         if delay_samples > 0:
             # audio1 is delayed, so we pad audio2 at the beginning
-            print(f"{Fore.BLUE}Padding Track 2 by {delay_ms:.2f} ms at the beginning.{Style.RESET_ALL}")
-            # Pad beginning of audio2
-            if audio2.ndim > 1:
-                aligned_audio2 = np.pad(audio2, ((delay_samples, 0), (0, 0)), 'constant')
-            else:
-                aligned_audio2 = np.pad(audio2, (delay_samples, 0), 'constant')
-            
-            # Ensure both are same length at end
-            diff = len(aligned_audio2) - len(audio1)
-            if diff > 0:
-                if audio1.ndim > 1:
-                    aligned_audio1 = np.pad(audio1, ((0, diff), (0, 0)), 'constant')
-                else:
-                    aligned_audio1 = np.pad(audio1, (0, diff), 'constant')
-            elif diff < 0:
-                if audio2.ndim > 1:
-                    aligned_audio2 = np.pad(aligned_audio2, ((0, -diff), (0, 0)), 'constant')
-                else:
-                    aligned_audio2 = np.pad(aligned_audio2, (0, -diff), 'constant')
-
+            log.info("Padding Track 2 by %.2f ms at the beginning.", delay_ms)
         elif delay_samples < 0:
             # audio2 is delayed, so we pad audio1 at the beginning
-            print(f"{Fore.BLUE}Padding Track 1 by {-delay_ms:.2f} ms at the beginning.{Style.RESET_ALL}")
-            # Pad beginning of audio1
-            if audio1.ndim > 1:
-                aligned_audio1 = np.pad(audio1, ((-delay_samples, 0), (0, 0)), 'constant')
-            else:
-                aligned_audio1 = np.pad(audio1, (-delay_samples, 0), 'constant')
-            
-            # Ensure both are same length at end
-            diff = len(aligned_audio1) - len(audio2)
-            if diff > 0:
-                if audio2.ndim > 1:
-                    aligned_audio2 = np.pad(audio2, ((0, diff), (0, 0)), 'constant')
-                else:
-                    aligned_audio2 = np.pad(audio2, (0, diff), 'constant')
-            elif diff < 0:
-                if audio1.ndim > 1:
-                    aligned_audio1 = np.pad(aligned_audio1, ((0, -diff), (0, 0)), 'constant')
-                else:
-                    aligned_audio1 = np.pad(aligned_audio1, (0, -diff), 'constant')
+            log.info("Padding Track 1 by %.2f ms at the beginning.", -delay_ms)
         else:
-            print(f"{Fore.GREEN}Tracks are already aligned. No padding needed.{Style.RESET_ALL}")
-            len1 = len(audio1)
-            len2 = len(audio2)
-            max_len = max(len1, len2)
-            if audio1.ndim > 1:
-                aligned_audio1 = np.pad(audio1, ((0, max_len - len1), (0, 0)), 'constant')
-            else:
-                aligned_audio1 = np.pad(audio1, (0, max_len - len1), 'constant')
-            if audio2.ndim > 1:
-                aligned_audio2 = np.pad(audio2, ((0, max_len - len2), (0, 0)), 'constant')
-            else:
-                aligned_audio2 = np.pad(audio2, (0, max_len - len2), 'constant')
+            log.info("Tracks are already aligned. No padding needed.")
 
-        sf.write(output_aligned_track1_path, aligned_audio1, sr1)
-        sf.write(output_aligned_track2_path, aligned_audio2, sr2)
+        _write_at_offset(track1_path, output_aligned_track1_path, offset1, final_len)
+        _write_at_offset(track2_path, output_aligned_track2_path, offset2, final_len)
 
-        print(f"{Fore.GREEN}\N{check mark} Audio tracks aligned and saved.{Style.RESET_ALL}")
+        log.info("\N{check mark} Audio tracks aligned and saved.")
         return output_aligned_track1_path, output_aligned_track2_path
 
     except FileNotFoundError:
-        print(f"{Fore.RED}Error: One of the audio files for alignment was not found.{Style.RESET_ALL}")
+        log.error("Error: One of the audio files for alignment was not found.")
         return None, None
     except Exception as e:
         import traceback
         traceback.print_exc()
-        print(f"{Fore.RED}An error occurred during audio alignment: {e}{Style.RESET_ALL}")
+        log.error("An error occurred during audio alignment: %s", e)
         return None, None
 
 
@@ -238,19 +706,7 @@ def mix_audio_tracks(track1_path, track2_path, output_mixed_path, volume1=0.5, v
     Returns:
         Path to the mixed output file, or None if mixing fails
     """
-    try:
-        import numpy as np
-        from scipy import signal
-        import soundfile as sf
-        NUMPY_SCIPY_AVAILABLE = True
-    except ImportError:
-        NUMPY_SCIPY_AVAILABLE = False
-
-    if not NUMPY_SCIPY_AVAILABLE:
-        print(f"{Fore.RED}Cannot mix audio tracks: numpy, scipy, or soundfile not available.{Style.RESET_ALL}")
-        return None
-
-    print(f"\n{Fore.CYAN}Attempting to mix audio tracks...{Style.RESET_ALL}")
+    log.info("\nAttempting to mix audio tracks...")
     try:
         # Read both audio files
         audio1, sr1 = sf.read(track1_path)
@@ -258,20 +714,16 @@ def mix_audio_tracks(track1_path, track2_path, output_mixed_path, volume1=0.5, v
 
         # Ensure both files have the same sample rate
         if sr1 != sr2:
-            print(f"{Fore.YELLOW}Warning: Sample rates differ ({sr1} vs {sr2}). Resampling for mixing.{Style.RESET_ALL}")
+            log.warning("Warning: Sample rates differ (%s vs %s). Resampling for mixing.", sr1, sr2)
             if sr1 < sr2:
-                num = int(audio2.shape[0] * sr1 / sr2)
-                audio2 = signal.resample(audio2, num)
+                audio2 = _resample(audio2, sr2, sr1)
             elif sr2 < sr1:
-                num = int(audio1.shape[0] * sr2 / sr1)
-                audio1 = signal.resample(audio1, num)
+                audio1 = _resample(audio1, sr1, sr2)
                 sr1 = sr2
 
         # Handle stereo vs mono: convert to mono if needed
-        if audio1.ndim > 1:
-            audio1 = audio1.mean(axis=1)
-        if audio2.ndim > 1:
-            audio2 = audio2.mean(axis=1)
+        audio1 = _to_mono(audio1)
+        audio2 = _to_mono(audio2)
 
         # Adjust volumes
         audio1 = audio1 * volume1
@@ -293,17 +745,82 @@ def mix_audio_tracks(track1_path, track2_path, output_mixed_path, volume1=0.5, v
         max_amplitude = np.max(np.abs(mixed_audio))
         if max_amplitude > 1.0:
             mixed_audio = mixed_audio / max_amplitude
-            print(f"{Fore.YELLOW}Audio normalized to prevent clipping.{Style.RESET_ALL}")
+            log.warning("Audio normalized to prevent clipping.")
 
         # Write the mixed audio to file
         sf.write(output_mixed_path, mixed_audio, sr1)
 
-        print(f"{Fore.GREEN}\N{check mark} Audio tracks mixed successfully and saved to {output_mixed_path}.{Style.RESET_ALL}")
+        log.info("\N{check mark} Audio tracks mixed successfully and saved to %s.", output_mixed_path)
         return output_mixed_path
 
     except FileNotFoundError:
-        print(f"{Fore.RED}Error: One of the audio files for mixing was not found.{Style.RESET_ALL}")
+        log.error("Error: One of the audio files for mixing was not found.")
         return None
     except Exception as e:
-        print(f"{Fore.RED}An error occurred during audio mixing: {e}{Style.RESET_ALL}")
+        log.error("An error occurred during audio mixing: %s", e)
+        return None
+
+
+def align_and_mix_tracks(track1_path, track2_path, output_mixed_path, volume1=0.5, volume2=0.5):
+    """
+    Aligns and mixes two audio tracks in a single pass. Equivalent to align_audio_tracks
+    followed by mix_audio_tracks, but both tracks are read once into mono float32 buffers
+    and the offset, weighting and sum happen in one kernel, so the aligned intermediates
+    are never written to disk.
+
+    Tracks with different sample rates go through the two-step path instead.
+
+    Returns:
+        Path to the mixed output file, or None if alignment or mixing fails
+    """
+    log.info("\nAligning and mixing audio tracks...")
+    try:
+        sr1 = sf.info(track1_path).samplerate
+        sr2 = sf.info(track2_path).samplerate
+        if sr1 != sr2:
+            log.warning("Warning: Sample rates differ (%s vs %s). Aligning and mixing separately.", sr1, sr2)
+            root, ext = os.path.splitext(output_mixed_path)
+            aligned1, aligned2 = align_audio_tracks(track1_path, track2_path,
+                                                    f"{root}_aligned1{ext}", f"{root}_aligned2{ext}")
+            if not (aligned1 and aligned2):
+                return None
+            try:
+                return mix_audio_tracks(aligned1, aligned2, output_mixed_path, volume1, volume2)
+            finally:
+                for path in (aligned1, aligned2):
+                    if path not in (track1_path, track2_path) and os.path.exists(path):
+                        os.remove(path)
+
+        # Fast path: tracks of the same source usually start together already
+        if _heads_already_aligned(track1_path, track2_path):
+            log.info("Track heads already match. Skipping alignment.")
+            delay_samples = 0
+        else:
+            delay_samples, _ = _detect_track_lag(track1_path, sr1, track2_path, sr2)
+            if abs(delay_samples) <= MAX_IGNORED_LAG_SAMPLES:
+                delay_samples = 0
+
+        audio1, _ = _read_mono(track1_path)
+        audio2, _ = _read_mono(track2_path)
+        mixed_audio = _align_mix(audio1, audio2, max(0, -delay_samples), max(0, delay_samples), volume1, volume2)
+        del audio1, audio2
+
+        # Normalize to prevent clipping
+        max_amplitude = float(np.max(np.abs(mixed_audio))) if len(mixed_audio) else 0.0
+        if max_amplitude > 1.0:
+            mixed_audio /= max_amplitude
+            log.warning("Audio normalized to prevent clipping.")
+
+        sf.write(output_mixed_path, mixed_audio, sr1)
+
+        log.info("\N{check mark} Audio tracks aligned and mixed into %s.", output_mixed_path)
+        return output_mixed_path
+
+    except FileNotFoundError:
+        log.error("Error: One of the audio files for mixing was not found.")
+        return None
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        log.error("An error occurred during audio alignment and mixing: %s", e)
         return None
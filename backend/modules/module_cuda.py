@@ -8,6 +8,9 @@ KEY FUNCTIONS:
     - Returns True if torch.cuda.is_available()
     - Prints CUDA version, GPU name, and device count
     - Provides troubleshooting hints if CUDA not found
+    - Cached (lru_cache): devices are probed once per process, not once per file
+  get_free_vram_bytes() → int | None
+    - Free memory on the current CUDA device, None without CUDA
 
 OUTPUT:
   - Prints colored status messages (cyan/green/red/yellow)
@@ -20,13 +23,17 @@ DEPENDENCIES:
 NOTE:
   - Demucs and Spleeter run on CPU if CUDA unavailable (slower)
 """
+from functools import lru_cache
+
 import torch
 from colorama import Fore, Style
 
+@lru_cache(maxsize=1)
 def check_gpu_cuda_support():
     """
     Checks for PyTorch CUDA availability and prints GPU information.
     Returns True if CUDA is available, False otherwise.
+    The result is cached for the life of the process, so the report prints once.
     """
     # Apply cyan color for headers--
     print(f"\n{Fore.CYAN}2. Provjera GPU/CUDA podrške{Style.RESET_ALL}")
@@ -47,3 +54,16 @@ def check_gpu_cuda_support():
         print(f"{Fore.RED}An error occurred while checking for CUDA support: {e}{Style.RESET_ALL}")
         return False
 
+
+def get_free_vram_bytes():
+    """
+    Returns the free memory of the current CUDA device in bytes, or None if CUDA
+    is unavailable or the query fails. Not cached: other processes share the GPU.
+    """
+    try:
+        if not torch.cuda.is_available():
+            return None
+        free_bytes, _total_bytes = torch.cuda.mem_get_info()
+        return free_bytes
+    except Exception:
+        return None
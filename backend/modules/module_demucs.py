@@ -5,7 +5,7 @@ ROLE: Separates vocals using Facebook's Demucs (htdemucs model)
 
 RESPONSIBILITIES:
   - Runs Demucs source separation on audio files
-  - Splits audio >10min into 600s segments for parallel processing
+  - Splits long audio into segments sized to free VRAM (600s on CPU) for parallel processing
   - Handles OOM prevention via segmentation
   - Creates silence fallback on model failure
 
@@ -16,28 +16,48 @@ KEY FUNCTIONS:
     - max_workers: Parallel segment processing (default: 2)
 
 SEGMENTATION STRATEGY:
-  - Files ≤10min: Process directly
-  - Files >10min: Split into 600s chunks, process in parallel, concatenate
+  - Segment length from _pick_segment_duration(): free VRAM per worker
+    maps to 600s / 900s / 1800s / 2400s (600s without CUDA)
+  - Files ≤ segment length: Process directly
+  - Longer files: Split into segment-length chunks, process in parallel, concatenate
 
 OUTPUT:
   - Saves to demucs_out/htdemucs/<basename>/vocals.wav
   - Temp segments stored in _temp/ (caller responsible for cleanup)
 
 DEPENDENCIES:
-  - module_ffmpeg: get_audio_duration(), FFMPEG_EXE for splitting/concatenation
+  - module_ffmpeg: get_audio_duration(), FFMPEG_EXE for the silence fallback
+  - module_audio: split_audio_segments() / concat_audio_segments() for in-process split and join
+  - module_cuda: get_free_vram_bytes() to size batched passes
+  - module_log: Colored console logger shared with the other pipeline modules
+  - torch, demucs (optional in-process): model loaded once per worker thread
+  - soundfile: Reading segments and writing vocals for the in-process path
 
 MODEL:
   - Uses htdemucs (hybrid transformer Demucs)
-  - Command: python -m demucs.separate -n htdemucs -o <output> <input>
+  - In-process: demucs.pretrained.get_model + demucs.apply.apply_model,
+    each worker thread is pinned to one GPU (round-robin) and keeps its model
+    there (CPU without CUDA)
+  - Each worker thread queues its segments on its own CUDA stream
+  - GPU inference runs under float16 autocast (DEMUCS_USE_FP16)
+  - On a single GPU, segments run as batched forward passes sized to free VRAM
+    (DEMUCS_BATCH_SEGMENTS, DEMUCS_BATCH_VRAM_PER_SEGMENT_GIB); per-segment workers on OOM
+  - Fallback command: python -m demucs.separate -n htdemucs --segment 7 -o <output> <input>
 """
 import os
 import subprocess
 import sys
 import tempfile
 import shutil
-from colorama import Fore, Style
+import itertools
+import threading
+from functools import lru_cache
+import soundfile as sf
 from tqdm import tqdm
+from tqdm.contrib.logging import logging_redirect_tqdm
 from module_ffmpeg import get_audio_duration, FFMPEG_EXE
+from module_audio import concat_audio_segments, split_audio_segments
+from module_log import get_logger
 
 # Use tracked subprocess to prevent zombie processes on app exit
 try:
@@ -46,10 +66,261 @@ except ImportError:
     # Fallback if running standalone (e.g. from CLI main.py)
     tracked_run = subprocess.run
 
+__all__ = ["separate_with_demucs"]
+
+log = get_logger(__name__)
+
+DEMUCS_MODEL_NAME = "htdemucs"
+
+# Outer split length when CUDA is unavailable or VRAM is small
+DEFAULT_SEGMENT_DURATION_SECONDS = 600
+
+# Length of the CLI's internal overlapped chunks (--segment); htdemucs accepts at most 7.8s,
+# the transformer's training length, so long inputs are chunked by Demucs itself
+DEMUCS_CLI_SEGMENT_SECONDS = 7
+
+# (minimum free VRAM per worker in GiB, segment seconds), largest first
+VRAM_SEGMENT_TABLE = (
+    (20, 2400),
+    (10, 1800),
+    (6, 900),
+)
+
+# On a single GPU, run segments as batched forward passes (falls back to per-segment on OOM)
+DEMUCS_BATCH_SEGMENTS = True
+
+# Rough VRAM one batch row needs while apply_model has a chunk in flight (activations, fp16)
+DEMUCS_BATCH_VRAM_PER_SEGMENT_GIB = 1.5
+
+# Run GPU inference under float16 autocast (halves memory traffic, uses Tensor Cores); CPU stays float32
+DEMUCS_USE_FP16 = True
+
+# Each worker thread keeps its own loaded model so the weights are loaded once per worker
+_worker_state = threading.local()
+
+# Hands out GPUs to worker threads round-robin as they first run a segment
+_worker_device_counter = itertools.count()
+
+
+@lru_cache(maxsize=1)
+def _in_process_demucs_available():
+    """True if torch and demucs can be imported into this interpreter."""
+    try:
+        import torch  # noqa: F401
+        import demucs.apply  # noqa: F401
+        import demucs.audio  # noqa: F401
+        import demucs.pretrained  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def _worker_device():
+    """
+    Returns the device of the calling worker thread; CPU when CUDA is unavailable.
+    Threads are spread across GPUs round-robin on first use and then stay on theirs,
+    so a thread's cached model is never moved between GPUs.
+    """
+    device = getattr(_worker_state, "device", None)
+    if device is None:
+        import torch
+        n_gpus = torch.cuda.device_count() if torch.cuda.is_available() else 0
+        device = f"cuda:{next(_worker_device_counter) % n_gpus}" if n_gpus else "cpu"
+        _worker_state.device = device
+    return device
+
+
+def _pick_segment_duration(max_workers=1):
+    """
+    Chooses the outer split length from the free VRAM each parallel worker can use.
+    Longer segments mean fewer splits, model runs and joins; Demucs chunks internally either way.
+    """
+    try:
+        import torch
+        if not torch.cuda.is_available():
+            return DEFAULT_SEGMENT_DURATION_SECONDS
+        free_bytes, _ = torch.cuda.mem_get_info()
+    except (ImportError, RuntimeError):
+        return DEFAULT_SEGMENT_DURATION_SECONDS
+
+    free_gib_per_worker = free_bytes / (1024 ** 3) / max(1, max_workers)
+    for min_free_gib, seconds in VRAM_SEGMENT_TABLE:
+        if free_gib_per_worker >= min_free_gib:
+            return seconds
+    return DEFAULT_SEGMENT_DURATION_SECONDS
+
+
+def _get_worker_model():
+    """Returns the htdemucs model of the calling thread, loading it on first use."""
+    model = getattr(_worker_state, "model", None)
+    if model is None:
+        from demucs.pretrained import get_model
+        model = get_model(DEMUCS_MODEL_NAME)
+        model.eval()
+        _worker_state.model = model
+    return model
+
+
+def _get_worker_stream(device):
+    """Returns the calling thread's CUDA stream for device, so concurrent workers overlap on the GPU."""
+    import torch
+    streams = getattr(_worker_state, "streams", None)
+    if streams is None:
+        streams = _worker_state.streams = {}
+    if device not in streams:
+        streams[device] = torch.cuda.Stream(device=device)
+    return streams[device]
+
+
+def _load_mixture(path, model):
+    """Reads a WAV as a (channels, frames) tensor in the model's sample rate and channel layout."""
+    import torch
+    from demucs.audio import convert_audio
+
+    data, sr = sf.read(path, dtype='float32', always_2d=True)
+    return convert_audio(torch.from_numpy(data.T.copy()), sr, model.samplerate, model.audio_channels)
+
+
+def _normalize(wav):
+    """Normalizes a mixture by its mono mean/std like demucs.separate; returns (wav, (mean, std))."""
+    ref = wav.mean(0)
+    ref_mean, ref_std = ref.mean(), ref.std() + 1e-8
+    return (wav - ref_mean) / ref_std, (ref_mean, ref_std)
+
+
+def _infer_vocals(model, batch, device):
+    """Runs the model on a normalized (batch, channels, frames) tensor and returns the vocals stems."""
+    import torch
+    from demucs.apply import apply_model
+
+    use_fp16 = DEMUCS_USE_FP16 and device.startswith("cuda")
+    with torch.no_grad(), torch.autocast(device_type="cuda", dtype=torch.float16, enabled=use_fp16):
+        sources = apply_model(model, batch, device=device, split=True, overlap=0.25, progress=False)
+    return sources[:, model.sources.index("vocals")].float()
+
+
+def _run_on_worker_stream(model, batch, device):
+    """
+    Runs _infer_vocals on CPU tensors, returning CPU results. On CUDA the work is queued
+    on the worker's own stream, so concurrent workers' kernels can overlap on the GPU.
+    """
+    import torch
+
+    if not device.startswith("cuda"):
+        return _infer_vocals(model, batch, device)
+
+    stream = _get_worker_stream(device)
+    with torch.cuda.stream(stream):
+        # The mixture stays on the host: apply_model (split=True) moves one chunk at a time to
+        # the device and accumulates the full-length output next to the mixture, so VRAM use
+        # is bounded by the chunk size rather than the segment length
+        vocals = _infer_vocals(model, batch, device)
+    stream.synchronize()
+    return vocals
+
+
+def _save_vocals(vocals, stats, vocal_output_path, samplerate):
+    """De-normalizes a vocals stem, rescales it to avoid clipping and writes 16-bit WAV."""
+    ref_mean, ref_std = stats
+    vocals = vocals * ref_std + ref_mean
+    vocals = vocals / max(1.01 * vocals.abs().max().item(), 1)
+
+    os.makedirs(os.path.dirname(vocal_output_path), exist_ok=True)
+    sf.write(vocal_output_path, vocals.numpy().T, samplerate, subtype='PCM_16')
+
+
+def _separate_vocals_in_process(input_wav_path, vocal_output_path, device):
+    """
+    Separates vocals with the thread's cached model, mirroring demucs.separate:
+    input is normalized by the mixture statistics, and the output is rescaled to avoid clipping.
+    """
+    model = _get_worker_model()
+    wav, stats = _normalize(_load_mixture(input_wav_path, model))
+    vocals = _run_on_worker_stream(model, wav[None], device)[0]
+    _save_vocals(vocals, stats, vocal_output_path, model.samplerate)
+
+
+def _can_batch_segments():
+    """Batching needs the in-process model and exactly one GPU (with several GPUs each worker thread has its own)."""
+    if not (DEMUCS_BATCH_SEGMENTS and _in_process_demucs_available()):
+        return False
+    import torch
+    return torch.cuda.is_available() and torch.cuda.device_count() == 1
+
+
+def _pick_batch_size(n_segments):
+    """How many segments fit in one batched pass given the GPU's free VRAM (at least 1)."""
+    try:
+        from module_cuda import get_free_vram_bytes
+        free_bytes = get_free_vram_bytes()
+    except ImportError:
+        return 1
+    if free_bytes is None:
+        return 1
+    fits = int(free_bytes / (1024 ** 3) // DEMUCS_BATCH_VRAM_PER_SEGMENT_GIB)
+    return max(1, min(n_segments, fits))
+
+
+def _separate_batch_in_process(segment_paths, vocal_output_paths, device):
+    """
+    Separates several segments with one batched model call. Each segment is normalized
+    on its own; shorter segments are zero-padded to the longest and trimmed afterwards.
+    Raises RuntimeError (e.g. CUDA out of memory) so the caller can fall back to per-segment runs.
+    """
+    import torch
+
+    model = _get_worker_model()
+    normalized = [_normalize(_load_mixture(path, model)) for path in segment_paths]
+    lengths = [wav.shape[-1] for wav, _ in normalized]
+
+    batch = torch.zeros(len(normalized), model.audio_channels, max(lengths))
+    for row, (wav, _) in zip(batch, normalized):
+        row[:, :wav.shape[-1]] = wav
+
+    vocals_batch = _run_on_worker_stream(model, batch, device)
+    for vocals, length, (_, stats), vocal_output_path in zip(vocals_batch, lengths, normalized, vocal_output_paths):
+        _save_vocals(vocals[:, :length], stats, vocal_output_path, model.samplerate)
+
+
+def _is_gpu_retryable(error):
+    """True for CUDA out-of-memory and fp16 autocast failures, which a float32 CPU run avoids."""
+    import torch
+    if isinstance(error, torch.cuda.OutOfMemoryError):
+        return True
+    message = str(error).lower()
+    return "out of memory" in message or "half" in message or "autocast" in message
+
+
+def _run_demucs(input_wav_path, demucs_base_out_path, vocal_output_path):
+    """
+    Runs htdemucs on one file, writing <demucs_base_out_path>/htdemucs/<name>/vocals.wav.
+    Uses the in-process model when available, else the demucs.separate CLI. A GPU run
+    that hits OOM or an fp16 error is retried once on the CPU in float32; any other
+    RuntimeError propagates.
+    """
+    if _in_process_demucs_available():
+        device = _worker_device()
+        try:
+            _separate_vocals_in_process(input_wav_path, vocal_output_path, device)
+        except RuntimeError as e:
+            if device == "cpu" or not _is_gpu_retryable(e):
+                raise
+            import torch
+            torch.cuda.empty_cache()
+            log.warning("Demucs failed on %s (%s). Retrying on CPU in float32.", device, e)
+            _separate_vocals_in_process(input_wav_path, vocal_output_path, "cpu")
+        return
+
+    demucs_cmd = [sys.executable, "-m", "demucs.separate", "-n", DEMUCS_MODEL_NAME,
+                  "--segment", str(DEMUCS_CLI_SEGMENT_SECONDS), "-o", demucs_base_out_path, input_wav_path]
+    # Progress output is not needed; keep only stderr (raw bytes) for CalledProcessError diagnostics
+    tracked_run(demucs_cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+
+
 def separate_with_demucs(temp_audio_wav_path, demucs_base_out_path, base_audio_name_no_ext, max_workers=2):
     """
     Separates vocals using Demucs (htdemucs model).
-    If audio is > 10 min, it splits the file into segments, processes them in parallel, and joins them back.
+    If audio is longer than the VRAM-dependent segment length, it splits the file into segments, processes them in parallel, and joins them back.
     
     Args:
         temp_audio_wav_path: Path to the source WAV file.
@@ -60,8 +331,8 @@ def separate_with_demucs(temp_audio_wav_path, demucs_base_out_path, base_audio_n
     Returns:
         tuple: (path_to_final_vocal_wav, temp_segments_dir)
     """
-    print(f"\n{Fore.CYAN}3. Separating with Demucs (htdemucs model) into: {demucs_base_out_path}...{Style.RESET_ALL}")
-    print(f"{Fore.CYAN}Using up to {max_workers} parallel workers for Demucs segments.{Style.RESET_ALL}")
+    log.info("\n3. Separating with Demucs (htdemucs model) into: %s...", demucs_base_out_path)
+    log.info("Using up to %s parallel workers for Demucs segments.", max_workers)
     
     from concurrent.futures import ThreadPoolExecutor, as_completed
     
@@ -72,58 +343,40 @@ def separate_with_demucs(temp_audio_wav_path, demucs_base_out_path, base_audio_n
 
         audio_duration = get_audio_duration(temp_audio_wav_path)
         if audio_duration is None:
-            print(f"{Fore.RED}Failed to get audio duration, cannot proceed with Demucs separation.{Style.RESET_ALL}")
+            log.error("Failed to get audio duration, cannot proceed with Demucs separation.")
             return None, None
 
-        DEMUCS_SEGMENT_DURATION_SECONDS = 600  # 10 minutes per segment for GPU efficiency
+        segment_duration_seconds = _pick_segment_duration(max_workers)
 
-        if audio_duration > DEMUCS_SEGMENT_DURATION_SECONDS:
-            print(f"\n{Fore.YELLOW}Audio duration ({audio_duration:.2f}s) exceeds 10 minutes. Splitting audio for parallel Demucs...{Style.RESET_ALL}\n")
+        if audio_duration > segment_duration_seconds:
+            log.warning("\nAudio duration (%.2fs) exceeds %ss segments. Splitting audio for parallel Demucs...\n", audio_duration, segment_duration_seconds)
             # Ensure _temp exists
             os.makedirs("_temp", exist_ok=True)
             temp_demucs_segments_dir = tempfile.mkdtemp(dir="_temp")
-            split_audio_paths = []
-
-            current_start_time = 0
-            segment_index = 0
+            split_audio_paths = split_audio_segments(temp_audio_wav_path, temp_demucs_segments_dir, segment_duration_seconds)
 
-            while current_start_time < audio_duration:
-                segment_duration = min(DEMUCS_SEGMENT_DURATION_SECONDS, audio_duration - current_start_time)
-                segment_filename = f"part_{segment_index:03d}.wav"
-                segment_output_path = os.path.join(temp_demucs_segments_dir, segment_filename)
+            log.info("\n\N{check mark} Audio splitted into %s segments for Demucs.", len(split_audio_paths))
 
-                ffmpeg_split_cmd = [
-                    FFMPEG_EXE, "-y", 
-                    "-loglevel", "error",
-                    "-i", temp_audio_wav_path,
-                    "-ss", str(current_start_time),
-                    "-t", str(segment_duration),
-                    segment_output_path
-                ]
-                print(f"- Splitting audio: {segment_filename} from {current_start_time:.2f}s for {segment_duration:.2f}s...")
-                tracked_run(ffmpeg_split_cmd, check=True)
-                split_audio_paths.append(segment_output_path)
-
-                current_start_time += segment_duration
-                segment_index += 1
+            def vocal_path_for(segment_path):
+                segment_base_name = os.path.splitext(os.path.basename(segment_path))[0]
+                return os.path.join(demucs_base_out_path, "htdemucs", segment_base_name, "vocals.wav")
 
-            print(f"\n{Fore.GREEN}\N{check mark} Audio splitted into {len(split_audio_paths)} segments for Demucs.{Style.RESET_ALL}")
+            def is_done(vocal_path):
+                return os.path.exists(vocal_path) and os.path.getsize(vocal_path) > 0
 
             def process_segment(item):
                 i, segment_path = item
                 segment_base_name = os.path.splitext(os.path.basename(segment_path))[0]
-                segment_vocal_path = os.path.join(demucs_base_out_path, "htdemucs", segment_base_name, "vocals.wav")
+                segment_vocal_path = vocal_path_for(segment_path)
                 
-                # Check if it already exists (maybe from a previous partial run?)
-                if os.path.exists(segment_vocal_path) and os.path.getsize(segment_vocal_path) > 0:
+                # Check if it already exists (maybe from a previous partial run or the batched pass)
+                if is_done(segment_vocal_path):
                     return i, segment_vocal_path
                 
-                demucs_cmd = [sys.executable, "-m", "demucs.separate", "-n", "htdemucs", "-o", demucs_base_out_path, segment_path]
-                
                 try:
-                    tracked_run(demucs_cmd, check=True, capture_output=True, text=True, encoding='utf-8', errors='replace')
-                except subprocess.CalledProcessError as e:
-                    tqdm.write(f"{Fore.YELLOW}Warning: Demucs failed for segment {segment_base_name}. Creating silence.{Style.RESET_ALL}")
+                    _run_demucs(segment_path, demucs_base_out_path, segment_vocal_path)
+                except subprocess.CalledProcessError:
+                    log.warning("Warning: Demucs failed for segment %s. Creating silence.", segment_base_name)
                     # Create silence fallback
                     os.makedirs(os.path.dirname(segment_vocal_path), exist_ok=True)
                     silence_cmd = [FFMPEG_EXE, "-y", "-loglevel", "error", "-i", segment_path, "-af", "volume=0", segment_vocal_path]
@@ -136,13 +389,31 @@ def separate_with_demucs(temp_audio_wav_path, demucs_base_out_path, base_audio_n
                     return i, segment_vocal_path
                 return i, None
 
-            # Execute in parallel
+            # Single GPU: run missing segments in batches sized to free VRAM first
+            batch_paths = [p for p in split_audio_paths if not is_done(vocal_path_for(p))]
+            batch_size = _pick_batch_size(len(batch_paths)) if len(batch_paths) > 1 and _can_batch_segments() else 1
+            if batch_size > 1:
+                log.info("Running %s Demucs segments in batches of %s on the GPU...", len(batch_paths), batch_size)
+                for start in range(0, len(batch_paths), batch_size):
+                    group = batch_paths[start:start + batch_size]
+                    try:
+                        _separate_batch_in_process(group, [vocal_path_for(p) for p in group], _worker_device())
+                    except RuntimeError as e:
+                        import torch
+                        # Release the failed batch's cached blocks before the per-segment runs
+                        torch.cuda.empty_cache()
+                        log.warning("Batched Demucs failed (%s). Falling back to per-segment processing.", e)
+                        break
+
+            # Execute in parallel (segments finished by the batch return immediately)
             results = [None] * len(split_audio_paths)
             with ThreadPoolExecutor(max_workers=max_workers) as executor:
                 # Map segments to worker tasks
                 futures = {executor.submit(process_segment, (i, path)): i for i, path in enumerate(split_audio_paths)}
                 
-                with tqdm(total=len(split_audio_paths), desc="Demucs Parallel", unit="seg") as pbar:
+                # Warnings from the workers are written above the bar instead of through it
+                with logging_redirect_tqdm(loggers=[log]), \
+                        tqdm(total=len(split_audio_paths), desc="Demucs Parallel", unit="seg") as pbar:
                     for future in as_completed(futures):
                         idx, vocal_path = future.result()
                         results[idx] = vocal_path
@@ -151,61 +422,42 @@ def separate_with_demucs(temp_audio_wav_path, demucs_base_out_path, base_audio_n
             demucs_segment_vocal_paths = [r for r in results if r is not None]
 
             if not demucs_segment_vocal_paths:
-                print(f"{Fore.RED}Error: No Demucs vocal segments were successfully generated.{Style.RESET_ALL}")
+                log.error("Error: No Demucs vocal segments were successfully generated.")
                 return None, temp_demucs_segments_dir
             else:
-                # Joining segments...
-                concat_list_path = os.path.join(temp_demucs_segments_dir, "concat_list.txt")
-                with open(concat_list_path, "w") as f:
-                    for p in demucs_segment_vocal_paths:
-                        f.write(f"file '{os.path.abspath(p)}'\n")
-
+                # Joining segments (streamed in-process, all segments share the htdemucs output format)
                 final_demucs_vocals_temp_path = os.path.join(temp_demucs_segments_dir, "concatenated_demucs_vocals.wav")
-                
-                ffmpeg_concat_cmd = [
-                    FFMPEG_EXE, "-y", 
-                    "-loglevel", "error",
-                    "-f", "concat",
-                    "-safe", "0",
-                    "-i", concat_list_path,
-                    "-c", "copy",
-                    final_demucs_vocals_temp_path
-                ]
-                print(f"\nJoining Demucs vocal segments to: {final_demucs_vocals_temp_path}")
-                tracked_run(ffmpeg_concat_cmd, check=True)
+                log.info("\nJoining Demucs vocal segments to: %s", final_demucs_vocals_temp_path)
+                concat_audio_segments(demucs_segment_vocal_paths, final_demucs_vocals_temp_path)
                 demucs_vocal_wav_path = final_demucs_vocals_temp_path
-                print(f"\n{Fore.GREEN}\N{check mark} All Demucs vocal segments joined successfully.{Style.RESET_ALL}")
+                log.info("\n\N{check mark} All Demucs vocal segments joined successfully.")
         else:
             # Short file, just run directly
-            demucs_cmd = [
-                sys.executable, "-m", "demucs.separate",
-                "-n", "htdemucs",
-                "-o", demucs_base_out_path,
-                temp_audio_wav_path
-            ]
-            print(f"{Fore.MAGENTA}Executing: {' '.join(demucs_cmd)}\n{Style.RESET_ALL}")
+            demucs_vocal_wav_path = os.path.join(demucs_base_out_path, "htdemucs", base_audio_name_no_ext, "vocals.wav")
+            if _in_process_demucs_available():
+                log.info("Running %s in-process on %s\n", DEMUCS_MODEL_NAME, temp_audio_wav_path)
+            else:
+                log.debug("Executing: %s -m demucs.separate -n %s --segment %s -o %s %s\n", sys.executable, DEMUCS_MODEL_NAME, DEMUCS_CLI_SEGMENT_SECONDS, demucs_base_out_path, temp_audio_wav_path)
             try: 
-                tracked_run(demucs_cmd, check=True, capture_output=True, text=True, encoding='utf-8', errors='replace')
-                demucs_vocal_wav_path = os.path.join(demucs_base_out_path, "htdemucs", base_audio_name_no_ext, "vocals.wav")
-            except subprocess.CalledProcessError as e:
-                print(f"{Fore.RED}Demucs failed for short audio or no music inside. Creating silence fallback.{Style.RESET_ALL}")
-                demucs_vocal_wav_path = os.path.join(demucs_base_out_path, "htdemucs", base_audio_name_no_ext, "vocals.wav")
+                _run_demucs(temp_audio_wav_path, demucs_base_out_path, demucs_vocal_wav_path)
+            except subprocess.CalledProcessError:
+                log.error("Demucs failed for short audio or no music inside. Creating silence fallback.")
                 os.makedirs(os.path.dirname(demucs_vocal_wav_path), exist_ok=True)
                 silence_cmd = [FFMPEG_EXE, "-y", "-loglevel", "error", "-i", temp_audio_wav_path, "-af", "volume=0", demucs_vocal_wav_path]
                 tracked_run(silence_cmd, check=True)
 
-            print(f"\n{Fore.GREEN}\N{check mark} Demucs separation complete.\n{Style.RESET_ALL}")
+            log.info("\n\N{check mark} Demucs separation complete.\n")
 
         if not os.path.exists(demucs_vocal_wav_path) or os.path.getsize(demucs_vocal_wav_path) == 0:
-            print(f"{Fore.YELLOW}Warning: Demucs vocals not found or empty at {demucs_vocal_wav_path}.{Style.RESET_ALL}")
+            log.warning("Warning: Demucs vocals not found or empty at %s.", demucs_vocal_wav_path)
             return None, temp_demucs_segments_dir
 
     except subprocess.CalledProcessError as e:
-        print(f"{Fore.RED}Error with demucs separation: {e}{Style.RESET_ALL}")
+        log.error("Error with demucs separation: %s", e)
         # If there's a CalledProcessError, return None to indicate failure but allow process to continue
         return None, temp_demucs_segments_dir
     except Exception as e:
-        print(f"{Fore.RED}Unexpected error with demucs separation: {e}{Style.RESET_ALL}")
+        log.error("Unexpected error with demucs separation: %s", e)
         # For other exceptions (like AssertionError from silence), return None to allow process to continue
         return None, temp_demucs_segments_dir
     
@@ -10,8 +10,17 @@ KEY FUNCTIONS:
     - Requires Deno installed on system
   
   deno_eval(code) → str
-    - Returns: JavaScript evaluation result or error message
-    - Runs: deno eval "<code>"
+    - Returns: console output of the snippet or error message
+    - Sent to a persistent DenoWorker (one V8 startup per process);
+      falls back to a one-shot deno eval "<code>" if the worker is unusable
+
+  DenoWorker
+    - Long-lived `deno eval <REPL>` process, JSON lines over stdin/stdout
+    - Request {"id", "code"} -> reply {"id", "ok", "output"|"error"}
+    - Snippets are evaluated as scripts (indirect eval): code that fails to
+      parse as one (import, top-level await) goes through the one-shot path
+    - Started through process_manager.tracked_popen; a snippet that runs
+      longer than DENO_EVAL_TIMEOUT_SECONDS is abandoned and the worker killed
 
 USE CASES:
   - Running frontend build scripts
@@ -25,22 +34,38 @@ DEPENDENCIES:
 FLAGS:
   -A: Allow all permissions (network, read, write, etc.)
 """
+import atexit
+import json
+import queue
 import subprocess
+import threading
+from functools import lru_cache
 
 try:
-    from services.process_manager import tracked_run
+    from services.process_manager import tracked_popen, tracked_run
 except ImportError:
+    tracked_popen = subprocess.Popen
     tracked_run = subprocess.run
 
+# A snippet that hasn't settled after this long is abandoned and its worker killed
+DENO_EVAL_TIMEOUT_SECONDS = 30
+
+@lru_cache(maxsize=1)
+def _deno_available():
+    """Checks once per process whether the deno executable can be run."""
+    try:
+        tracked_run(["deno", "--version"], capture_output=True, check=True)
+        return True
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return False
+
 def run_deno_script(script_path: str, args: list = None):
     """Executes a Deno script and returns the output ✨."""
     if args is None:
         args = []
     
-    # Check if deno is installed
-    try:
-        tracked_run(["deno", "--version"], capture_output=True, check=True)
-    except (subprocess.CalledProcessError, FileNotFoundError):
+    # Check if deno is installed (probed once, then cached)
+    if not _deno_available():
         return {"error": "Deno is not installed on this system."}
 
     command = ["deno", "run", "-A", script_path] + args
@@ -61,18 +86,196 @@ def run_deno_script(script_path: str, args: list = None):
     except Exception as e:
         return {"status": "exception", "error": str(e)}
 
-def deno_eval(code: str):
-    """Evaluates a snippet of JS/TS code using Deno ⚡."""
+# Runs inside the worker: evaluates each JSON request and replies with the captured console.log output
+_DENO_REPL_SOURCE = r"""
+const encoder = new TextEncoder();
+const decoder = new TextDecoder();
+const captured = [];
+const capture = (...args) => captured.push(args.map((a) => typeof a === "string" ? a : Deno.inspect(a)).join(" "));
+// Every console method that prints to stdout is captured, so only protocol lines reach the pipe
+for (const name of ["log", "info", "debug", "dir", "dirxml", "table", "group", "groupCollapsed"]) {
+  console[name] = capture;
+}
+const counts = new Map();
+console.count = (label = "default") => {
+  counts.set(label, (counts.get(label) || 0) + 1);
+  capture(`${label}: ${counts.get(label)}`);
+};
+console.countReset = (label = "default") => counts.delete(label);
+const timers = new Map();
+console.time = (label = "default") => timers.set(label, performance.now());
+console.timeLog = (label = "default", ...data) => {
+  if (timers.has(label)) capture(`${label}: ${(performance.now() - timers.get(label)).toFixed(3)}ms`, ...data);
+};
+console.timeEnd = (label = "default") => {
+  console.timeLog(label);
+  timers.delete(label);
+};
+// Deno.stdout.write may write fewer bytes than given; loop until the whole reply is out
+const writeAll = async (bytes) => {
+  let written = 0;
+  while (written < bytes.length) written += await Deno.stdout.write(bytes.subarray(written));
+};
+let pending = "";
+for await (const chunk of Deno.stdin.readable) {
+  pending += decoder.decode(chunk, { stream: true });
+  let newline;
+  while ((newline = pending.indexOf("\n")) >= 0) {
+    const line = pending.slice(0, newline);
+    pending = pending.slice(newline + 1);
+    if (!line.trim()) continue;
+    const { id, code } = JSON.parse(line);
+    captured.length = 0;
+    let reply;
+    try {
+      // Parse without running: only a snippet that fails here goes to the one-shot path,
+      // so a SyntaxError thrown while it runs (e.g. JSON.parse) never executes it twice
+      new Function(code);
+    } catch (e) {
+      reply = { id, ok: false, error: String((e && e.stack) || e), syntax: true };
+    }
+    if (!reply) {
+      try {
+        await (0, eval)(code);
+        reply = { id, ok: true, output: captured.join("\n") };
+      } catch (e) {
+        reply = { id, ok: false, error: String((e && e.stack) || e), syntax: false };
+      }
+    }
+    await writeAll(encoder.encode(JSON.stringify(reply) + "\n"));
+  }
+}
+"""
+
+
+class DenoWorker:
+    """Persistent Deno process that evaluates snippets sent over stdin, one JSON line each."""
+
+    def __init__(self):
+        self._proc = None
+        self._lines = None
+        self._lock = threading.Lock()
+        self._next_id = 0
+
+    def _ensure_started(self):
+        if self._proc is None or self._proc.poll() is not None:
+            self._proc = tracked_popen(
+                ["deno", "eval", _DENO_REPL_SOURCE],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                text=True,
+                encoding='utf-8',
+                errors='replace',
+                bufsize=1
+            )
+            # Replies are read on a thread so eval can wait with a deadline; each process
+            # gets its own queue, so lines of a killed worker never reach the next one
+            self._lines = queue.Queue()
+            threading.Thread(target=self._read_lines, args=(self._proc.stdout, self._lines), daemon=True).start()
+
+    @staticmethod
+    def _read_lines(stdout, lines):
+        """Forwards the worker's stdout lines to its queue; None marks EOF."""
+        try:
+            for line in stdout:
+                lines.put(line)
+        except (OSError, ValueError):
+            pass
+        lines.put(None)
+
+    def _discard(self):
+        """Kills the worker so the next call starts a fresh one (its pipe may hold stale output)."""
+        proc, self._proc = self._proc, None
+        if proc is not None and proc.poll() is None:
+            proc.kill()
+            try:
+                proc.wait(timeout=2)
+            except subprocess.TimeoutExpired:
+                pass
+
+    def eval(self, code: str) -> dict:
+        """
+        Sends one snippet and returns the worker's reply dict. Raises RuntimeError if the
+        worker died or answered with something other than the reply to this request (e.g.
+        the snippet wrote to stdout directly), and TimeoutError if the snippet hasn't settled
+        within DENO_EVAL_TIMEOUT_SECONDS; the worker is restarted on the next call.
+        """
+        with self._lock:
+            self._ensure_started()
+            self._next_id += 1
+            request_id = self._next_id
+            try:
+                self._proc.stdin.write(json.dumps({"id": request_id, "code": code}) + "\n")
+                self._proc.stdin.flush()
+            except OSError as e:
+                self._discard()
+                raise RuntimeError(f"Deno worker pipe failed: {e}") from e
+            try:
+                line = self._lines.get(timeout=DENO_EVAL_TIMEOUT_SECONDS)
+            except queue.Empty:
+                self._discard()
+                raise TimeoutError(f"Snippet did not finish within {DENO_EVAL_TIMEOUT_SECONDS}s") from None
+            if not line:
+                self._discard()
+                raise RuntimeError("Deno worker exited unexpectedly")
+            try:
+                reply = json.loads(line)
+            except ValueError:
+                reply = None
+            if not isinstance(reply, dict) or reply.get("id") != request_id:
+                self._discard()
+                raise RuntimeError("Deno worker sent a line that is not the reply to this request")
+            return reply
+
+    def close(self):
+        """Stops the worker process if it is running."""
+        with self._lock:
+            proc, self._proc = self._proc, None
+        if proc is None or proc.poll() is not None:
+            return
+        try:
+            proc.stdin.close()
+            proc.wait(timeout=2)
+        except (OSError, subprocess.TimeoutExpired):
+            proc.kill()
+
+
+_worker = DenoWorker()
+atexit.register(_worker.close)
+
+
+def _deno_eval_once(code: str):
+    """Evaluates a snippet in a fresh deno process."""
     try:
         result = tracked_run(
             ["deno", "eval", code],
             capture_output=True,
             text=True,
             encoding='utf-8',
-            errors='replace'
+            errors='replace',
+            timeout=DENO_EVAL_TIMEOUT_SECONDS
         )
         if result.returncode == 0:
             return result.stdout.strip()
         return f"Error: {result.stderr.strip()}"
     except Exception as e:
         return str(e)
+
+def deno_eval(code: str):
+    """Evaluates a snippet of JS/TS code using Deno ⚡."""
+    if not _deno_available():
+        return _deno_eval_once(code)
+    try:
+        reply = _worker.eval(code)
+    except TimeoutError as e:
+        # Running it again one-shot would only hang (and repeat its side effects)
+        return f"Error: {e}"
+    except RuntimeError:
+        return _deno_eval_once(code)
+    if reply.get("ok"):
+        return reply.get("output", "").strip()
+    if reply.get("syntax"):
+        # Module syntax or TypeScript that indirect eval can't parse (it never started running)
+        return _deno_eval_once(code)
+    return f"Error: {reply.get('error', '').strip()}"
@@ -13,17 +13,50 @@ KEY FUNCTIONS:
   download_ffmpeg() → bool
     - Downloads FFmpeg if missing, returns True on success
   get_audio_tracks(input_file) → list[dict]
-    - Returns [{index, language}, ...] for each audio stream
+    - Returns [{index, language, channels, sample_rate}, ...] for each audio stream
   get_audio_duration(file_path) → float | None
-    - Returns duration in seconds
+    - Returns duration in seconds; WAV/FLAC/OGG headers are read directly
+      (MP3/AAC/M4A too when mutagen is installed), ffprobe for everything else
   get_video_resolution(file_path) → str | None
     - Returns "1920x1080" format
+  probe_many(paths) → dict
+    - Probes files concurrently in a thread pool, filling the probe cache
+    - Large cold batches read headers via probe_many_ffmpeg first (one ffmpeg
+      process with many -i inputs instead of one ffprobe per file)
+  get_video_codec(file_path) / get_file_metadata(file_path)
+    - All getters read the same cached -show_format -show_streams probe,
+      so asking several of them about one file costs one ffprobe run
+    - On a cold cache, get_video_codec/get_video_resolution run a minimal
+      header-only probe (-analyzeduration/-probesize) instead
+  loudnorm_filter(input_path) → str
+    - loudnorm filter string: linear with measured values, or single-pass fallback
+  measure_loudness(input_path) → dict | None
+    - ebur128 measurement, in-process through PyAV when installed (no ffmpeg spawn),
+      else an ffmpeg ebur128 pass, loudnorm JSON pass as last fallback
+    - Cached per unchanged file in memory and by content hash in .loudnorm_cache/
+  has_encoder(name) / check_fdk_aac_codec() → bool
+    - Looks up a frozenset parsed once from ffmpeg -encoders
   convert_audio_with_ffmpeg(input, output, codec, normalize_audio) → bool
-    - Converts audio, applies loudnorm if requested
+    - Converts audio, applies two-pass linear loudnorm if requested
+    - Uses PyAV (optional) in-process, falling back to the ffmpeg binary
+
+LOGGING:
+  - Probe/convert messages use module_log.get_logger(__name__) at WARNING
+    (DEBUG with MR_DEBUG=1), so batch scans don't flood the console;
+    download_ffmpeg keeps its console prints
 
 CONSTANTS:
   FFMPEG_EXE: Absolute path to ffmpeg.exe in modules/
   FFPROBE_EXE: Absolute path to ffprobe.exe in modules/
+  PROBE_CACHE_DIR: modules/.ffprobe_cache/, one JSON file per probed media file
+
+PROBE CACHE:
+  - _cached_probe(file_path) returns ffprobe -show_format -show_streams JSON
+  - Entries are keyed by absolute path and only reused while the file's
+    st_mtime_ns and st_size are unchanged
+  - Kept in memory and on disk (atomic temp file + rename per entry), oldest
+    entries pruned back to PROBE_CACHE_MAX_ENTRIES once it is overrun by
+    CACHE_PRUNE_MARGIN
 
 DOWNLOAD SOURCE:
   - ffmpeg.exe: https://oblak.pronameserver.xyz/public.php/dav/files/8mW9BJCqLXX5ecp/?accept=zip
@@ -33,74 +66,223 @@ import subprocess
 import json
 from colorama import Fore, Style, Back
 import os
-import sys
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from module_file import download_file_concurrent
+import hashlib
+import logging
+import math
+import re
+import tempfile
+import threading
+from functools import lru_cache
+import soundfile as sf
+from concurrent.futures import ThreadPoolExecutor
+from module_file import download_files, download_is_current, record_download
+from module_log import get_logger
 
 try:
     from services.process_manager import tracked_run
 except ImportError:
     tracked_run = subprocess.run
 
+# Probe/convert messages stay at WARNING, so batch scans don't flood the console
+log = get_logger(__name__, logging.WARNING)
+
+# Optional: orjson parses ffprobe JSON several times faster than the stdlib
+try:
+    import orjson
+
+    def _json_loads(raw):
+        return orjson.loads(raw)
+
+    def _json_dumps(obj):
+        return orjson.dumps(obj)
+except ImportError:
+    def _json_loads(raw):
+        return json.loads(raw)
+
+    def _json_dumps(obj):
+        return json.dumps(obj).encode('utf-8')
+
+# Optional: mutagen reads MP3/AAC/M4A durations from the headers in pure Python
+try:
+    import mutagen
+    MUTAGEN_AVAILABLE = True
+except ImportError:
+    MUTAGEN_AVAILABLE = False
+
+# Optional: PyAV encodes and measures in-process against libav*, no ffmpeg subprocess per call
+try:
+    import av
+    PYAV_AVAILABLE = True
+except ImportError:
+    PYAV_AVAILABLE = False
+
+
+def _parse_probe_json(raw):
+    """Parses ffprobe JSON bytes; tags with invalid UTF-8 are decoded with replacement characters."""
+    try:
+        return _json_loads(raw)
+    except (ValueError, UnicodeDecodeError):
+        return json.loads(raw.decode('utf-8', errors='replace'))
+
 def get_audio_tracks(input_file):
     """
     Retrieves audio tracks from a video file using ffprobe.
     """
     if not FFMPEG_EXE:
-        print(f"{Fore.RED}FFmpeg not found. Cannot retrieve audio tracks.{Style.RESET_ALL}")
+        log.error("FFmpeg not found. Cannot retrieve audio tracks.")
         return []
 
-    ffprobe_exe = FFMPEG_EXE.replace('ffmpeg', 'ffprobe')
-    command = [
-        ffprobe_exe,
-        "-v", "quiet",
-        "-print_format", "json",
-        "-show_streams",
-        "-select_streams", "a",
-        input_file
-    ]
-    
     try:
-        result = tracked_run(command, capture_output=True, text=True, encoding='utf-8', errors='replace', check=True)
-        streams = json.loads(result.stdout).get('streams', [])
+        # Same -show_streams probe the other getters use, so it is usually a cache hit
+        streams = [s for s in _cached_probe(input_file).get('streams', []) if s.get('codec_type') == 'audio']
         audio_tracks = []
         for stream in streams:
             lang = stream.get('tags', {}).get('language', 'unknown')
-            audio_tracks.append({'index': stream['index'], 'language': lang})
+            rate = stream.get('sample_rate')
+            audio_tracks.append({'index': stream['index'], 'language': lang, 'channels': stream.get('channels'),
+                                 'sample_rate': int(rate) if rate else None})
         return audio_tracks
-    except (subprocess.CalledProcessError, FileNotFoundError) as e:
-        print(f"{Fore.RED}Error getting audio tracks: {e}{Style.RESET_ALL}")
+    except (subprocess.CalledProcessError, FileNotFoundError, json.JSONDecodeError) as e:
+        log.error("Error getting audio tracks: %s", e)
         return []
-def get_video_codec(file_path):
+
+FFMPEG_EXE = os.path.abspath(os.path.join(os.path.dirname(__file__), 'ffmpeg.exe'))
+FFPROBE_EXE = os.path.abspath(os.path.join(os.path.dirname(__file__), 'ffprobe.exe'))
+
+PROBE_CACHE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '.ffprobe_cache'))
+PROBE_CACHE_MAX_ENTRIES = 2000
+
+# Loudness measurements persist across runs keyed by content, not path, so a rerun on
+# fresh temp files of the same audio skips the measurement pass
+LOUDNORM_CACHE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '.loudnorm_cache'))
+LOUDNORM_CACHE_MAX_ENTRIES = 500
+LOUDNORM_CACHE_SAMPLE_BYTES = 1 << 20
+
+# Disk caches are only scanned and pruned once they overrun their cap by this fraction,
+# so writing n entries doesn't cost n directory scans
+CACHE_PRUNE_MARGIN = 0.1
+
+_probe_cache = {}
+_probe_cache_lock = threading.Lock()
+
+# Running entry count per cache directory (seeded by one scan), guarded by its lock
+_cache_entry_counts = {}
+_cache_entry_counts_lock = threading.Lock()
+
+
+def _probe_cache_entry_path(abs_path):
+    """Path of the on-disk cache entry for a media file."""
+    digest = hashlib.sha1(abs_path.encode('utf-8', errors='surrogatepass')).hexdigest()
+    return os.path.join(PROBE_CACHE_DIR, f"{digest}.json")
+
+
+def _load_probe_cache_entry(abs_path):
+    """Reads a cache entry from disk, or None if missing or unreadable."""
+    try:
+        with open(_probe_cache_entry_path(abs_path), 'rb') as f:
+            entry = _json_loads(f.read())
+    except (OSError, ValueError):
+        return None
+    return entry if isinstance(entry, dict) and entry.get('path') == abs_path else None
+
+
+def _write_cache_entry(cache_dir, entry_path, entry, max_entries):
     """
-    Retrieves the video codec name from a file using ffprobe.
+    Writes a JSON cache entry atomically. Once the directory holds more than max_entries
+    plus CACHE_PRUNE_MARGIN, the oldest entries are pruned back down to max_entries.
     """
-    if not FFMPEG_EXE:
-        return "unknown"
+    tmp_path = None
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        is_new = not os.path.exists(entry_path)
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(_json_dumps(entry))
+        os.replace(tmp_path, entry_path)
+        tmp_path = None
+
+        with _cache_entry_counts_lock:
+            count = _cache_entry_counts.get(cache_dir)
+            if count is None:
+                count = sum(1 for e in os.scandir(cache_dir) if e.name.endswith('.json'))
+            elif is_new:
+                count += 1
+            prune = count > max_entries * (1 + CACHE_PRUNE_MARGIN)
+            _cache_entry_counts[cache_dir] = min(count, max_entries) if prune else count
+        if not prune:
+            return
+
+        entries = [e for e in os.scandir(cache_dir) if e.name.endswith('.json')]
+        if len(entries) > max_entries:
+            entries.sort(key=lambda e: e.stat().st_mtime)
+            for stale in entries[:len(entries) - max_entries]:
+                try:
+                    os.remove(stale.path)
+                except FileNotFoundError:
+                    # Another thread pruned it first
+                    pass
+    except OSError as e:
+        log.warning("Could not write cache entry %s: %s", entry_path, e)
+    finally:
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _store_probe_cache_entry(abs_path, entry):
+    """Writes a probe cache entry atomically and prunes the oldest entries beyond the size cap."""
+    _write_cache_entry(PROBE_CACHE_DIR, _probe_cache_entry_path(abs_path), entry, PROBE_CACHE_MAX_ENTRIES)
+
+
+def _fresh_cached_probe(abs_path, st):
+    """Returns the cached probe JSON for abs_path if it still matches st (mtime/size), else None."""
+    with _probe_cache_lock:
+        entry = _probe_cache.get(abs_path)
+    if entry is None:
+        entry = _load_probe_cache_entry(abs_path)
+    if entry and entry.get('mtime_ns') == st.st_mtime_ns and entry.get('size') == st.st_size:
+        with _probe_cache_lock:
+            _probe_cache[abs_path] = entry
+        return entry['probe']
+    return None
 
-    ffprobe_exe = FFMPEG_EXE.replace('ffmpeg', 'ffprobe')
-    command = [
-        ffprobe_exe,
+
+def _cached_probe(file_path, timeout=None):
+    """
+    Returns ffprobe's -show_format -show_streams JSON for a file.
+    Results are reused while the file's mtime and size are unchanged; otherwise ffprobe runs
+    and the result is cached. ffprobe failures raise (CalledProcessError, TimeoutExpired, JSONDecodeError).
+    """
+    abs_path = os.path.abspath(file_path)
+    st = os.stat(abs_path)
+
+    probe = _fresh_cached_probe(abs_path, st)
+    if probe is not None:
+        return probe
+
+    cmd = [
+        FFPROBE_EXE,
         "-v", "quiet",
-        "-select_streams", "v:0",
-        "-show_entries", "stream=codec_name",
-        "-of", "default=noprint_wrappers=1:nokey=1",
-        file_path
+        "-print_format", "json",
+        "-show_streams",
+        "-show_format",
+        abs_path
     ]
-    
-    try:
-        result = tracked_run(command, capture_output=True, text=True, encoding='utf-8', errors='replace', check=True)
-        return result.stdout.strip() or "unknown"
-    except (subprocess.CalledProcessError, FileNotFoundError):
-        return "unknown"
+    # Raw bytes straight into the JSON parser, no text decoding pass; stderr is
+    # discarded (-v quiet leaves it empty anyway) so no second pipe is drained
+    result = tracked_run(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, timeout=timeout, check=True)
+    probe = _parse_probe_json(result.stdout)
 
-
-FFMPEG_EXE = os.path.abspath(os.path.join(os.path.dirname(__file__), 'ffmpeg.exe'))
-FFPROBE_EXE = os.path.abspath(os.path.join(os.path.dirname(__file__), 'ffprobe.exe'))
+    entry = {"path": abs_path, "mtime_ns": st.st_mtime_ns, "size": st.st_size, "probe": probe}
+    with _probe_cache_lock:
+        _probe_cache[abs_path] = entry
+    # Disk write outside the lock: probe_many's workers must not serialize on cache I/O
+    _store_probe_cache_entry(abs_path, entry)
+    return probe
 
 def download_ffmpeg():
     """
-    Downloads ffmpeg.exe and ffprobe.exe to the modules folder if they don't exist.
+    Downloads ffmpeg.exe and ffprobe.exe to the modules folder if they don't exist,
+    or if their "<file>.etag" sidecar shows a truncated or outdated copy.
     """
     files_config = [
         {"url": "https://oblak.pronameserver.xyz/public.php/dav/files/8mW9BJCqLXX5ecp/?accept=zip", "filename": "ffmpeg.exe"},
@@ -116,8 +298,14 @@ def download_ffmpeg():
     for file_info in files_config:
         # Prepend the target directory to the filename
         local_filepath = os.path.join(target_dir, file_info["filename"])
-        if os.path.exists(local_filepath):
+        if os.path.exists(local_filepath) and download_is_current(file_info["url"], local_filepath):
             print(f"- Found '{file_info['filename']}' at: {os.path.abspath(local_filepath)}")
+        elif os.path.exists(local_filepath):
+            files_to_actually_download.append({
+                "url": file_info["url"],
+                "filename": local_filepath
+            })
+            print(f"- '{file_info['filename']}' is incomplete or outdated, will download it again.")
         else:
             # Pass the full path to the download function
             files_to_actually_download.append({
@@ -132,63 +320,252 @@ def download_ffmpeg():
     
     print("\n--- Starting Concurrent Downloads ---")
     all_successful = True
-    with ThreadPoolExecutor(max_workers=len(files_to_actually_download)) as executor:
-        future_to_file = {executor.submit(download_file_concurrent, f["url"], f["filename"]): f for f in files_to_actually_download}
+    urls_by_path = {f["filename"]: f["url"] for f in files_to_actually_download}
+    for success, filepath in download_files(files_to_actually_download):
+        # Get just the filename for printing
+        filename_for_print = os.path.basename(filepath)
 
-        for future in as_completed(future_to_file):
-            original_file_info = future_to_file[future]
-            success, filepath = future.result()
-            
-            # Get just the filename for printing
-            filename_for_print = os.path.basename(filepath)
+        # Record ETag/size so the next start can validate the file without downloading it
+        if success:
+            success = record_download(urls_by_path[filepath], filepath)
 
-            if success:
-                print(f"[{filename_for_print}] Download finished.")
-            else:
-                print(f"[{filename_for_print}] Download failed.")
-                all_successful = False
+        if success:
+            print(f"[{filename_for_print}] Download finished.")
+        else:
+            print(f"[{filename_for_print}] Download failed.")
+            all_successful = False
     
     return all_successful
 
+def _first_stream(probe, codec_type):
+    """Returns the first stream of the given codec_type ('video'/'audio') in probe JSON, or None."""
+    for stream in probe.get('streams', []):
+        if stream.get('codec_type') == codec_type:
+            return stream
+    return None
+
+PROBE_BATCH_MIN_FILES = 8
+PROBE_BATCH_SIZE = 64  # inputs per ffmpeg run, keeps the command line well under Windows' limit
+
+_INPUT_RE = re.compile(r"^Input #(\d+), (.+?), from '")
+_DURATION_RE = re.compile(r"^\s+Duration: (\d+):(\d{2}):(\d{2}(?:\.\d+)?)")
+_STREAM_RE = re.compile(r"^\s+Stream #\d+:(\d+)(?:\[\w+\])?(?:\((\w+)\))?: (\w+): (\w+)(.*)$")
+_RESOLUTION_RE = re.compile(r"\b(\d{2,5})x(\d{2,5})\b")
+_AUDIO_RE = re.compile(r"(\d+) Hz, ([^,]+)")
+_LAYOUT_CHANNELS = {"mono": 1, "stereo": 2, "2.1": 3, "quad": 4, "5.0": 5, "5.1": 6, "6.1": 7, "7.1": 8}
+
+
+def _parse_ffmpeg_input_report(stderr):
+    """
+    Parses the "Input #N ..." blocks ffmpeg prints for its inputs into ffprobe-shaped dicts
+    ({"format": {...}, "streams": [...]}) holding the fields the getters read.
+    Returns {input_index: probe}.
+    """
+    probes = {}
+    current = None
+    for line in stderr.splitlines():
+        match = _INPUT_RE.match(line)
+        if match:
+            current = {"format": {"format_name": match.group(2)}, "streams": []}
+            probes[int(match.group(1))] = current
+            continue
+        if current is None:
+            continue
+        match = _DURATION_RE.match(line)
+        if match:
+            hours, minutes, seconds = match.groups()
+            current["format"]["duration"] = str(int(hours) * 3600 + int(minutes) * 60 + float(seconds))
+            continue
+        match = _STREAM_RE.match(line)
+        if not match:
+            continue
+        index, language, codec_type, codec_name, rest = match.groups()
+        stream = {"index": int(index), "codec_type": codec_type.lower(), "codec_name": codec_name}
+        if language:
+            stream["tags"] = {"language": language}
+        if stream["codec_type"] == "video":
+            resolution = _RESOLUTION_RE.search(rest)
+            if resolution:
+                stream["width"], stream["height"] = int(resolution.group(1)), int(resolution.group(2))
+        elif stream["codec_type"] == "audio":
+            audio = _AUDIO_RE.search(rest)
+            if audio:
+                stream["sample_rate"] = audio.group(1)
+                layout = audio.group(2).strip()
+                stream["channel_layout"] = layout
+                channels = _LAYOUT_CHANNELS.get(layout.split("(")[0])
+                if channels is None and layout.endswith(" channels"):
+                    channels = int(layout.split()[0])
+                if channels:
+                    stream["channels"] = channels
+        current["streams"].append(stream)
+    return probes
+
+
+def probe_many_ffmpeg(paths):
+    """
+    Reads stream headers for many files with one ffmpeg process per PROBE_BATCH_SIZE files
+    (multiple -i, no output, so nothing is decoded) and parses its input report.
+    Returns {path: probe or None}. Parsed probes only hold the fields the getters use, so
+    they are kept in the in-memory probe cache but never written to PROBE_CACHE_DIR.
+    A file ffmpeg cannot open ends the report early; it and later files map to None.
+    """
+    results = {}
+    for start in range(0, len(paths), PROBE_BATCH_SIZE):
+        batch = paths[start:start + PROBE_BATCH_SIZE]
+        cmd = [FFMPEG_EXE, "-hide_banner"]
+        for path in batch:
+            cmd.extend(["-i", os.path.abspath(path)])
+        try:
+            # Exits non-zero ("At least one output file must be specified") after the report
+            result = tracked_run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                                 timeout=10 + len(batch))
+            probes = _parse_ffmpeg_input_report(result.stderr.decode('utf-8', errors='replace'))
+        except (OSError, subprocess.TimeoutExpired):
+            probes = {}
+
+        for i, path in enumerate(batch):
+            probe = probes.get(i)
+            results[path] = probe
+            if probe is None:
+                continue
+            abs_path = os.path.abspath(path)
+            try:
+                st = os.stat(abs_path)
+            except OSError:
+                continue
+            with _probe_cache_lock:
+                _probe_cache[abs_path] = {"path": abs_path, "mtime_ns": st.st_mtime_ns,
+                                          "size": st.st_size, "probe": probe}
+    return results
+
+
+def probe_many(paths, max_workers=None):
+    """
+    Probes many files concurrently (ffprobe is subprocess-bound, so threads suffice).
+    When more than PROBE_BATCH_MIN_FILES are not cached yet, their headers are read first
+    with batched ffmpeg runs (probe_many_ffmpeg); whatever that misses goes to ffprobe.
+    Returns {path: probe JSON or None on failure}; results also land in the probe cache.
+    """
+    if not paths:
+        return {}
+
+    results = {}
+    cold = []
+    for path in paths:
+        abs_path = os.path.abspath(path)
+        try:
+            probe = _fresh_cached_probe(abs_path, os.stat(abs_path))
+        except OSError:
+            probe = None
+        if probe is None:
+            cold.append(path)
+        else:
+            results[path] = probe
+
+    if len(cold) > PROBE_BATCH_MIN_FILES:
+        results.update({path: probe for path, probe in probe_many_ffmpeg(cold).items() if probe is not None})
+        cold = [path for path in cold if path not in results]
+
+    def probe_or_none(path):
+        try:
+            return _cached_probe(path, timeout=10)
+        except Exception:
+            return None
+
+    if cold:
+        workers = max_workers or min(32, len(cold), (os.cpu_count() or 1) * 4)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results.update(zip(cold, executor.map(probe_or_none, cold)))
+    return {path: results.get(path) for path in paths}
+
+# Formats whose duration is read from the file header without spawning ffprobe
+SOUNDFILE_DURATION_EXTENSIONS = frozenset({'.wav', '.flac', '.ogg'})
+MUTAGEN_DURATION_EXTENSIONS = frozenset({'.mp3', '.aac', '.m4a'})
+
+
+def _header_duration(file_path):
+    """Duration from the file header (soundfile / mutagen) for known audio formats, else None."""
+    ext = os.path.splitext(file_path)[1].lower()
+    try:
+        if ext in SOUNDFILE_DURATION_EXTENSIONS:
+            return sf.info(file_path).duration
+        if ext in MUTAGEN_DURATION_EXTENSIONS and MUTAGEN_AVAILABLE:
+            audio = mutagen.File(file_path)
+            return audio.info.length if audio is not None else None
+    except Exception:
+        return None
+    return None
+
 def get_audio_duration(file_path):
     """
-    Gets the duration of an audio file using ffprobe.
+    Gets the duration of an audio file: from the header for WAV/FLAC/OGG (and MP3/AAC/M4A
+    with mutagen), otherwise with ffprobe (via the probe cache).
     Returns duration in seconds as float, or None if an error occurs.
     """
+    duration = _header_duration(file_path)
+    if duration:
+        return float(duration)
     try:
-        # Use ffprobe to get duration
-        cmd = [FFPROBE_EXE, "-v", "error", "-show_entries", "format=duration", "-of", "default=noprint_wrappers=1:nokey=1", file_path]
-        result = tracked_run(cmd, capture_output=True, text=True, encoding='utf-8', errors='replace', check=True)
-        return float(result.stdout.strip())
+        probe = _cached_probe(file_path)
+        return float(probe.get('format', {}).get('duration'))
     except subprocess.CalledProcessError as e:
-        print(f"{Fore.RED}Error: ffprobe failed to get duration for {file_path}. Is ffprobe installed and in PATH? Error: {e}{Style.RESET_ALL}")
+        log.error("ffprobe failed to get duration for %s. Is ffprobe installed and in PATH? Error: %s", file_path, e)
         return None
-    except ValueError:
-        print(f"{Fore.RED}Error: ffprobe returned non-numeric duration for {file_path}.{Style.RESET_ALL}")
+    except (ValueError, TypeError):
+        log.error("ffprobe returned non-numeric duration for %s.", file_path)
         return None
     except Exception as e:
-        print(f"{Fore.RED}An unexpected error occurred while getting audio duration for {file_path}: {e}{Style.RESET_ALL}")
+        log.error("An unexpected error occurred while getting audio duration for %s: %s", file_path, e)
         return None
 
+def _quick_video_stream(file_path, entries, analyzeduration, probesize):
+    """
+    First video stream fields for single-field getters.
+    Uses the probe cache when it is warm; otherwise runs a minimal ffprobe that only reads
+    the stream header (bounded -analyzeduration/-probesize) and asks for just `entries`.
+    The partial result is not cached, so later full probes stay complete.
+    """
+    abs_path = os.path.abspath(file_path)
+    probe = _fresh_cached_probe(abs_path, os.stat(abs_path))
+    if probe is None:
+        cmd = [
+            FFPROBE_EXE,
+            "-v", "quiet",
+            "-analyzeduration", analyzeduration,
+            "-probesize", probesize,
+            "-select_streams", "v:0",
+            "-show_entries", f"stream={entries}",
+            "-print_format", "json",
+            abs_path
+        ]
+        result = tracked_run(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=True)
+        probe = _parse_probe_json(result.stdout)
+        streams = probe.get('streams', [])
+        return streams[0] if streams else None
+    return _first_stream(probe, 'video')
+
 def get_video_resolution(file_path):
     """
-    Gets the resolution of a video file using ffprobe.
+    Gets the resolution of a video file using ffprobe (probe cache, else a minimal header probe).
     Returns resolution as a string (e.g., "1920x1080"), or None if an error occurs.
     """
     try:
-        cmd = [FFPROBE_EXE, "-v", "error", "-select_streams", "v:0", "-show_entries", "stream=width,height", "-of", "csv=s=x:p=0", file_path]
-        result = tracked_run(cmd, capture_output=True, text=True, encoding='utf-8', errors='replace', check=True)
-        return result.stdout.strip()
+        # Dimensions live in the codec parameters; 1 s / 500 KB of analysis is plenty
+        stream = _quick_video_stream(file_path, "width,height", "1000000", "500000")
+        if not stream or not stream.get('width') or not stream.get('height'):
+            return ""
+        return f"{stream['width']}x{stream['height']}"
     except subprocess.CalledProcessError as e:
-        print(f"{Fore.RED}Error: ffprobe failed to get resolution for {file_path}. Error: {e}{Style.RESET_ALL}")
+        log.error("ffprobe failed to get resolution for %s. Error: %s", file_path, e)
         return None
     except Exception as e:
-        print(f"{Fore.RED}An unexpected error occurred while getting video resolution for {file_path}: {e}{Style.RESET_ALL}")
+        log.error("An unexpected error occurred while getting video resolution for %s: %s", file_path, e)
         return None
 
 def get_file_metadata(file_path):
     """
-    Gets resolution, duration, video codec, and audio codec using ffprobe.
+    Gets resolution, duration, video codec, and audio codec using ffprobe (via the probe cache).
     """
     metadata = {
         "resolution": "N/A",
@@ -199,25 +576,16 @@ def get_file_metadata(file_path):
     }
 
     try:
-        cmd = [
-            FFPROBE_EXE,
-            "-v", "quiet",
-            "-print_format", "json",
-            "-show_streams",
-            "-show_format",
-            file_path
-        ]
         try:
-            result = tracked_run(cmd, capture_output=True, text=True, encoding='utf-8', errors='replace', timeout=10)
-            if result.returncode != 0:
-                print(f"ffprobe failed for {file_path}. Return code: {result.returncode}, stderr: {result.stderr}")
-                return metadata
-            data = json.loads(result.stdout)
+            data = _cached_probe(file_path, timeout=10)
+        except subprocess.CalledProcessError as e:
+            log.warning("ffprobe failed for %s. Return code: %s", file_path, e.returncode)
+            return metadata
         except subprocess.TimeoutExpired:
-            print(f"ffprobe timed out (10s) for {file_path}")
+            log.warning("ffprobe timed out (10s) for %s", file_path)
             return metadata
         except json.JSONDecodeError:
-            print(f"Failed to parse ffprobe JSON output for {file_path}")
+            log.warning("Failed to parse ffprobe JSON output for %s", file_path)
             return metadata
 
         # Get duration - try format first, then fall back to video stream
@@ -263,23 +631,23 @@ def get_file_metadata(file_path):
 
         return metadata
     except Exception as e:
-        print(f"Error getting metadata for {file_path}: {e}")
+        log.error("Error getting metadata for %s: %s", file_path, e)
         return metadata
 
 def get_video_codec(file_path):
     """
-    Gets the video codec of a video file using ffprobe.
+    Gets the video codec of a video file using ffprobe (probe cache, else a minimal header probe).
     Returns codec name as a string (e.g., "h264"), or None if an error occurs.
     """
     try:
-        cmd = [FFPROBE_EXE, "-v", "error", "-select_streams", "v:0", "-show_entries", "stream=codec_name", "-of", "default=noprint_wrappers=1:nokey=1", file_path]
-        result = tracked_run(cmd, capture_output=True, text=True, encoding='utf-8', errors='replace', check=True)
-        return result.stdout.strip()
+        # The codec id comes from the container header, no packet analysis needed
+        stream = _quick_video_stream(file_path, "codec_name", "0", "32768")
+        return stream.get('codec_name', '') if stream else ""
     except subprocess.CalledProcessError as e:
-        print(f"{Fore.RED}Error: ffprobe failed to get video codec for {file_path}. Error: {e}{Style.RESET_ALL}")
+        log.error("ffprobe failed to get video codec for %s. Error: %s", file_path, e)
         return None
     except Exception as e:
-        print(f"{Fore.RED}An unexpected error occurred while getting video codec for {file_path}: {e}{Style.RESET_ALL}")
+        log.error("An unexpected error occurred while getting video codec for %s: %s", file_path, e)
         return None
 
 def get_ffmpeg_version():
@@ -309,63 +677,368 @@ def get_ffmpeg_version():
     except (subprocess.CalledProcessError, FileNotFoundError, IndexError):
         return "N/A"
 
-def check_fdk_aac_codec():
+_ENCODER_LINE_RE = re.compile(rb"^ [VAS][A-Z.]{5} (\S+)", re.MULTILINE)
+
+
+@lru_cache(maxsize=1)
+def _available_encoders():
     """
-    Checks if libfdk_aac codec is available in FFmpeg.
+    Runs ffmpeg -encoders once per process and returns the encoder names as a frozenset.
+    Errors propagate and are not cached, so a later call can retry.
     """
+    cmd = [FFMPEG_EXE, "-encoders"]
+    # Parse the raw bytes; encoder names are ASCII
+    result = tracked_run(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=True)
+    # The legend above the list (" V..... = Video") has "=" in the name column
+    return frozenset(name.decode('ascii') for name in _ENCODER_LINE_RE.findall(result.stdout) if name != b"=")
+
+def has_encoder(name):
+    """True if the local ffmpeg lists the given encoder (e.g. "libopus", "hevc_nvenc")."""
     try:
-        cmd = [FFMPEG_EXE, "-encoders"]
-        result = tracked_run(cmd, capture_output=True, text=True, encoding='utf-8', errors='replace', check=True)
-        if "libfdk_aac" in result.stdout:
-            return True
-        else:
-            return False
-    except subprocess.CalledProcessError as e:
-        print(f"{Fore.RED}Error: FFmpeg failed to list encoders. Is FFmpeg installed and in PATH? Error: {e}{Style.RESET_ALL}")
+        return name in _available_encoders()
+    except (subprocess.CalledProcessError, OSError) as e:
+        log.error("FFmpeg failed to list encoders. Is FFmpeg installed and in PATH? Error: %s", e)
         return False
-    except Exception as e:
-        print(f"{Fore.RED}An unexpected error occurred while checking for libfdk_aac: {e}{Style.RESET_ALL}")
+
+def check_fdk_aac_codec():
+    """
+    Checks if libfdk_aac codec is available in FFmpeg (encoder list cached after the first successful check).
+    """
+    return has_encoder("libfdk_aac")
+
+LOUDNORM_TARGET = "I=-23:TP=-2:LRA=7"
+
+# First-pass loudnorm measurements, keyed like the probe cache (path, mtime_ns, size)
+_loudnorm_measurements = {}
+_loudnorm_lock = threading.Lock()
+
+
+_EBUR128_SUMMARY_FIELDS = {
+    "input_i": re.compile(r"Integrated loudness:\s*I:\s*(\S+) LUFS\s*Threshold:\s*(\S+) LUFS"),
+    "input_lra": re.compile(r"Loudness range:\s*LRA:\s*(\S+) LU"),
+    "input_tp": re.compile(r"True peak:\s*Peak:\s*(\S+) dBFS"),
+}
+
+
+def _run_measurement(cmd):
+    """Runs a null-muxer measurement pass and returns its decoded stderr, or None on failure."""
+    try:
+        result = tracked_run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, check=True)
+    except subprocess.CalledProcessError:
+        return None
+    return result.stderr.decode('utf-8', errors='replace')
+
+
+def _measure_with_ebur128(abs_path):
+    """
+    Measures loudness with the ebur128 filter (far faster than loudnorm's analysis pass)
+    and maps its summary onto loudnorm's measured_* names. Returns None if unparseable.
+    """
+    stderr = _run_measurement([
+        FFMPEG_EXE,
+        "-hide_banner", "-nostats",
+        "-i", abs_path,
+        "-vn",
+        "-filter_complex", "ebur128=peak=true:framelog=quiet",
+        "-f", "null", "-"
+    ])
+    if stderr is None or "Summary:" not in stderr:
+        return None
+
+    summary = stderr[stderr.rfind("Summary:"):]
+    matches = {key: pattern.search(summary) for key, pattern in _EBUR128_SUMMARY_FIELDS.items()}
+    if not all(matches.values()):
+        return None
+    return {
+        "input_i": matches["input_i"].group(1),
+        "input_thresh": matches["input_i"].group(2),
+        "input_lra": matches["input_lra"].group(1),
+        "input_tp": matches["input_tp"].group(1),
+        # Linear mode applies the I difference directly; no dynamic-pass offset to carry over
+        "target_offset": "0.00",
+    }
+
+
+def _measure_with_pyav(abs_path):
+    """
+    Runs the ebur128 filter in-process through PyAV and reads the running totals it attaches
+    to the last frame (metadata=1). The relative gate isn't exported; I - 10 LU stands in for
+    it, which loudnorm's linear mode only checks against its -70 default. Returns None on failure.
+    """
+    try:
+        with av.open(abs_path) as container:
+            stream = container.streams.audio[0]
+            graph = av.filter.Graph()
+            chain = [
+                graph.add_abuffer(template=stream),
+                graph.add('ebur128', 'metadata=1:peak=true'),
+                graph.add('abuffersink'),
+            ]
+            for upstream, downstream in zip(chain, chain[1:]):
+                upstream.link_to(downstream)
+            graph.configure()
+
+            totals = None
+
+            def drain_graph():
+                nonlocal totals
+                while True:
+                    try:
+                        totals = graph.pull().metadata
+                    except (av.error.BlockingIOError, av.error.EOFError):
+                        return
+
+            for frame in container.decode(stream):
+                graph.push(frame)
+                drain_graph()
+            graph.push(None)
+            drain_graph()
+    except (av.error.FFmpegError, IndexError, ValueError) as e:
+        log.warning("PyAV loudness measurement failed for %s: %s", abs_path, e)
+        return None
+
+    if not totals or "lavfi.r128.I" not in totals or "lavfi.r128.true_peak" not in totals:
+        return None
+    integrated = float(totals["lavfi.r128.I"])
+    true_peak = float(totals["lavfi.r128.true_peak"])
+    return {
+        "input_i": f"{integrated:.2f}",
+        "input_thresh": f"{integrated - 10:.2f}",
+        "input_lra": f"{float(totals.get('lavfi.r128.LRA', 0.0)):.2f}",
+        # Linear peak → dBFS; digital silence gives -inf, which loudnorm_filter rejects
+        "input_tp": f"{20 * math.log10(true_peak):.2f}" if true_peak > 0 else "-inf",
+        "target_offset": "0.00",
+    }
+
+
+def _measure_with_loudnorm(abs_path):
+    """loudnorm's own analysis pass (print_format=json); the JSON block ends its stderr."""
+    stderr = _run_measurement([
+        FFMPEG_EXE,
+        "-hide_banner", "-nostats",
+        "-i", abs_path,
+        "-vn",
+        "-af", f"loudnorm={LOUDNORM_TARGET}:print_format=json",
+        "-f", "null", "-"
+    ])
+    if stderr is None:
+        return None
+    start, end = stderr.rfind('{'), stderr.rfind('}')
+    try:
+        return json.loads(stderr[start:end + 1]) if 0 <= start < end else None
+    except json.JSONDecodeError:
+        return None
+
+
+def _content_key(abs_path, size):
+    """SHA-256 over the first and last LOUDNORM_CACHE_SAMPLE_BYTES of a file plus its size."""
+    digest = hashlib.sha256()
+    with open(abs_path, 'rb') as f:
+        digest.update(f.read(LOUDNORM_CACHE_SAMPLE_BYTES))
+        if size > 2 * LOUDNORM_CACHE_SAMPLE_BYTES:
+            f.seek(-LOUDNORM_CACHE_SAMPLE_BYTES, os.SEEK_END)
+            digest.update(f.read())
+        elif size > LOUDNORM_CACHE_SAMPLE_BYTES:
+            digest.update(f.read())
+    digest.update(str(size).encode('ascii'))
+    return digest.hexdigest()
+
+
+def _load_loudnorm_cache_entry(content_key):
+    """Reads cached measurements for a content key, or None if missing or unreadable."""
+    try:
+        with open(os.path.join(LOUDNORM_CACHE_DIR, f"{content_key}.json"), 'rb') as f:
+            entry = _json_loads(f.read())
+    except (OSError, ValueError):
+        return None
+    return entry if isinstance(entry, dict) and 'input_i' in entry else None
+
+
+def measure_loudness(input_path):
+    """
+    Measures input_path for the linear loudnorm pass.
+    Returns a dict with input_i, input_tp, input_lra, input_thresh and target_offset, or None
+    if measuring fails. Uses ebur128 (in-process through PyAV when available, else an ffmpeg
+    pass), falling back to loudnorm's print_format=json pass. Results are cached in memory
+    while the file is unchanged, and on disk under a head+tail content hash.
+    """
+    abs_path = os.path.abspath(input_path)
+    st = os.stat(abs_path)
+    key = (abs_path, st.st_mtime_ns, st.st_size)
+    with _loudnorm_lock:
+        if key in _loudnorm_measurements:
+            return _loudnorm_measurements[key]
+
+    content_key = _content_key(abs_path, st.st_size)
+    measured = _load_loudnorm_cache_entry(content_key)
+    if measured is None:
+        measured = ((PYAV_AVAILABLE and _measure_with_pyav(abs_path))
+                    or _measure_with_ebur128(abs_path) or _measure_with_loudnorm(abs_path))
+        if measured is None:
+            log.warning("Loudness measurement failed for %s.", input_path)
+            return None
+        _write_cache_entry(LOUDNORM_CACHE_DIR, os.path.join(LOUDNORM_CACHE_DIR, f"{content_key}.json"),
+                           measured, LOUDNORM_CACHE_MAX_ENTRIES)
+
+    with _loudnorm_lock:
+        _loudnorm_measurements[key] = measured
+    return measured
+
+
+def loudnorm_filter(input_path):
+    """
+    Builds the loudnorm filter for the encode pass: linear normalization from the measured
+    values when available, otherwise single-pass dynamic loudnorm.
+    """
+    measured = measure_loudness(input_path)
+    # Silent input measures -inf (loudness or true peak), which loudnorm can't use
+    if not measured or any('inf' in str(v) for v in measured.values()):
+        return f"loudnorm={LOUDNORM_TARGET}"
+    return (
+        f"loudnorm={LOUDNORM_TARGET}"
+        f":measured_I={measured['input_i']}"
+        f":measured_TP={measured['input_tp']}"
+        f":measured_LRA={measured['input_lra']}"
+        f":measured_thresh={measured['input_thresh']}"
+        f":offset={measured['target_offset']}"
+        ":linear=true:print_format=summary"
+    )
+
+def _convert_audio_with_pyav(input_path, output_path, audio_codec, loudnorm=None, bit_rate=192000):
+    """
+    Decodes the first audio stream, optionally runs it through a loudnorm filter graph and
+    encodes it with PyAV. The encoder handles sample format and frame size conversion.
+    """
+    with av.open(input_path) as in_container, av.open(output_path, 'w') as out_container:
+        in_stream = in_container.streams.audio[0]
+        out_stream = out_container.add_stream(audio_codec, rate=in_stream.rate)
+        out_stream.bit_rate = bit_rate
+
+        graph = None
+        if loudnorm:
+            graph = av.filter.Graph()
+            chain = [
+                graph.add_abuffer(template=in_stream),
+                graph.add('loudnorm', loudnorm),
+                # loudnorm works at 192 kHz internally; return to the source rate
+                graph.add('aresample', str(in_stream.rate)),
+                graph.add('abuffersink'),
+            ]
+            for upstream, downstream in zip(chain, chain[1:]):
+                upstream.link_to(downstream)
+            graph.configure()
+
+        def encode(frame):
+            for packet in out_stream.encode(frame):
+                out_container.mux(packet)
+
+        def drain_graph():
+            while True:
+                try:
+                    frame = graph.pull()
+                except (av.error.BlockingIOError, av.error.EOFError):
+                    return
+                frame.pts = None
+                encode(frame)
+
+        for frame in in_container.decode(in_stream):
+            if graph is None:
+                frame.pts = None
+                encode(frame)
+            else:
+                graph.push(frame)
+                drain_graph()
+
+        if graph is not None:
+            graph.push(None)
+            drain_graph()
+        encode(None)
+
+# Encoder name → codec_name ffprobe reports for its output
+_ENCODER_CODEC_NAMES = {
+    "libfdk_aac": "aac",
+    "aac": "aac",
+    "libmp3lame": "mp3",
+    "libopus": "opus",
+    "libvorbis": "vorbis",
+    "flac": "flac",
+}
+
+
+def _can_stream_copy(input_path, audio_codec):
+    """True if the first audio stream of input_path (cached probe) is already in audio_codec's format."""
+    target = _ENCODER_CODEC_NAMES.get(audio_codec, audio_codec)
+    try:
+        stream = _first_stream(_cached_probe(input_path), 'audio')
+    except (subprocess.CalledProcessError, OSError, ValueError):
         return False
+    return bool(stream) and stream.get('codec_name') == target
 
 def convert_audio_with_ffmpeg(input_path, output_path, codec=None, normalize_audio=False):
     """
     Converts audio using FFmpeg, preferring libfdk_aac if available.
+    Without normalization, audio already in the target codec is stream-copied (-c:a copy).
+    Otherwise encodes in-process with PyAV when it is installed, or runs the ffmpeg binary.
     """
     if codec is None:
         if check_fdk_aac_codec():
             audio_codec = "libfdk_aac"
-            print(f"{Fore.GREEN}Using libfdk_aac for audio encoding.{Style.RESET_ALL}")
+            log.info("Using libfdk_aac for audio encoding.")
         else:
             audio_codec = "aac"
-            print(f"{Fore.YELLOW}libfdk_aac not found. Falling back to aac for audio encoding.{Style.RESET_ALL}")
+            log.info("libfdk_aac not found. Falling back to aac for audio encoding.")
     else:
         audio_codec = codec
-        print(f"{Fore.CYAN}Using specified codec: {audio_codec} for audio encoding.{Style.RESET_ALL}")
+        log.info("Using specified codec: %s for audio encoding.", audio_codec)
 
     try:
+        loudnorm = None
+        if normalize_audio:
+            # Two-pass loudnorm: measure first, then normalize linearly with the measured values
+            loudnorm = loudnorm_filter(input_path)
+            mode = "linear two-pass" if "linear=true" in loudnorm else "single-pass"
+            log.info("Applying loudnorm audio normalization (%s) with %s", mode, LOUDNORM_TARGET)
+
+        copy_audio = not normalize_audio and _can_stream_copy(input_path, audio_codec)
+        if copy_audio:
+            log.info("%s is already %s, copying the audio stream instead of re-encoding.", input_path, audio_codec)
+
+        if PYAV_AVAILABLE and not copy_audio:
+            pyav_codec = audio_codec if audio_codec in av.codecs_available else "aac"
+            try:
+                _convert_audio_with_pyav(input_path, output_path, pyav_codec,
+                                         loudnorm[len("loudnorm="):] if loudnorm else None)
+                log.info("Successfully converted %s to %s using %s (PyAV).", input_path, output_path, pyav_codec)
+                return True
+            except Exception as e:
+                log.warning("PyAV conversion failed (%s), falling back to the ffmpeg binary.", e)
+
         cmd = [
             FFMPEG_EXE,
             "-i", input_path,
             "-loglevel","error",
             "-y",
-            "-c:a", audio_codec,
-            "-b:a", "192k", # Example bitrate, adjust as needed
         ]
+        if copy_audio:
+            cmd.extend(["-map", "0:a:0", "-c:a", "copy"])
+        else:
+            cmd.extend([
+                "-c:a", audio_codec,
+                "-b:a", "192k", # Example bitrate, adjust as needed
+            ])
         
-        if normalize_audio:
-            # Add loudnorm audio normalization filter
-            cmd.extend(["-af", "loudnorm=I=-23:TP=-2:LRA=7"])
-            print(f"{Fore.CYAN}Applying loudnorm audio normalization with I=-23:TP=-2:LRA=7{Style.RESET_ALL}")
+        if loudnorm:
+            cmd.extend(["-af", loudnorm])
         
         cmd.append(output_path)
         
-        print(f"Executing FFmpeg command: {' '.join(cmd)}")
+        log.debug("Executing FFmpeg command: %s", cmd)
         tracked_run(cmd, check=True)
-        print(f"{Fore.GREEN}Successfully converted {input_path} to {output_path} using {audio_codec}.{Style.RESET_ALL}")
+        log.info("Successfully converted %s to %s using %s.", input_path, output_path, audio_codec)
         return True
     except subprocess.CalledProcessError as e:
-        print(f"{Fore.RED}Error: FFmpeg failed to convert audio. Command: {' '.join(e.cmd)}. Error: {e.stderr}{Style.RESET_ALL}")
+        log.error("FFmpeg failed to convert audio. Command: %s. Error: %s", e.cmd, e.stderr)
         return False
     except Exception as e:
-        print(f"{Fore.RED}An unexpected error occurred during audio conversion: {e}{Style.RESET_ALL}")
+        log.error("An unexpected error occurred during audio conversion: %s", e)
         return False
\ No newline at end of file
@@ -6,12 +6,28 @@ ROLE: Provides file download and integrity verification utilities
 KEY FUNCTIONS:
   calculate_file_hash(filepath, hash_algorithm) → str | None
     - Returns: SHA256 hex digest (default) or specified algorithm
-    - Reads file in 8KB chunks for memory efficiency
+    - hashlib.file_digest on Python 3.11+, one update over an mmap otherwise
     - Returns None on file not found or error
 
+  download_files(files) → list[tuple]
+    - files: [{"url": ..., "filename": ...}, ...]
+    - Returns: [(success: bool, filename: str), ...] in input order
+    - One asyncio thread, one httpx HTTP/2 client shared by all transfers
+    - Falls back to download_file_concurrent in a thread pool without httpx/h2
+
+  download_is_current(url, filename) → bool
+    - Compares filename against its "<filename>.etag" sidecar (ETag + size)
+      and a HEAD request; False if truncated or changed on the server
+    - Files without a sidecar, or when the server is unreachable, count as current
+
+  record_download(url, filename) → bool
+    - Writes the sidecar after a download; False (and the file is deleted)
+      if the size disagrees with the server's Content-Length
+
   download_file_concurrent(url, filename) → tuple
     - Returns: (success: bool, filename: str)
-    - Streams download to disk in 8KB chunks
+    - Streams download to "<filename>.part" with shutil.copyfileobj in 1 MiB blocks,
+      renamed to filename only once the transfer completes
     - Reports download speed and file size on completion
     - Timeout: 120 seconds for connection
 
@@ -22,27 +38,64 @@ USE CASES:
 
 DEPENDENCIES:
   - hashlib: File hashing (SHA256, MD5, etc.)
+  - httpx + h2 (optional): Async HTTP/2 downloads
   - requests: HTTP downloads with streaming
+  - shutil: Bulk copy of the raw response stream
   - time: Download speed calculation
 """
 
+import asyncio
 import hashlib
+import json
+import mmap
+import os
+import shutil
+import threading
 import time
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import HTTPError as Urllib3HTTPError
+from urllib3.util import Retry
 from utils.file_ops import safe_open
 
+# Optional: httpx + h2 let several downloads share one multiplexed HTTP/2 connection
+try:
+    import httpx
+    import h2  # noqa: F401  (required by httpx for http2=True)
+    HTTP2_DOWNLOADS_AVAILABLE = True
+except ImportError:
+    HTTP2_DOWNLOADS_AVAILABLE = False
+
+# Read/write block size for streamed downloads
+DOWNLOAD_CHUNK_SIZE = 1 << 20
+
+# One pooled session for all downloads and HEAD checks: keep-alive connections are reused
+# across files, and transient connection errors / 5xx responses are retried with backoff
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=8,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=(500, 502, 503, 504)),
+))
+_session.mount("http://", _session.get_adapter("https://"))
+
 def calculate_file_hash(filepath, hash_algorithm="sha256"):
     """
     Calculates the hash of a file.
     Useful for verifying file integrity after download.
     """
-    hasher = hashlib.new(hash_algorithm)
     try:
         with safe_open(filepath, 'rb') as f:
-            while chunk := f.read(8192):
-                hasher.update(chunk)
-        return hasher.hexdigest()
+            if hasattr(hashlib, "file_digest"):
+                # Python 3.11+: streamed inside hashlib, no per-chunk Python loop
+                return hashlib.file_digest(f, hash_algorithm).hexdigest()
+            hasher = hashlib.new(hash_algorithm)
+            if os.fstat(f.fileno()).st_size > 0:
+                # Older Pythons: hash a read-only memory map in a single update call
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    hasher.update(mm)
+            return hasher.hexdigest()
     except FileNotFoundError:
         print(f"Error: File not found at {filepath}")
         return None
@@ -56,27 +109,165 @@ def download_file_concurrent(url, filename):
     """
     print(f"[{filename}] Starting download from {url}...")
     try:
-        with requests.get(url, stream=True, timeout=120) as r:
+        with _session.get(url, stream=True, timeout=120) as r:
             r.raise_for_status()
 
             total_size = int(r.headers.get('content-length', 0))
-            downloaded_size = 0
             start_time = time.time()
 
-            with open(filename, 'wb') as f:
-                for chunk in r.iter_content(chunk_size=8192):
-                    if chunk:
-                        f.write(chunk)
-                        downloaded_size += len(chunk)
+            # Bulk copy from the raw socket stream in 1 MiB blocks (gzip/deflate still decoded)
+            r.raw.decode_content = True
+            with open(_part_path(filename), 'wb') as f:
+                shutil.copyfileobj(r.raw, f, length=DOWNLOAD_CHUNK_SIZE)
+                downloaded_size = f.tell()
+            os.replace(_part_path(filename), filename)
 
             end_time = time.time()
             duration = end_time - start_time
             speed = (downloaded_size / (1024 * 1024)) / duration if duration > 0 else 0
             print(f"\n[{filename}] Successfully downloaded. Size: {downloaded_size / (1024*1024):.2f} MB, Time: {duration:.2f}s, Speed: {speed:.2f} MB/s")
             return True, filename
-    except requests.exceptions.RequestException as e:
+    except (requests.exceptions.RequestException, Urllib3HTTPError) as e:
         print(f"\n[{filename}] Error downloading: {e}")
+        _remove_quietly(_part_path(filename))
         return False, filename
     except IOError as e:
         print(f"\n[{filename}] File system error saving {filename}: {e}")
+        _remove_quietly(_part_path(filename))
         return False, filename
+
+
+async def _download_file_async(client, url, filename):
+    """Streams one URL to disk through a shared httpx.AsyncClient."""
+    print(f"[{filename}] Starting download from {url}...")
+    try:
+        start_time = time.time()
+        async with client.stream("GET", url) as r:
+            r.raise_for_status()
+            with open(_part_path(filename), 'wb') as f:
+                async for chunk in r.aiter_bytes(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                    f.write(chunk)
+                downloaded_size = f.tell()
+        os.replace(_part_path(filename), filename)
+
+        duration = time.time() - start_time
+        speed = (downloaded_size / (1024 * 1024)) / duration if duration > 0 else 0
+        print(f"\n[{filename}] Successfully downloaded. Size: {downloaded_size / (1024*1024):.2f} MB, Time: {duration:.2f}s, Speed: {speed:.2f} MB/s")
+        return True, filename
+    except httpx.HTTPError as e:
+        print(f"\n[{filename}] Error downloading: {e}")
+        _remove_quietly(_part_path(filename))
+        return False, filename
+    except IOError as e:
+        print(f"\n[{filename}] File system error saving {filename}: {e}")
+        _remove_quietly(_part_path(filename))
+        return False, filename
+
+
+async def _download_all_async(files):
+    async with httpx.AsyncClient(http2=True, timeout=120) as client:
+        return await asyncio.gather(*(_download_file_async(client, f["url"], f["filename"]) for f in files))
+
+
+def download_files(files):
+    """
+    Downloads several files at once and returns [(success, filename), ...] in input order.
+    Safe to call from inside a running event loop (the transfers then run on a helper thread).
+    """
+    if not files:
+        return []
+
+    if not HTTP2_DOWNLOADS_AVAILABLE:
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=len(files)) as executor:
+            return list(executor.map(lambda f: download_file_concurrent(f["url"], f["filename"]), files))
+
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(_download_all_async(files))
+
+    # Called synchronously from async code (e.g. app startup): asyncio.run needs its own thread
+    results = []
+    worker = threading.Thread(target=lambda: results.extend(asyncio.run(_download_all_async(files))))
+    worker.start()
+    worker.join()
+    if not results:
+        return [(False, f["filename"]) for f in files]
+    return results
+
+
+def _sidecar_path(filename):
+    return f"{filename}.etag"
+
+
+def _part_path(filename):
+    """Where a download is streamed until it completes, so a failed transfer never sits at filename."""
+    return f"{filename}.part"
+
+
+def _remove_quietly(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def fetch_remote_validators(url, timeout=10):
+    """HEAD request returning (etag, content_length); (None, None) if the server can't be reached."""
+    try:
+        r = _session.head(url, allow_redirects=True, timeout=timeout)
+        r.raise_for_status()
+    except requests.exceptions.RequestException:
+        return None, None
+    length = r.headers.get('content-length')
+    return r.headers.get('ETag'), int(length) if length and length.isdigit() else None
+
+
+def record_download(url, filename):
+    """
+    Stores the server's ETag and the local size next to a finished download.
+    Returns False if the server reports a different Content-Length (truncated download);
+    the file is then deleted, since a file without a sidecar would be trusted on the next start.
+    """
+    etag, remote_size = fetch_remote_validators(url)
+    local_size = os.path.getsize(filename)
+    if remote_size is not None and remote_size != local_size:
+        print(f"[{filename}] Size mismatch: got {local_size} bytes, server reports {remote_size}. Removing it.")
+        _remove_quietly(filename)
+        _remove_quietly(_sidecar_path(filename))
+        return False
+    try:
+        with open(_sidecar_path(filename), 'w', encoding='utf-8') as f:
+            json.dump({"etag": etag, "size": local_size}, f)
+    except OSError as e:
+        print(f"[{filename}] Could not write download sidecar: {e}")
+    return True
+
+
+def download_is_current(url, filename):
+    """
+    True if an existing download can be kept: its size matches the recorded size and the
+    server still reports the same ETag/size. Files downloaded before sidecars existed, and
+    checks while offline, keep the previous "file exists" behaviour.
+    """
+    try:
+        with open(_sidecar_path(filename), 'r', encoding='utf-8') as f:
+            recorded = json.load(f)
+    except (OSError, ValueError):
+        return True
+
+    if os.path.getsize(filename) != recorded.get("size"):
+        print(f"[{filename}] Local size differs from the recorded download (truncated?).")
+        return False
+
+    etag, remote_size = fetch_remote_validators(url)
+    if etag is None and remote_size is None:
+        return True
+    if etag and recorded.get("etag") and etag != recorded["etag"]:
+        print(f"[{filename}] Server has a newer version (ETag changed).")
+        return False
+    if remote_size is not None and remote_size != recorded.get("size"):
+        print(f"[{filename}] Server reports a different size.")
+        return False
+    return True
@@ -0,0 +1,63 @@
+"""
+MODULE: module_log.py - SHARED CONSOLE LOGGING
+
+ROLE: Gives the pipeline modules one console logger setup
+
+RESPONSIBILITIES:
+  - Colors each record by level (the Fore.* conventions of the old prints)
+  - Sends every module's output to stdout, so one job prints on one channel
+  - Applies the same MR_DEBUG=1 gating everywhere
+
+KEY FUNCTIONS:
+  get_logger(name, level=logging.INFO) → logging.Logger
+    - Logger with a stdout handler; ANSI colors only when stdout is a terminal
+    - MR_DEBUG=1 lowers every module to DEBUG (command lines, cleanup traces)
+    - Does not propagate to the root logger, so host apps don't print twice
+
+COLORS:
+  DEBUG magenta, INFO cyan, WARNING yellow, ERROR red
+
+DEPENDENCIES:
+  - colorama (optional): plain text without it
+"""
+import logging
+import os
+import sys
+
+try:
+    from colorama import Fore, Style
+except ImportError:
+    class _NoColor:
+        """Stands in for colorama's Fore/Style: every attribute is an empty string."""
+        def __getattr__(self, _):
+            return ""
+    Fore = Style = _NoColor()
+
+__all__ = ["get_logger"]
+
+DEBUG_ENABLED = os.environ.get("MR_DEBUG") == "1"
+
+
+class _ColorFormatter(logging.Formatter):
+    """Colors the whole record by level, matching the Fore.* conventions used elsewhere."""
+    COLORS = {logging.DEBUG: Fore.MAGENTA, logging.INFO: Fore.CYAN,
+              logging.WARNING: Fore.YELLOW, logging.ERROR: Fore.RED}
+
+    def format(self, record):
+        return f"{self.COLORS.get(record.levelno, '')}{super().format(record)}{Style.RESET_ALL}"
+
+
+def get_logger(name, level=logging.INFO):
+    """
+    Returns the logger for name, writing "%(message)s" lines to stdout at level
+    (DEBUG when MR_DEBUG=1). The handler is added once per logger.
+    """
+    log = logging.getLogger(name)
+    log.setLevel(logging.DEBUG if DEBUG_ENABLED else level)
+    if not log.handlers:
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(_ColorFormatter("%(message)s") if sys.stdout.isatty()
+                             else logging.Formatter("%(message)s"))
+        log.addHandler(handler)
+        log.propagate = False
+    return log
@@ -7,16 +7,19 @@ RESPONSIBILITIES:
   - Validates input file (video/audio) and selects audio track
   - Downloads FFmpeg if not present
   - Extracts source audio to high-quality WAV
-  - Routes to Demucs and/or Spleeter for AI separation
+  - Routes to Demucs and/or Spleeter for AI separation (both run concurrently)
   - Handles segmentation for files >10min (splits into 600s chunks)
   - Calls module_audio for alignment and mixing
-  - Applies final normalization (loudnorm) and encoding
+  - Pads/trims the mixture to the source length (sample-exact filters), loudnorm, audio
+    encoding and the final mux all happen in one ffmpeg run
 
 KEY FUNCTIONS:
-  process_file(input_path, keep_temp, duration, progress_callback) → bool
+  process_file(input_path, keep_temp, duration, progress_callback, *, config, cuda_available) → bool
     - Main entry point, returns True on success
-  load_config(config_path) → dict
-    - Loads video.json settings, falls back to defaults
+    - config / cuda_available let batch callers resolve them once for all files
+  load_config(config_path) → Config
+    - Loads video.json settings into frozen dataclasses, falls back to defaults
+    - Parsed once per file mtime (lru_cache); the frozen result is shared
   is_audio_file() / is_video_file() → bool
     - Extension-based file type detection
 
@@ -30,156 +33,299 @@ SIDE EFFECTS:
   - Creates spleeter_out/ and demucs_out/ directories
 
 DEPENDENCIES:
-  - module_cuda: GPU detection
+  - module_cuda: GPU detection (imported inside process_file; pulls in torch)
   - module_ffmpeg: Audio extraction, duration, conversion
-  - module_spleeter: AI separation (2stems model)
-  - module_demucs: AI separation (htdemucs model)
+  - module_spleeter: AI separation (2stems model, imported inside process_file)
+  - module_demucs: AI separation (htdemucs model, imported inside process_file)
   - module_audio: Alignment via cross-correlation, mixing
+  - module_log: Colored console logger (MR_DEBUG=1 for debug output)
 """
 import json
+import logging
 import os
+import shlex
 import subprocess
 import tempfile
 import shutil
+import stat
 import time
-from colorama import Fore, Back, Style
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from dataclasses import dataclass, field, fields
+from functools import lru_cache
+from typing import Optional, get_args
+
+import soundfile as sf
+
+from module_log import get_logger
+
+# Job progress is the user-facing console output, so it stays at INFO; MR_DEBUG=1 adds the
+# ffmpeg command lines and per-path cleanup traces
+log = get_logger(__name__)
 
 try:
     from services.process_manager import tracked_run
 except ImportError:
     tracked_run = subprocess.run
 
-from module_cuda import check_gpu_cuda_support
-from module_ffmpeg import get_audio_duration, FFMPEG_EXE, convert_audio_with_ffmpeg, get_audio_tracks
-from module_spleeter import separate_with_spleeter
-from module_demucs import separate_with_demucs
-from module_audio import align_audio_tracks, mix_audio_tracks, calculate_audio_lag
+from module_ffmpeg import (get_audio_duration, FFMPEG_EXE, get_audio_tracks, loudnorm_filter,
+                           get_video_codec, get_video_resolution)
+from module_audio import align_and_mix_tracks, gcc_phat_lag
 
-# Supported file extensions
+# Supported file extensions (tuples: main.py concatenates them and passes them to str.endswith)
 VIDEO_EXTENSIONS = ('.mp4', '.mkv', '.mov', '.avi', '.flv', '.webm', '.wmv')
 AUDIO_EXTENSIONS = ('.mp3', '.wav', '.flac', '.aac', '.ogg', '.m4a', '.wma')
 
+# Set forms for is_*_file, matched against os.path.splitext()[1].lower()
+_VIDEO_EXT_SET = frozenset(VIDEO_EXTENSIONS)
+_AUDIO_EXT_SET = frozenset(AUDIO_EXTENSIONS)
+
+# Language priorities for automatic audio track selection (lowercase ISO 639 codes)
+PRIORITY_LANGUAGES = ("hr", "hrv", "sr", "jpn")
+
 # Local temp directory
 TEMP_DIR = "_temp"
 
+# With CUDA, both models only run side by side if at least this much VRAM is free;
+# otherwise they run one after the other so they don't compete for GPU memory
+PARALLEL_MODELS_MIN_FREE_VRAM = 6 * 1024 ** 3
+
+# Final sync check correlates this much of the source and the mixture. Vocals can be sparse
+# at the start, so it is longer than the lag window, but at 8 kHz it is still a small FFT
+SYNC_CHECK_SECONDS = 30
+
+# Start lags below this are treated as detection noise and not compensated
+SYNC_IGNORED_LAG_MS = 1.0
+
+# Directories with more entries than this are removed with one `rm -rf` on POSIX
+FAST_RMTREE_MIN_ENTRIES = 100
+
+
+@dataclass(frozen=True)
+class VideoConfig:
+    codec: str = "copy"
+    bitrate: Optional[str] = None
+    # Re-encodes are scaled to 1920x1080 only when enabled; otherwise the source size is kept
+    scale_to_1080: bool = False
+
+
+@dataclass(frozen=True)
+class AudioConfig:
+    codec: str = "aac"
+    bitrate: Optional[str] = "192k"
+
+
+@dataclass(frozen=True)
+class OutputConfig:
+    format: str = "mp4"
+
+
+@dataclass(frozen=True)
+class ProcessingConfig:
+    demucs_workers: int = 2
+    skip_video_encoding: bool = False
+    # Run Spleeter and Demucs side by side when both are selected (see PARALLEL_MODELS_MIN_FREE_VRAM)
+    parallel_models: bool = True
+
+
+@dataclass(frozen=True)
+class Config:
+    """Validated video.json settings; frozen, so one instance is shared by every caller."""
+    video: VideoConfig = field(default_factory=VideoConfig)
+    audio: AudioConfig = field(default_factory=AudioConfig)
+    output: OutputConfig = field(default_factory=OutputConfig)
+    processing: ProcessingConfig = field(default_factory=ProcessingConfig)
+
+
 # Default configuration
-DEFAULT_CONFIG = {
-    "video": {
-        "codec": "copy",
-        "bitrate": None
-    },
-    "audio": {
-        "codec": "aac",
-        "bitrate": "192k"
-    },
-    "output": {
-        "format": "mp4"
-    },
-    "processing": {
-        "demucs_workers": 2,
-        "skip_video_encoding": False
-    }
+DEFAULT_CONFIG = Config()
+
+# How a bad value is described in the validation error, per accepted types
+_TYPE_DESCRIPTIONS = {
+    (str,): "a string",
+    (str, type(None)): "a string (e.g., '192k') or null",
+    (int,): "an integer",
+    (bool,): "a boolean",
 }
 
+
+def _build_section(section_cls, name, values):
+    """
+    Builds one config section from its JSON object. Each known key is checked against the
+    field's annotation (Optional[X] also accepts null); unknown keys are ignored.
+    """
+    if not isinstance(values, dict):
+        raise ValueError(f"'{name}' must be an object")
+    kwargs = {}
+    for f in fields(section_cls):
+        if f.name not in values:
+            continue
+        accepted = get_args(f.type) or (f.type,)
+        value = values[f.name]
+        # bool is an int subclass; only accept it where a bool is declared
+        if not isinstance(value, accepted) or (isinstance(value, bool) and bool not in accepted):
+            raise ValueError(f"'{name}.{f.name}' must be {_TYPE_DESCRIPTIONS[accepted]}")
+        kwargs[f.name] = value
+    return section_cls(**kwargs)
+
+
 def load_config(config_path='data/video.json'):
     """
     Loads and validates the video.json configuration file.
-    Returns a validated config dict, falling back to defaults on any error.
+    Returns a frozen Config, falling back to defaults on any error.
+    The parsed result is cached per file mtime and shared between callers.
     """
-    config = DEFAULT_CONFIG.copy()
-    
-    if not os.path.exists(config_path):
-        print(f"{Fore.YELLOW}Config file '{config_path}' not found. Using default settings.{Style.RESET_ALL}")
-        return config
-    
+    try:
+        mtime_ns = os.stat(config_path).st_mtime_ns
+    except OSError:
+        log.warning("Config file '%s' not found. Using default settings.", config_path)
+        return DEFAULT_CONFIG
+
+    return _load_config_cached(config_path, mtime_ns)
+
+
+@lru_cache(maxsize=4)
+def _load_config_cached(config_path, mtime_ns):
+    """Parses and validates config_path; keyed by mtime so edits to the file are picked up."""
     try:
         with open(config_path, 'r', encoding='utf-8') as f:
             user_config = json.load(f)
-        
-        # Validate and merge user config with defaults
+
+        # Validate user config; missing sections and keys keep their defaults
         if not isinstance(user_config, dict):
             raise ValueError("Config must be a JSON object")
-        
-        # Validate video settings
-        if 'video' in user_config:
-            if not isinstance(user_config['video'], dict):
-                raise ValueError("'video' must be an object")
-            video_config = user_config['video']
-            if 'codec' in video_config:
-                if not isinstance(video_config['codec'], str):
-                    raise ValueError("'video.codec' must be a string")
-                config['video']['codec'] = video_config['codec']
-            if 'bitrate' in video_config:
-                if video_config['bitrate'] is not None and not isinstance(video_config['bitrate'], str):
-                    raise ValueError("'video.bitrate' must be a string (e.g., '1800k') or null")
-                config['video']['bitrate'] = video_config['bitrate']
-        
-        # Validate audio settings
-        if 'audio' in user_config:
-            if not isinstance(user_config['audio'], dict):
-                raise ValueError("'audio' must be an object")
-            audio_config = user_config['audio']
-            if 'codec' in audio_config:
-                if not isinstance(audio_config['codec'], str):
-                    raise ValueError("'audio.codec' must be a string")
-                config['audio']['codec'] = audio_config['codec']
-            if 'bitrate' in audio_config:
-                if audio_config['bitrate'] is not None and not isinstance(audio_config['bitrate'], str):
-                    raise ValueError("'audio.bitrate' must be a string (e.g., '128k') or null")
-                config['audio']['bitrate'] = audio_config['bitrate']
-        
-        # Validate output settings
-        if 'output' in user_config:
-            if not isinstance(user_config['output'], dict):
-                raise ValueError("'output' must be an object")
-            output_config = user_config['output']
-            if 'format' in output_config:
-                if not isinstance(output_config['format'], str):
-                    raise ValueError("'output.format' must be a string")
-                config['output']['format'] = output_config['format']
-        
-        # Validate processing settings
-        if 'processing' in user_config:
-            if not isinstance(user_config['processing'], dict):
-                raise ValueError("'processing' must be an object")
-            proc_config = user_config['processing']
-            if 'demucs_workers' in proc_config:
-                if not isinstance(proc_config['demucs_workers'], int):
-                    raise ValueError("'processing.demucs_workers' must be an integer")
-                config['processing'] = {'demucs_workers': proc_config['demucs_workers']}
-        else:
-            config['processing'] = {'demucs_workers': 2} # Default
-        
-        print(f"{Fore.GREEN}Configuration loaded successfully from '{config_path}'.{Style.RESET_ALL}")
+        config = Config(**{
+            f.name: _build_section(f.default_factory, f.name, user_config[f.name])
+            for f in fields(Config) if f.name in user_config
+        })
+
+        log.info("Configuration loaded successfully from '%s'.", config_path)
         return config
-        
+
     except json.JSONDecodeError as e:
-        print(f"{Fore.RED}Error: Invalid JSON in '{config_path}': {e}{Style.RESET_ALL}")
-        print(f"{Fore.YELLOW}Using default settings.{Style.RESET_ALL}")
-        return DEFAULT_CONFIG.copy()
+        log.error("Error: Invalid JSON in '%s': %s", config_path, e)
+        log.warning("Using default settings.")
+        return DEFAULT_CONFIG
     except ValueError as e:
-        print(f"{Fore.RED}Error: Invalid configuration in '{config_path}': {e}{Style.RESET_ALL}")
-        print(f"{Fore.YELLOW}Using default settings.{Style.RESET_ALL}")
-        return DEFAULT_CONFIG.copy()
+        log.error("Error: Invalid configuration in '%s': %s", config_path, e)
+        log.warning("Using default settings.")
+        return DEFAULT_CONFIG
     except Exception as e:
-        print(f"{Fore.RED}Error: Could not load '{config_path}': {e}{Style.RESET_ALL}")
-        print(f"{Fore.YELLOW}Using default settings.{Style.RESET_ALL}")
-        return DEFAULT_CONFIG.copy()
+        log.error("Error: Could not load '%s': %s", config_path, e)
+        log.warning("Using default settings.")
+        return DEFAULT_CONFIG
+
+
+def _run_ffmpeg(cmd, **kwargs):
+    """
+    Runs an ffmpeg command through tracked_run with check=True and 1 MB pipe buffers.
+    Callers run ffmpeg with -loglevel error, so a piped stderr only carries the failure
+    reason. Echoes the command line at DEBUG level (MR_DEBUG=1).
+    """
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug("\nExecuting: %s", shlex.join(cmd))
+    return tracked_run(cmd, check=True, bufsize=1 << 20, **kwargs)
+
+
+def _fast_rmtree(path):
+    """
+    Removes a directory tree. Large trees on POSIX (segment directories with hundreds of
+    chunks) go to a single `rm -rf` instead of one Python-level unlink per file; everything
+    else uses shutil.rmtree without per-file error handling. Raises OSError if the tree survives.
+    """
+    large = False
+    if os.name == 'posix':
+        with os.scandir(path) as entries:
+            large = sum(1 for _ in entries) > FAST_RMTREE_MIN_ENTRIES
+    if large:
+        # Plain subprocess.run: cleanup must still work while tracked_run refuses new processes at shutdown
+        subprocess.run(["rm", "-rf", "--", path], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False)
+    else:
+        shutil.rmtree(path, ignore_errors=True)
+    if os.path.exists(path):
+        raise OSError("directory still present after removal")
+
+
+def _is_nonempty_file(path):
+    """True if path is set and names a file with data (a single stat call)."""
+    if not path:
+        return False
+    try:
+        return os.stat(path).st_size > 0
+    except OSError:
+        return False
+
+
+def _safe_remove(path):
+    """
+    Removes a temp file or directory tree if it still exists. Returns the error line on
+    failure, else None (successful removals are only logged at DEBUG level).
+    """
+    # One stat answers both "still there?" and "file or directory?"
+    try:
+        is_dir = stat.S_ISDIR(os.stat(path).st_mode)
+    except FileNotFoundError:
+        return None
+    except OSError as e:
+        return f"Error removing {path}: {e}"
+    label = "temporary directory" if is_dir else "temporary file"
+    try:
+        if is_dir:
+            _fast_rmtree(path)
+        else:
+            os.remove(path)
+        log.debug("Removed %s: %s", label, path)
+        return None
+    except FileNotFoundError:
+        return None
+    except OSError as e:
+        return f"Error removing {label} {path}: {e}"
+
+
+def _make_task_workspace():
+    """
+    Creates a unique workspace directory under TEMP_DIR. TEMP_DIR itself is only
+    (re)created when mkdtemp reports it missing, so back-to-back jobs skip the makedirs.
+    """
+    try:
+        return tempfile.mkdtemp(dir=TEMP_DIR)
+    except FileNotFoundError:
+        os.makedirs(TEMP_DIR, exist_ok=True)
+        return tempfile.mkdtemp(dir=TEMP_DIR)
+
+
+def _remove_temp_paths(paths):
+    """
+    Cleanup callback: deletes all paths concurrently (the syscalls release the GIL,
+    which matters for segment directories with hundreds of chunks), then logs the
+    failures in order so log lines don't interleave.
+    """
+    if not paths:
+        return
+    with ThreadPoolExecutor(max_workers=min(4, len(paths))) as ex:
+        messages = list(ex.map(_safe_remove, paths))
+    for message in messages:
+        if message:
+            log.error(message)
 
 
 def is_audio_file(file_path):
     """Check if the file is an audio-only file."""
-    return file_path.lower().endswith(AUDIO_EXTENSIONS)
+    return os.path.splitext(file_path)[1].lower() in _AUDIO_EXT_SET
 
 
 def is_video_file(file_path):
     """Check if the file is a video file."""
-    return file_path.lower().endswith(VIDEO_EXTENSIONS)
+    return os.path.splitext(file_path)[1].lower() in _VIDEO_EXT_SET
 
-def process_file(input_file, keep_temp=False, duration=None, progress_callback=None, model="both", skip_video_encoding=None):
+def process_file(input_file, keep_temp=False, duration=None, progress_callback=None, model="both", skip_video_encoding=None,
+                 *, config=None, cuda_available=None):
     """
     Process a video or audio file to separate vocals.
     Handles both video files (creates new video with vocals) and audio files (creates vocals-only audio).
+
+    Batch drivers may pass config (a load_config() result) and cuda_available once for all
+    files; when omitted they are looked up here (both lookups are cached).
     """
     total_start = time.time()
     timings = {}
@@ -189,69 +335,67 @@ def process_file(input_file, keep_temp=False, duration=None, progress_callback=N
 
     is_audio_only = is_audio_file(input_file)
     if not os.path.exists(input_file):
-        print(f"{Fore.RED}Error: Input video file '{input_file}' not found.{Style.RESET_ALL}")
+        log.error("Error: Input video file '%s' not found.", input_file)
         return False, timings
 
-    # Ensure local temp directory exists
-    os.makedirs(TEMP_DIR, exist_ok=True)
+    # Deferred until a file is actually processed: module_cuda imports torch,
+    # and the separators are only needed from here on
+    from module_cuda import check_gpu_cuda_support, get_free_vram_bytes
+    from module_spleeter import separate_with_spleeter
+    from module_demucs import separate_with_demucs
+
+    # Load and validate configuration once; used for separation workers and output settings
+    settings = config if config is not None else load_config('data/video.json')
 
     original_duration = get_audio_duration(input_file)
     if original_duration is None:
-        print(f"{Fore.YELLOW}Warning: Could not determine audio duration for the original video.{Style.RESET_ALL}")
+        log.warning("Warning: Could not determine audio duration for the original video.")
 
-    print(f"\n{Back.MAGENTA}{Fore.WHITE}# SISTEMSKA PROVJERA {Style.RESET_ALL}")
+    log.info("\n# SISTEMSKA PROVJERA")
 
-    cuda_is_available = check_gpu_cuda_support()
+    cuda_is_available = cuda_available if cuda_available is not None else check_gpu_cuda_support()
 
     if not cuda_is_available:
-        print(f"{Fore.RED}GPU akceleracija nije podržana.{Style.RESET_ALL}")
+        log.warning("GPU akceleracija nije podržana.")
     else:
-        print(f"{Fore.GREEN}GPU akceleracija podržana.{Style.RESET_ALL}")
+        log.info("GPU akceleracija podržana.")
 
-    # FIX: Create ALL temp file paths upfront and track them for guaranteed cleanup
-    temp_files_to_cleanup = []
-    
-    temp_audio_wav_file = tempfile.NamedTemporaryFile(suffix=".wav", delete=False, dir=TEMP_DIR)
-    temp_audio_wav_path = temp_audio_wav_file.name
-    temp_audio_wav_file.close()
-    temp_files_to_cleanup.append(temp_audio_wav_path)
+    # Create a unique workspace for this specific process call to avoid collisions in batch mode.
+    # FIX: Every temp file lives inside it, so cleanup is one rmtree of the workspace
+    # (plus the separators' segment directories) when the stack closes
+    cleanup = ExitStack()
+    cleanup_paths = []
+    if not keep_temp:
+        cleanup.callback(_remove_temp_paths, cleanup_paths)
 
-    base_audio_name_no_ext = os.path.splitext(os.path.basename(temp_audio_wav_path))[0]
+    task_workspace = _make_task_workspace()
+    if not keep_temp:
+        cleanup_paths.append(task_workspace)
 
-    # Create a unique workspace for this specific process call to avoid collisions in batch mode
-    task_id_name = os.path.basename(temp_audio_wav_path).split('.')[0]
-    task_workspace = os.path.join(TEMP_DIR, task_id_name)
-    os.makedirs(task_workspace, exist_ok=True)
+    def make_temp(suffix):
+        # mkstemp hands back an fd we close at once; no NamedTemporaryFile object to manage
+        fd, path = tempfile.mkstemp(suffix=suffix, dir=task_workspace)
+        os.close(fd)
+        return path
 
-    spleeter_out_path = os.path.join(task_workspace, "spleeter_out")
-    demucs_base_out_path = os.path.join(task_workspace, "demucs_out")
+    temp_audio_wav_path = make_temp(".wav")
 
-    temp_vocal_mixture_wav_file = tempfile.NamedTemporaryFile(suffix=".wav", delete=False, dir=TEMP_DIR)
-    vocal_mixture_wav_path = temp_vocal_mixture_wav_file.name
-    temp_vocal_mixture_wav_file.close()
-    temp_files_to_cleanup.append(vocal_mixture_wav_path)
+    base_audio_name_no_ext = os.path.splitext(os.path.basename(temp_audio_wav_path))[0]
 
-    temp_aligned_spleeter_vocals = tempfile.NamedTemporaryFile(suffix="_aligned_spleeter.wav", delete=False, dir=TEMP_DIR)
-    aligned_spleeter_vocals_path = temp_aligned_spleeter_vocals.name
-    temp_aligned_spleeter_vocals.close()
-    temp_files_to_cleanup.append(aligned_spleeter_vocals_path)
+    spleeter_out_path = os.path.join(task_workspace, "spleeter_out")
+    demucs_base_out_path = os.path.join(task_workspace, "demucs_out")
 
-    temp_aligned_demucs_vocals = tempfile.NamedTemporaryFile(suffix="_aligned_demucs.wav", delete=False, dir=TEMP_DIR)
-    aligned_demucs_vocals_path = temp_aligned_demucs_vocals.name
-    temp_aligned_demucs_vocals.close()
-    temp_files_to_cleanup.append(aligned_demucs_vocals_path)
+    vocal_mixture_wav_path = make_temp(".wav")
 
     temp_spleeter_segments_dir = None
     spleeter_vocal_wav_path = None
     temp_demucs_segments_dir = None
     demucs_vocal_wav_path = None
-    combined_vocals_aac_path = None
 
     try:
         file_type = "audio" if is_audio_only else "video"
-        print(f"\n{Back.YELLOW}{Fore.BLACK}# MUSIC REMOVAL STARTED FOR {input_file} ({file_type} file) ---")
-        print(f"Model selection: {model}")
-        print(f"{Style.RESET_ALL}")
+        log.info("\n# MUSIC REMOVAL STARTED FOR %s (%s file) ---", input_file, file_type)
+        log.info("Model selection: %s\n", model)
 
         # Step 0: Audio Track Selection
         selected_track_index = None
@@ -260,264 +404,236 @@ def process_file(input_file, keep_temp=False, duration=None, progress_callback=N
 
         if not audio_tracks:
             update_progress("Error: No audio tracks found", 0)
-            print(f"{Fore.RED}Error: No audio tracks found in '{input_file}'. Aborting.{Style.RESET_ALL}")
+            log.error("Error: No audio tracks found in '%s'. Aborting.", input_file)
             return False, timings
 
         if not is_audio_only:
-            # Language priorities for automatic selection
-            priority_languages = ["hr", "hrv", "sr","jpn"]
-            selected_track = None
-
-            # Try to find a track matching priority languages
-            for lang in priority_languages:
-                for track in audio_tracks:
-                    if track['language'].lower() == lang:
-                        selected_track = track
-                        break
-                if selected_track:
-                    break
-            
-            # Default to first track if no match found
-            if not selected_track:
-                selected_track = audio_tracks[0]
-            
+            # First track per language, then the first priority language present;
+            # default to first track if no match found
+            by_lang = {}
+            for track in audio_tracks:
+                by_lang.setdefault(track['language'].lower(), track)
+            selected_track = next((by_lang[lang] for lang in PRIORITY_LANGUAGES if lang in by_lang), audio_tracks[0])
+
             selected_track_index = selected_track['index']
-            print(f"{Fore.GREEN}Selected audio track: Language: {selected_track['language']}, Stream Index: {selected_track['index']}{Style.RESET_ALL}\n")
+            log.info("Selected audio track: Language: %s, Stream Index: %s\n", selected_track['language'], selected_track['index'])
         else:
             # For audio-only files, we use the first available audio track (usually only one)
-            selected_track_index = audio_tracks[0]['index']
-            print(f"{Fore.GREEN}Processing audio file with track index: {selected_track_index}{Style.RESET_ALL}\n")
+            selected_track = audio_tracks[0]
+            selected_track_index = selected_track['index']
+            log.info("Processing audio file with track index: %s\n", selected_track_index)
 
         # Step 1: Export Source to High-Quality WAV for processing
-        print(f"{Fore.CYAN}1. Extracting audio to temporary WAV: {temp_audio_wav_path}...{Style.RESET_ALL}")
+        log.info("1. Extracting audio to temporary WAV: %s...", temp_audio_wav_path)
         extract_start = time.time()
         update_progress("Extracting audio", 10)
-        ffmpeg_cmd = [FFMPEG_EXE, "-y", "-i", input_file]
+        ffmpeg_cmd = [FFMPEG_EXE, "-loglevel", "error", "-y", "-i", input_file]
         if duration:
             ffmpeg_cmd.extend(["-t", str(duration)])
-            print(f"{Fore.YELLOW}Limiting processing to first {duration} seconds.{Style.RESET_ALL}")
+            log.warning("Limiting processing to first %s seconds.", duration)
 
         if selected_track_index is not None:
             ffmpeg_cmd.extend(["-map", f"0:{selected_track_index}"])
 
-        # Downmix to stereo (Demucs/Spleeter prefer 2 channels)
-        ffmpeg_cmd.extend(["-ac", "2"])
-        ffmpeg_cmd.append(temp_audio_wav_path)
+        # Downmix to stereo (Demucs/Spleeter prefer 2 channels); channel count comes from
+        # the cached probe, so stereo sources skip the downmix filter entirely
+        if selected_track.get('channels') != 2:
+            ffmpeg_cmd.extend(["-ac", "2"])
+        ffmpeg_cmd.extend(["-c:a", "pcm_s16le", temp_audio_wav_path])
 
-        print(f"{Fore.MAGENTA}Executing: {' '.join(ffmpeg_cmd)}\n")
         try:
-            # FIX: Capture stderr to show meaningful error messages, use UTF-8 to handle emojis
-            result = tracked_run(ffmpeg_cmd, check=True, capture_output=True, text=True, encoding='utf-8', errors='replace')
-            print(f"{Fore.GREEN}Audio extraction complete.\n{Style.RESET_ALL}")
+            # FIX: Capture stderr to show meaningful error messages
+            _run_ffmpeg(ffmpeg_cmd, capture_output=True)
+            log.info("Audio extraction complete.\n")
         except subprocess.CalledProcessError as e:
-            # FIX: Display FFmpeg error output for debugging
-            print(f"{Fore.RED}Error extracting audio: {e}{Style.RESET_ALL}")
+            # FIX: Display FFmpeg error output for debugging, use UTF-8 to handle emojis
+            log.error("Error extracting audio: %s", e)
             if e.stderr:
-                print(f"{Fore.RED}FFmpeg error output: {e.stderr[:500]}{Style.RESET_ALL}")
+                log.error("FFmpeg error output: %s", e.stderr.decode('utf-8', errors='replace')[:500])
             return False, timings
         
         extract_end = time.time()
         timings['extract'] = extract_end - extract_start
-        print(f"{Fore.GREEN}Audio extraction took {timings['extract']:.2f}s{Style.RESET_ALL}")
+        log.info("Audio extraction took %.2fs", timings['extract'])
 
         # Step 2 & 3: Run AI Source Separation Models
-        settings = load_config('data/video.json')
-        demucs_workers = settings.get('processing', {}).get('demucs_workers', 2)
+        demucs_workers = settings.processing.demucs_workers
 
         # Both models return (path_to_wav, temp_segments_dir)
-        if model == "spleeter" or model == "both":
-            print(f"{Fore.CYAN}Starting Spleeter separation...{Style.RESET_ALL}")
+        def run_spleeter():
+            log.info("Starting Spleeter separation...")
             s_start = time.time()
-            update_progress("Running Spleeter", 20 if model == "both" else 15)
-            spleeter_vocal_wav_path, temp_spleeter_segments_dir = separate_with_spleeter(temp_audio_wav_path, spleeter_out_path, base_audio_name_no_ext)
-            s_end = time.time()
-            timings['spleeter'] = s_end - s_start
-            print(f"{Fore.GREEN}Spleeter took {timings['spleeter']:.2f}s{Style.RESET_ALL}")
-        else:
-            print(f"{Fore.YELLOW}Skipping Spleeter based on model selection.{Style.RESET_ALL}")
+            result = separate_with_spleeter(temp_audio_wav_path, spleeter_out_path, base_audio_name_no_ext)
+            timings['spleeter'] = time.time() - s_start
+            log.info("Spleeter took %.2fs", timings['spleeter'])
+            return result
 
-        if model == "demucs" or model == "both":
-            print(f"{Fore.CYAN}Starting Demucs separation...{Style.RESET_ALL}")
+        def run_demucs():
+            log.info("Starting Demucs separation...")
             d_start = time.time()
-            update_progress("Running Demucs", 50 if model == "both" else 15)
-            demucs_vocal_wav_path, temp_demucs_segments_dir = separate_with_demucs(
+            result = separate_with_demucs(
                 temp_audio_wav_path, demucs_base_out_path, base_audio_name_no_ext, max_workers=demucs_workers
             )
-            d_end = time.time()
-            timings['demucs'] = d_end - d_start
-            print(f"{Fore.GREEN}Demucs took {timings['demucs']:.2f}s{Style.RESET_ALL}")
+            timings['demucs'] = time.time() - d_start
+            log.info("Demucs took %.2fs", timings['demucs'])
+            return result
+
+        run_models_in_parallel = settings.processing.parallel_models
+        if model == "both" and run_models_in_parallel and cuda_is_available:
+            free_vram = get_free_vram_bytes()
+            if free_vram is not None and free_vram < PARALLEL_MODELS_MIN_FREE_VRAM:
+                log.warning("Only %.1f GB of VRAM free. Running Spleeter and Demucs one after the other.", free_vram / 1024 ** 3)
+                run_models_in_parallel = False
+
+        if model == "both" and run_models_in_parallel:
+            # The outputs are independent until alignment, so run both models side by side
+            # (Spleeter is a subprocess and Demucs releases the GIL inside torch)
+            update_progress("Running separation models", 20)
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                spleeter_future = executor.submit(run_spleeter)
+                demucs_future = executor.submit(run_demucs)
+                spleeter_vocal_wav_path, temp_spleeter_segments_dir = spleeter_future.result()
+                demucs_vocal_wav_path, temp_demucs_segments_dir = demucs_future.result()
+        elif model == "both":
+            update_progress("Running Spleeter", 20)
+            spleeter_vocal_wav_path, temp_spleeter_segments_dir = run_spleeter()
+            update_progress("Running Demucs", 50)
+            demucs_vocal_wav_path, temp_demucs_segments_dir = run_demucs()
+        elif model == "spleeter":
+            update_progress("Running Spleeter", 15)
+            spleeter_vocal_wav_path, temp_spleeter_segments_dir = run_spleeter()
+            log.warning("Skipping Demucs based on model selection.")
+        elif model == "demucs":
+            log.warning("Skipping Spleeter based on model selection.")
+            update_progress("Running Demucs", 15)
+            demucs_vocal_wav_path, temp_demucs_segments_dir = run_demucs()
         else:
-            print(f"{Fore.YELLOW}Skipping Demucs based on model selection.{Style.RESET_ALL}")
+            log.warning("Skipping Spleeter based on model selection.")
+            log.warning("Skipping Demucs based on model selection.")
+
+        if not keep_temp:
+            for segments_dir in (temp_spleeter_segments_dir, temp_demucs_segments_dir):
+                if segments_dir:
+                    cleanup_paths.append(segments_dir)
 
         # Step 4: Logic for Alinging and Mixing the results
-        print(f"{Fore.CYAN}4. Aligning and combining Spleeter (WAV) and Demucs (WAV) vocals...{Style.RESET_ALL}\n")
+        log.info("4. Aligning and combining Spleeter (WAV) and Demucs (WAV) vocals...\n")
 
-        spleeter_input_exists = spleeter_vocal_wav_path and os.path.exists(spleeter_vocal_wav_path) and os.path.getsize(spleeter_vocal_wav_path) > 0
-        demucs_input_exists = demucs_vocal_wav_path and os.path.exists(demucs_vocal_wav_path) and os.path.getsize(demucs_vocal_wav_path) > 0
+        spleeter_input_exists = _is_nonempty_file(spleeter_vocal_wav_path)
+        demucs_input_exists = _is_nonempty_file(demucs_vocal_wav_path)
 
         if not spleeter_input_exists and not demucs_input_exists:
-            print(f"{Fore.RED}Error: Neither Spleeter nor Demucs vocal files were successfully generated.{Style.RESET_ALL}")
+            log.error("Error: Neither Spleeter nor Demucs vocal files were successfully generated.")
             return False, timings
         
-        # Branching logic for when only one model succeeds
+        # Branching logic for when only one model succeeds: its WAV is the mixture as-is
+        # (no copy; the final ffmpeg call reads it directly)
         elif not spleeter_input_exists:
-            print(f"{Fore.YELLOW}Only Demucs vocals found. Using Demucs vocals directly.{Style.RESET_ALL}")
-            try:
-                # Copy Demucs WAV to our vocal mixture path (still WAV)
-                shutil.copy2(demucs_vocal_wav_path, vocal_mixture_wav_path)
-                print(f"{Fore.GREEN}Demucs vocals ready for mixing.{Style.RESET_ALL}")
-            except Exception as e:
-                print(f"{Fore.RED}Error copying Demucs vocals: {e}{Style.RESET_ALL}")
-                return False, timings
+            log.warning("Only Demucs vocals found. Using Demucs vocals directly.")
+            vocal_mixture_wav_path = demucs_vocal_wav_path
+            log.info("Demucs vocals ready for mixing.")
         elif not demucs_input_exists:
-            print(f"{Fore.YELLOW}Only Spleeter vocals found. Using Spleeter vocals directly.{Style.RESET_ALL}")
-            try:
-                shutil.copy2(spleeter_vocal_wav_path, vocal_mixture_wav_path)
-                print(f"{Fore.GREEN}✔ Spleeter vocals ready for mixing.{Style.RESET_ALL}")
-            except Exception as e:
-                print(f"{Fore.RED}Error copying Spleeter vocals: {e}{Style.RESET_ALL}")
-                return False, timings
+            log.warning("Only Spleeter vocals found. Using Spleeter vocals directly.")
+            vocal_mixture_wav_path = spleeter_vocal_wav_path
+            log.info("✔ Spleeter vocals ready for mixing.")
         else:
             # When both exist, perform cross-correlation alignment to fix any millisecond offsets
-            print(f"{Fore.CYAN}Starting alignment and mixing...{Style.RESET_ALL}")
+            log.info("Starting alignment and mixing...")
             mix_start = time.time()
-            update_progress("Aligning audio tracks", 80)
-            aligned_spleeter, aligned_demucs = align_audio_tracks(spleeter_vocal_wav_path, demucs_vocal_wav_path, aligned_spleeter_vocals_path, aligned_demucs_vocals_path)
+            update_progress("Aligning and mixing vocals", 80)
 
-            if aligned_spleeter and aligned_demucs:
-                # Mix both aligned tracks into a temporary file
-                temp_mixed_wav_path = tempfile.NamedTemporaryFile(suffix="_mixed.wav", delete=False)
-                temp_mixed_wav_path.close()
-                
-                try:
-                    # Equal weight mix (0.5 each)
-                    update_progress("Mixing vocals", 90)
-                    mixed_result = mix_audio_tracks(aligned_spleeter, aligned_demucs, vocal_mixture_wav_path, volume1=0.5, volume2=0.5)
-                    
-                    if mixed_result:
-                        print(f"\n{Fore.GREEN}✔ Vocals combined successfully.{Style.RESET_ALL}")
-                    else:
-                        print(f"{Fore.RED}Error: Mixing of aligned vocal tracks failed.{Style.RESET_ALL}")
-                        return False, timings
-                except subprocess.CalledProcessError as e:
-                    print(f"{Fore.RED}Error with mixed audio conversion: {e}{Style.RESET_ALL}")
-                    return False, timings
-                finally:
-                    if os.path.exists(temp_mixed_wav_path.name):
-                        try:
-                            os.remove(temp_mixed_wav_path.name)
-                        except OSError:
-                            pass
+            # Alignment and the equal weight mix (0.5 each) run as one in-memory pass
+            mixed_result = align_and_mix_tracks(spleeter_vocal_wav_path, demucs_vocal_wav_path, vocal_mixture_wav_path, volume1=0.5, volume2=0.5)
+
+            if mixed_result:
+                log.info("\n✔ Vocals combined successfully.")
             else:
-                print(f"{Fore.RED}Error: Alignment failed. Cannot combine vocal tracks.{Style.RESET_ALL}")
+                log.error("Error: Alignment or mixing of vocal tracks failed.")
                 return False, timings
             
             mix_end = time.time()
             timings['mixing'] = mix_end - mix_start
-            print(f"{Fore.GREEN}Alignment and mixing took {timings['mixing']:.2f}s{Style.RESET_ALL}")
+            log.info("Alignment and mixing took %.2fs", timings['mixing'])
 
         # Smarter synchronization: Only pad the start based on detected lag, then pad the end.
-        original_audio_duration = get_audio_duration(temp_audio_wav_path)
-        processed_audio_duration = get_audio_duration(vocal_mixture_wav_path)
-        
+        # The sync filters, loudnorm, the audio encode and (for video) the mux run as a single ffmpeg call.
+        # Both WAVs were just written here, so one header read each gives length and rate
+        ref_info = sf.info(temp_audio_wav_path)
+        ref_sr = ref_info.samplerate
+        original_audio_duration = ref_info.duration
+        mixture_info = sf.info(vocal_mixture_wav_path)
+        mixture_sample_rate = mixture_info.samplerate
+        processed_audio_duration = mixture_info.duration
+
+        audio_filter_parts = []
         if original_audio_duration and processed_audio_duration:
-            import soundfile as sf
-            
             # Step 4b: Detect REAL lag between original and processed mixture
-            print(f"{Fore.CYAN}4. Final synchronization check...{Style.RESET_ALL}")
+            log.info("4. Final synchronization check...")
             sync_start = time.time()
+            lag_ms = 0
             try:
                 # Optimization: Read only the beginning of files for lag detection
-                # We need the sample rates first
-                ref_info = sf.info(temp_audio_wav_path)
-                ref_sr = ref_info.samplerate
-                proc_info = sf.info(vocal_mixture_wav_path)
-                proc_sr = proc_info.samplerate
-
-                # Read only up to 120 seconds of frames
-                max_frames_ref = int(ref_sr * 120)
-                max_frames_proc = int(proc_sr * 120)
-
-                ref_audio_segment, _ = sf.read(temp_audio_wav_path, frames=max_frames_ref)
-                proc_audio_segment, _ = sf.read(vocal_mixture_wav_path, frames=max_frames_proc)
+                proc_sr = mixture_sample_rate
+
+                # Read only the first SYNC_CHECK_SECONDS of frames
+                max_frames_ref = int(ref_sr * SYNC_CHECK_SECONDS)
+                max_frames_proc = int(proc_sr * SYNC_CHECK_SECONDS)
+
+                ref_audio_segment, _ = sf.read(temp_audio_wav_path, frames=max_frames_ref, dtype='float32')
+                proc_audio_segment, _ = sf.read(vocal_mixture_wav_path, frames=max_frames_proc, dtype='float32')
                 
                 # Detect REAL lag between original and processed mixture using segments
-                _, lag_ms = calculate_audio_lag(proc_audio_segment, proc_sr, ref_audio_segment, ref_sr)
+                # (GCC-PHAT at 8 kHz mono, searching +/- 1 s; on the GPU when CUDA is up)
+                _, lag_ms = gcc_phat_lag(proc_audio_segment, proc_sr, ref_audio_segment, ref_sr, max_delay_seconds=1.0,
+                                         device="cuda" if cuda_is_available else None)
                 
-                print(f"{Fore.BLUE}Detected start lag: {lag_ms:.2f} ms{Style.RESET_ALL}")
+                log.info("Detected start lag: %.2f ms", lag_ms)
                 
                 # If lag is very large (e.g. > 1s), it's likely a misdetection or a huge error
                 # Usually AI lag is < 50ms.
                 if abs(lag_ms) > 1000:
-                    print(f"{Fore.YELLOW}Warning: Detected lag is suspiciously large. Limiting to 0.{Style.RESET_ALL}")
+                    log.warning("Warning: Detected lag is suspiciously large. Limiting to 0.")
+                    lag_ms = 0
+                elif abs(lag_ms) < SYNC_IGNORED_LAG_MS:
                     lag_ms = 0
-                
-                adj_temp_file = tempfile.NamedTemporaryFile(suffix=".wav", delete=False, dir=TEMP_DIR)
-                adj_temp_path = adj_temp_file.name
-                adj_temp_file.close()
-
-                # Build filter chain: 
-                # 1. adelay for the start lag
-                # 2. apad to fill the remaining duration at the end
-                # 3. atrim to ensure it's not LONGER than original
-                
-                filter_parts = []
-                if lag_ms > 0:
-                    filter_parts.append(f"adelay={int(lag_ms)}|{int(lag_ms)}")
-                
-                # Pad to original duration
-                filter_parts.append(f"apad=whole_dur={original_audio_duration}")
-                
-                # Hard trim at original duration
-                filter_parts.append(f"atrim=0:{original_audio_duration}")
-                
-                adjust_cmd = [
-                    FFMPEG_EXE, "-y", "-loglevel", "error",
-                    "-i", vocal_mixture_wav_path,
-                    "-af", ",".join(filter_parts),
-                    adj_temp_path
-                ]
-                
-                print(f"{Fore.MAGENTA}Applying sync filters: {','.join(filter_parts)}{Style.RESET_ALL}")
-                tracked_run(adjust_cmd, check=True)
-                
-                os.remove(vocal_mixture_wav_path)
-                os.rename(adj_temp_path, vocal_mixture_wav_path)
-                print(f"{Fore.GREEN}✔ Final synchronization complete.{Style.RESET_ALL}")
-                sync_end = time.time()
-                timings['sync'] = sync_end - sync_start
-                print(f"{Fore.GREEN}Synchronization check took {timings['sync']:.2f}s{Style.RESET_ALL}")
-                
             except Exception as e:
-                print(f"{Fore.RED}Error during final sync: {e}. Keeping original mixture.{Style.RESET_ALL}")
+                log.error("Error during final sync: %s. Keeping original mixture timing.", e)
+                lag_ms = 0
+
+            # Delay by the start lag, then pad/trim to the original length, in samples. The
+            # sample-exact filters run in the final ffmpeg call ahead of loudnorm, so no
+            # adjusted copy of the mixture is written
+            delay_frames = int(round(lag_ms * mixture_sample_rate / 1000)) if lag_ms > 0 else 0
+            target_frames = int(round(original_audio_duration * mixture_sample_rate))
+            fitted_frames = delay_frames + mixture_info.frames
+            if delay_frames > 0:
+                audio_filter_parts.append(f"adelay=delays={delay_frames}S:all=1")
+            if fitted_frames < target_frames:
+                audio_filter_parts.append(f"apad=whole_len={target_frames}")
+            elif fitted_frames > target_frames:
+                audio_filter_parts.append(f"atrim=end_sample={target_frames}")
+            if audio_filter_parts:
+                log.info("✔ Mixture will be delayed by %s and fitted to %s samples.", delay_frames, target_frames)
+            else:
+                log.info("✔ Mixture already matches the original length.")
+            sync_end = time.time()
+            timings['sync'] = sync_end - sync_start
+            log.info("Synchronization check took %.2fs", timings['sync'])
         else:
-            print(f"{Fore.YELLOW}Could not verify audio durations for final sync.{Style.RESET_ALL}")
-
-        # Step 5: Convert final mixture to ultimate output format
-        temp_combined_vocals_aac_file = tempfile.NamedTemporaryFile(suffix=".aac", delete=False, dir=TEMP_DIR)
-        final_mixture_aac_path = temp_combined_vocals_aac_file.name
-        temp_combined_vocals_aac_file.close()
+            log.warning("Could not verify audio durations for final sync.")
 
+        # Step 5: Loudness normalization, applied in the final ffmpeg call
         update_progress("Finalizing audio format", 95)
-        success = convert_audio_with_ffmpeg(vocal_mixture_wav_path, final_mixture_aac_path, normalize_audio=True)
-        if not success:
-            print(f"{Fore.RED}Error finalizing output audio format.{Style.RESET_ALL}")
-            return False, timings
-            
-        combined_vocals_aac_path = final_mixture_aac_path
+        audio_filter_parts.append(loudnorm_filter(vocal_mixture_wav_path))
+        # loudnorm works at 192 kHz internally; return to the mixture's rate
+        audio_filter_parts.append(f"aresample={mixture_sample_rate}")
+        audio_filter = ",".join(audio_filter_parts)
 
         output_folder = "nomusic"
         os.makedirs(output_folder, exist_ok=True)
 
-        # Load and validate configuration
-        settings = load_config('data/video.json')
-
-        video_settings = settings.get('video', {})
-        audio_settings = settings.get('audio', {})
-        output_settings = settings.get('output', {})
-
-        audio_codec = audio_settings.get('codec', 'aac')
-        audio_bitrate = audio_settings.get('bitrate')
+        audio_codec = settings.audio.codec
+        audio_bitrate = settings.audio.bitrate
         
         # Strip UUID from input filename if present (36 chars uuid + 1 char underscore)
         raw_name = os.path.basename(input_file)
@@ -532,7 +648,7 @@ def process_file(input_file, keep_temp=False, duration=None, progress_callback=N
         try:
             if is_audio_only:
                 # For audio-only files, just output the processed audio
-                print(f"\n{Fore.CYAN}5. Creating final audio file...{Style.RESET_ALL}")
+                log.info("\n5. Creating final audio file...")
                 
                 # Determine output format based on input or config
                 audio_output_format = "mp3"  # Default for audio-only
@@ -544,13 +660,14 @@ def process_file(input_file, keep_temp=False, duration=None, progress_callback=N
                     audio_output_format = "m4a"
                 
                 output_audio = os.path.join(output_folder, f"{base_filename}_vocals.{audio_output_format}")
-                print(f"{Fore.CYAN}Output audio file: {output_audio}{Style.RESET_ALL}")
+                log.info("Output audio file: %s", output_audio)
                 
                 final_ffmpeg_cmd = [
                     FFMPEG_EXE,
                     "-loglevel", "error",
                     "-y",
-                    "-i", combined_vocals_aac_path,
+                    "-i", vocal_mixture_wav_path,
+                    "-af", audio_filter,
                 ]
                 
                 if audio_output_format == "flac":
@@ -564,70 +681,78 @@ def process_file(input_file, keep_temp=False, duration=None, progress_callback=N
                 
                 final_ffmpeg_cmd.append(output_audio)
                 
-                print(f"\n{Fore.MAGENTA}Executing: {' '.join(final_ffmpeg_cmd)}")
                 update_progress("Finalizing output", 95)
-                tracked_run(final_ffmpeg_cmd, check=True)
+                _run_ffmpeg(final_ffmpeg_cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
                 update_progress("Completed", 100)
-                print(f"\n{Fore.GREEN}✔ Successfully created {output_audio}{Style.RESET_ALL}")
+                log.info("\n✔ Successfully created %s", output_audio)
                 
                 # Get final audio duration and compare
                 final_duration = get_audio_duration(output_audio)
                 if final_duration is not None and original_duration is not None:
                     duration_diff = abs(original_duration - final_duration)
-                    print(f"{Fore.BLUE}Final audio duration: {final_duration:.2f} seconds{Style.RESET_ALL}")
+                    log.info("Final audio duration: %.2f seconds", final_duration)
                     if duration_diff > 1:
-                        print(f"{Fore.YELLOW}Warning: Duration difference of {duration_diff:.2f} seconds between original and final audio.{Style.RESET_ALL}")
+                        log.warning("Warning: Duration difference of %.2f seconds between original and final audio.", duration_diff)
                     else:
-                        print(f"{Fore.GREEN}Audio duration is consistent.{Style.RESET_ALL}")
+                        log.info("Audio duration is consistent.")
                 
                 output_end = time.time()
                 timings['output'] = output_end - output_start
                 return output_audio, timings
             else:
                 # For video files, create new video with vocals
-                print(f"\n{Fore.CYAN}5. Creating final video...{Style.RESET_ALL}")
+                log.info("\n5. Creating final video...")
                 
-                video_codec = video_settings.get('codec', 'copy')
-                video_bitrate = video_settings.get('bitrate')
-                output_format = output_settings.get('format', 'mp4')
+                video_codec = settings.video.codec
+                video_bitrate = settings.video.bitrate
+                output_format = settings.output.format
 
                 output_video = os.path.join(output_folder, f"{base_filename}.{output_format}")
-                print(f"{Fore.CYAN}Output video file: {output_video}{Style.RESET_ALL}")
+                log.info("Output video file: %s", output_video)
 
                 # Override audio settings if we're skipping video encoding for specific containers
                 if skip_video_encoding:
-                    from modules.module_ffmpeg import get_video_codec
                     v_codec = get_video_codec(input_file).lower()
-                    print(f"{Fore.BLUE}Detected video codec: {v_codec}{Style.RESET_ALL}")
+                    log.info("Detected video codec: %s", v_codec)
                     
                     if v_codec in ['h264', 'hevc', 'h265']:
                         audio_codec = 'aac'
-                        print(f"{Fore.BLUE}Using AAC audio for H.264/H.265 compatibility.{Style.RESET_ALL}")
+                        log.info("Using AAC audio for H.264/H.265 compatibility.")
                     elif v_codec in ['vp9', 'av1', 'vp8']:
                         audio_codec = 'libopus'
-                        print(f"{Fore.BLUE}Using Opus audio for WebM/AV1 compatibility.{Style.RESET_ALL}")
+                        log.info("Using Opus audio for WebM/AV1 compatibility.")
                     else:
-                        print(f"{Fore.YELLOW}Unknown video codec '{v_codec}'. Using default '{audio_codec}'.{Style.RESET_ALL}")
+                        log.warning("Unknown video codec '%s'. Using default '%s'.", v_codec, audio_codec)
 
                 final_ffmpeg_cmd = [
                     FFMPEG_EXE,
                     "-loglevel", "error",
                     "-y",
                     "-i", input_file,
-                    "-i", combined_vocals_aac_path,
+                    "-i", vocal_mixture_wav_path,
                 ]
 
+                # Loudnorm runs on the mixture inside this same invocation
+                filter_graph = [f"[1:a]{audio_filter}[a]"]
+                video_map = "0:v:0"
+
                 # If skip_video_encoding is True OR settings specify copy, we copy the original video stream
                 if skip_video_encoding or video_codec == "copy":
                     final_ffmpeg_cmd.extend(["-c:v", "copy"])
                     # If we skip re-encoding, we should NOT apply scaling or pixel format conversion (filtering)
-                elif video_codec != "copy":
-                    # Force yuv420p for h264 compatibility
-                    final_ffmpeg_cmd.extend(["-vf", "scale=1920:1080,format=yuv420p", "-c:v", video_codec])
+                else:
+                    # Force yuv420p for h264 compatibility; scaling is opt-in (video.scale_to_1080)
+                    # and an identity scale is skipped (probe is cached)
+                    if settings.video.scale_to_1080 and get_video_resolution(input_file) != "1920x1080":
+                        filter_graph.append("[0:v:0]scale=1920:1080,format=yuv420p[v]")
+                    else:
+                        filter_graph.append("[0:v:0]format=yuv420p[v]")
+                    video_map = "[v]"
+                    final_ffmpeg_cmd.extend(["-c:v", video_codec])
                     if video_bitrate:
                         final_ffmpeg_cmd.extend(["-b:v", video_bitrate])
-                else:
-                    final_ffmpeg_cmd.extend(["-c:v", "copy"])
+
+                final_ffmpeg_cmd.extend(["-filter_complex", ";".join(filter_graph)])
                 
                 final_ffmpeg_cmd.extend([
                     "-c:a", audio_codec,
@@ -641,8 +766,8 @@ def process_file(input_file, keep_temp=False, duration=None, progress_callback=N
                     pass
 
                 final_ffmpeg_cmd.extend([
-                    "-map", "0:v:0",
-                    "-map", "1:a:0",
+                    "-map", video_map,
+                    "-map", "[a]",
                     "-shortest",
                 ])
                 
@@ -653,81 +778,51 @@ def process_file(input_file, keep_temp=False, duration=None, progress_callback=N
                     final_ffmpeg_cmd.extend(["-f", "matroska"])
                 
                 final_ffmpeg_cmd.append(output_video)
-                print(f"\n{Fore.MAGENTA}Executing: {' '.join(final_ffmpeg_cmd)}")
                 update_progress("Finalizing output", 95)
-                tracked_run(final_ffmpeg_cmd, check=True)
+                _run_ffmpeg(final_ffmpeg_cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
                 update_progress("Completed", 100)
-                print(f"\n{Fore.GREEN}✔ Successfully created {output_video}{Style.RESET_ALL}")
+                log.info("\n✔ Successfully created %s", output_video)
 
                 # Get final audio duration and compare
                 final_duration = get_audio_duration(output_video)
                 if final_duration is not None and original_duration is not None:
                     duration_diff = abs(original_duration - final_duration)
-                    print(f"{Fore.BLUE}Final video audio duration: {final_duration:.2f} seconds{Style.RESET_ALL}")
+                    log.info("Final video audio duration: %.2f seconds", final_duration)
                     if duration_diff > 1:
-                        print(f"{Fore.YELLOW}Warning: Duration difference of {duration_diff:.2f} seconds between original and final video.{Style.RESET_ALL}")
+                        log.warning("Warning: Duration difference of %.2f seconds between original and final video.", duration_diff)
                     else:
-                        print(f"{Fore.GREEN}Audio duration is consistent.{Style.RESET_ALL}")
+                        log.info("Audio duration is consistent.")
 
                 output_end = time.time()
                 timings['output'] = output_end - output_start
                 return output_video, timings
         except subprocess.CalledProcessError as e:
-            print(f"{Fore.RED}✖Error creating final output: {e}{Style.RESET_ALL}")
+            log.error("✖Error creating final output: %s", e)
+            if e.stderr:
+                log.error("FFmpeg error output: %s", e.stderr.decode('utf-8', errors='replace')[:500])
             return False, timings
 
     finally:
-        # FIX: Use tracked list for guaranteed cleanup of all temp files
+        # FIX: Everything registered on the cleanup stack is removed here (nothing when keep_temp)
         if not keep_temp:
-            print(f"\n{Fore.CYAN}--- Cleanup of temporary files ---")
-            for f_path in temp_files_to_cleanup:
-                if f_path and os.path.exists(f_path):
-                    try:
-                        os.remove(f_path)
-                        print(f"{Fore.BLUE}Removed temporary file: {f_path}{Style.RESET_ALL}")
-                    except OSError as e:
-                        print(f"{Fore.RED}Error removing temporary file {f_path}: {e}{Style.RESET_ALL}")
-
-            if temp_spleeter_segments_dir and os.path.exists(temp_spleeter_segments_dir):
-                try:
-                    shutil.rmtree(temp_spleeter_segments_dir)
-                    print(f"{Fore.BLUE}Removed temporary directory: {temp_spleeter_segments_dir}{Style.RESET_ALL}")
-                except OSError as e:
-                    print(f"{Fore.RED}Error removing temporary directory {temp_spleeter_segments_dir}: {e}{Style.RESET_ALL}")
-
-            if temp_demucs_segments_dir and os.path.exists(temp_demucs_segments_dir):
-                try:
-                    shutil.rmtree(temp_demucs_segments_dir)
-                    print(f"{Fore.BLUE}Removed temporary directory: {temp_demucs_segments_dir}{Style.RESET_ALL}")
-                except OSError as e:
-                    print(f"{Fore.RED}Error removing temporary directory {temp_demucs_segments_dir}: {e}{Style.RESET_ALL}")
-
-            # Cleanup the task-specific workspace
-            if os.path.exists(task_workspace):
-                try:
-                    shutil.rmtree(task_workspace)
-                    print(f"{Fore.BLUE}Removed task workspace: {task_workspace}{Style.RESET_ALL}")
-                except OSError as e:
-                    print(f"{Fore.RED}Error removing task workspace {task_workspace}: {e}{Style.RESET_ALL}")
+            log.info("\n--- Cleanup of temporary files ---")
+            cleanup.close()
         else:
-            print(f"\n{Fore.YELLOW}--- Skipping cleanup of temporary files ---")
-            print(f"Temporary audio WAV file: {temp_audio_wav_path}")
-            if combined_vocals_aac_path:
-                print(f"Combined vocals AAC file: {combined_vocals_aac_path}")
-            print(f"Aligned Spleeter vocals: {aligned_spleeter_vocals_path}")
-            print(f"Aligned Demucs vocals: {aligned_demucs_vocals_path}")
+            log.warning("\n--- Skipping cleanup of temporary files ---")
+            log.info("Task workspace: %s", task_workspace)
+            log.info("Temporary audio WAV file: %s", temp_audio_wav_path)
             if temp_spleeter_segments_dir:
-                print(f"Spleeter segments directory: {temp_spleeter_segments_dir}")
+                log.info("Spleeter segments directory: %s", temp_spleeter_segments_dir)
             if temp_demucs_segments_dir:
-                print(f"Demucs segments directory: {temp_demucs_segments_dir}")
-            print(f"Spleeter output path: {spleeter_out_path}")
-            print(f"Demucs output path: {demucs_base_out_path}")
+                log.info("Demucs segments directory: %s", temp_demucs_segments_dir)
+            log.info("Spleeter output path: %s", spleeter_out_path)
+            log.info("Demucs output path: %s", demucs_base_out_path)
         
         total_end = time.time()
         total_duration = total_end - total_start
-        print(f"\n{Back.GREEN}{Fore.BLACK}# PROCESSING COMPLETED IN {total_duration:.2f}s {Style.RESET_ALL}")
+        log.info("\n# PROCESSING COMPLETED IN %.2fs", total_duration)
         if timings:
             for m, t in timings.items():
-                print(f"{Fore.CYAN}- {m.capitalize()}: {t:.2f}s ({ (t/total_duration)*100:.1f}%){Style.RESET_ALL}")
+                log.info("- %s: %.2fs (%.1f%%)", m.capitalize(), t, (t/total_duration)*100)
         
-        print(f"{Fore.CYAN}--- Final shutdown ---")
\ No newline at end of file
+        log.info("--- Final shutdown ---")
\ No newline at end of file
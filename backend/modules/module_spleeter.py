@@ -15,27 +15,45 @@ KEY FUNCTIONS:
     - Returns (None, None) on failure
 
 SEGMENTATION STRATEGY:
-  - Files ≤10min: Process directly
-  - Files >10min: Split into 600s chunks, process sequentially, concatenate
+  - Files up to the segment length (600s, longer with enough free VRAM): Process directly
+  - Longer files: Split into segment-length FLAC chunks, separate them in SPLEETER_WORKERS concurrent
+    Spleeter runs (one model load per run, started while later chunks are still being
+    cut), concatenate in order
+  - Chunks overlap by SEGMENT_OVERLAP_SECONDS on each side; the overlap is cropped when
+    joining, so no boundary falls on a chunk edge
 
 OUTPUT:
   - Saves to spleeter_out/<basename>/vocals.wav
+  - Vocals are also copied into .spleeter_cache/ by input content (reruns skip inference),
+    capped at SPLEETER_CACHE_MAX_BYTES in total
   - Temp segments stored in _temp/ (caller responsible for cleanup)
 
 DEPENDENCIES:
-  - module_ffmpeg: get_audio_duration(), FFMPEG_EXE for splitting/concatenation
+  - module_ffmpeg: get_audio_duration()
+  - module_audio: iter_audio_segments() / concat_audio_segments() for in-process split and join
+  - module_log: Colored console logger shared with the other pipeline modules
+  - soundfile: Segment lengths, checked against the separated vocals on join
 
 MODEL:
   - Uses spleeter:2stems (vocals + accompaniment)
-  - Command: python -m spleeter separate -p spleeter:2stems -o <output> <input>
+  - Command: python -m spleeter separate -p spleeter:2stems -o <output> -d <longest input s> <input> [<input> ...]
 """
+import hashlib
+import math
 import os
+import shutil
 import subprocess
 import sys
 import tempfile
-from colorama import Fore, Style
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import soundfile as sf
 from tqdm import tqdm
-from module_ffmpeg import get_audio_duration, FFMPEG_EXE
+from tqdm.contrib.logging import logging_redirect_tqdm
+from module_ffmpeg import get_audio_duration
+from module_audio import can_overlap_segments, concat_audio_segments, iter_audio_segments
+from module_log import get_logger
+
+log = get_logger(__name__)
 
 # Use tracked subprocess to prevent zombie processes on app exit
 try:
@@ -43,6 +61,152 @@ try:
 except ImportError:
     tracked_run = subprocess.run
 
+# TensorFlow reserves all free VRAM by default; grow on demand instead so Demucs
+# can share the GPU when both models run at the same time
+SPLEETER_ENV = {**os.environ, "TF_FORCE_GPU_ALLOW_GROWTH": "true"}
+
+# Long files are split across this many concurrent Spleeter processes (each loads the
+# model once for its share of segments). Every process holds its own TensorFlow graph,
+# so keep it low on small machines; override with SPLEETER_WORKERS
+try:
+    SPLEETER_WORKERS = max(1, int(os.environ.get("SPLEETER_WORKERS", "2")))
+except ValueError:
+    SPLEETER_WORKERS = 2
+
+
+# Spleeter's own --duration default: it ignores everything of an input past this many seconds
+SPLEETER_DEFAULT_DURATION_SECONDS = 600
+
+# Split length when CUDA is unavailable or VRAM is small
+DEFAULT_SEGMENT_DURATION_SECONDS = 600
+
+# Each segment carries this much extra audio into its neighbours; the model's output at
+# a chunk edge is unreliable, so that context is cropped again when the vocals are joined
+SEGMENT_OVERLAP_SECONDS = 1.0
+
+# (minimum free VRAM per Spleeter run in GiB, segment seconds), largest first. TensorFlow's
+# activations grow with the input length, so the steps are more conservative than Demucs'
+VRAM_SEGMENT_TABLE = (
+    (16, 1800),
+    (10, 1200),
+)
+
+# Spleeter's pretrained model; part of every cache key, so another model never reuses entries
+SPLEETER_MODEL = "spleeter:2stems"
+
+# Separated vocals are kept per input content (hash of the WAV bytes), so a rerun on the
+# same audio, e.g. after a crash mid-job or with another model selection, skips inference.
+# Entries are ~100 MB per 10 minutes of audio, so the cap is on their total size: the
+# least recently used entries are removed until the cache fits in it again.
+SPLEETER_CACHE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '.spleeter_cache'))
+SPLEETER_CACHE_MAX_BYTES = 4 * 1024 ** 3
+HASH_BLOCK_BYTES = 1 << 20
+
+# Optional: xxhash digests several times faster than hashlib, so hashing never rivals inference
+try:
+    import xxhash
+
+    def _new_hash():
+        return xxhash.xxh3_128()
+except ImportError:
+    def _new_hash():
+        return hashlib.blake2b(digest_size=16)
+
+
+def _pick_segment_duration():
+    """
+    Chooses the split length from the free VRAM each concurrent Spleeter run can use.
+    Longer segments mean fewer splits, model loads and joins; without CUDA (or without
+    torch to ask) the safe 10-minute default is kept.
+    """
+    try:
+        from module_cuda import get_free_vram_bytes
+        free_bytes = get_free_vram_bytes()
+    except ImportError:
+        return DEFAULT_SEGMENT_DURATION_SECONDS
+    if free_bytes is None:
+        return DEFAULT_SEGMENT_DURATION_SECONDS
+
+    free_gib_per_worker = free_bytes / (1024 ** 3) / SPLEETER_WORKERS
+    for min_free_gib, seconds in VRAM_SEGMENT_TABLE:
+        if free_gib_per_worker >= min_free_gib:
+            return seconds
+    return DEFAULT_SEGMENT_DURATION_SECONDS
+
+
+def _content_key(path):
+    """Hash of the model name and the file's bytes."""
+    h = _new_hash()
+    h.update(SPLEETER_MODEL.encode())
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_BYTES), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _restore_cached_vocals(key, vocal_path):
+    """Places the cached vocals for key at vocal_path; False on a cache miss."""
+    cached_path = os.path.join(SPLEETER_CACHE_DIR, f"{key}.wav")
+    try:
+        # Touch for LRU pruning; raises on a miss
+        os.utime(cached_path)
+        os.makedirs(os.path.dirname(vocal_path), exist_ok=True)
+        # Always a private copy: Spleeter and ffmpeg overwrite their outputs in place, which
+        # would corrupt a cache entry sharing the inode. Unlinking first also detaches a
+        # target that an older run may still have linked to the cache
+        if os.path.exists(vocal_path):
+            os.remove(vocal_path)
+        shutil.copyfile(cached_path, vocal_path)
+        return True
+    except OSError:
+        return False
+
+
+def _store_cached_vocals(key, vocal_path):
+    """Adds vocal_path to the cache under key and prunes the oldest entries beyond SPLEETER_CACHE_MAX_BYTES."""
+    tmp_path = None
+    try:
+        os.makedirs(SPLEETER_CACHE_DIR, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=SPLEETER_CACHE_DIR, suffix='.tmp')
+        os.close(fd)
+        # Copied, not linked, so later writes to vocal_path can't reach the entry
+        shutil.copyfile(vocal_path, tmp_path)
+        os.replace(tmp_path, os.path.join(SPLEETER_CACHE_DIR, f"{key}.wav"))
+        tmp_path = None
+
+        entries = [(e.stat(), e.path) for e in os.scandir(SPLEETER_CACHE_DIR) if e.name.endswith('.wav')]
+        total_bytes = sum(st.st_size for st, _ in entries)
+        if total_bytes > SPLEETER_CACHE_MAX_BYTES:
+            entries.sort(key=lambda entry: entry[0].st_mtime)
+            for st, path in entries:
+                if total_bytes <= SPLEETER_CACHE_MAX_BYTES:
+                    break
+                os.remove(path)
+                total_bytes -= st.st_size
+    except OSError as e:
+        log.warning("Warning: Could not cache Spleeter vocals %s: %s", vocal_path, e)
+    finally:
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _run_spleeter(segment_paths, spleeter_out_path, max_input_seconds):
+    """
+    Separates the given files in one Spleeter process; raises CalledProcessError on failure.
+    Spleeter only separates the first --duration seconds of each input (600 by default), so
+    it is raised to cover max_input_seconds, the length of the longest input.
+    """
+    duration_seconds = max(SPLEETER_DEFAULT_DURATION_SECONDS, math.ceil(max_input_seconds) + 1)
+    spleeter_cmd = [sys.executable, "-m", "spleeter", "separate", "-p", SPLEETER_MODEL, "-o", spleeter_out_path,
+                    "-d", str(duration_seconds), *segment_paths]
+    tracked_run(spleeter_cmd, check=True, env=SPLEETER_ENV)
+
+
+def _vocals_path(spleeter_out_path, input_path):
+    """Where Spleeter writes the vocals stem for input_path."""
+    return os.path.join(spleeter_out_path, os.path.splitext(os.path.basename(input_path))[0], "vocals.wav")
+
+
 def separate_with_spleeter(temp_audio_wav_path, spleeter_out_path, base_audio_name_no_ext):
     """
     Separates vocals using Spleeter (2stems model) via subprocess.
@@ -51,7 +215,7 @@ def separate_with_spleeter(temp_audio_wav_path, spleeter_out_path, base_audio_na
     Returns:
         tuple: (path_to_final_vocal_wav, temp_segments_dir)
     """
-    print(f"{Fore.CYAN}2. Separating with Spleeter...{Style.RESET_ALL}")
+    log.info("2. Separating with Spleeter...")
     spleeter_vocal_wav_path = None
     temp_spleeter_segments_dir = None
     try:
@@ -59,87 +223,116 @@ def separate_with_spleeter(temp_audio_wav_path, spleeter_out_path, base_audio_na
 
         audio_duration = get_audio_duration(temp_audio_wav_path)
         if audio_duration is None:
-            print(f"{Fore.RED}Failed to get audio duration, cannot proceed with Spleeter separation.{Style.RESET_ALL}")
+            log.error("Failed to get audio duration, cannot proceed with Spleeter separation.")
             return None, None
 
-        SPLEETER_SEGMENT_DURATION_SECONDS = 600  # 10 minutes
+        segment_seconds = _pick_segment_duration()
 
-        if audio_duration > SPLEETER_SEGMENT_DURATION_SECONDS:
-            print(f"\n{Fore.YELLOW}Audio duration ({audio_duration:.2f}s) exceeds 10 minutes. Splitting audio for Spleeter...{Style.RESET_ALL}\n")
+        if audio_duration > segment_seconds:
+            log.warning("\nAudio duration (%.2fs) exceeds %ss. Splitting audio for Spleeter...\n", audio_duration, segment_seconds)
             # Ensure _temp exists
             os.makedirs("_temp", exist_ok=True)
             temp_spleeter_segments_dir = tempfile.mkdtemp(dir="_temp")
             spleeter_segment_vocal_paths = []
             split_audio_paths = []
 
-            current_start_time = 0
-            segment_index = 0
+            # Segments are dealt in consecutive groups to SPLEETER_WORKERS concurrent Spleeter runs;
+            # each run loads TensorFlow and the 2stems graph once for all of its segments. A group's
+            # run starts as soon as its last segment is cut, so the first runs load the model while
+            # the rest of the source is still being split (one front-to-back read, no ffmpeg).
+            # The work happens in the child processes, so plain threads are enough to drive them
+            expected_segments = math.ceil(audio_duration / segment_seconds)
+            workers = min(SPLEETER_WORKERS, expected_segments)
+            group_size = math.ceil(expected_segments / workers)
+            log.info("Processing %s segments with %s Spleeter process(es)", expected_segments, workers)
+            futures = []
+            group = []
+            # Keys of segments that miss the cache, stored once their runs finish
+            pending_keys = {}
+            # Source length of each segment (they are deleted once separated), checked on join
+            source_seconds = []
+            # Inputs only ffmpeg can decode are cut without overlap, so nothing is cropped on join
+            overlap_seconds = SEGMENT_OVERLAP_SECONDS if can_overlap_segments(temp_audio_wav_path) else 0.0
 
-            while current_start_time < audio_duration:
-                segment_duration = min(SPLEETER_SEGMENT_DURATION_SECONDS, audio_duration - current_start_time)
-                segment_filename = f"part_{segment_index:03d}.wav"
-                segment_output_path = os.path.join(temp_spleeter_segments_dir, segment_filename)
+            def run_group(segment_paths):
+                # A segment is no longer needed once separated; dropping it right away
+                # keeps the peak disk use of long files down
+                try:
+                    _run_spleeter(segment_paths, spleeter_out_path, segment_seconds + 2 * overlap_seconds)
+                finally:
+                    for path in segment_paths:
+                        try:
+                            os.remove(path)
+                        except OSError:
+                            pass
 
-                ffmpeg_split_cmd = [
-                    FFMPEG_EXE, "-y", 
-                    "-loglevel", "error",
-                    "-i", temp_audio_wav_path,
-                    "-ss", str(current_start_time),
-                    "-t", str(segment_duration),
-                    segment_output_path
-                ]
-                print(f"- Splitting audio: {segment_filename} from {current_start_time:.2f}s for {segment_duration:.2f}s...")
-                tracked_run(ffmpeg_split_cmd, check=True)
-                split_audio_paths.append(segment_output_path)
+            with ThreadPoolExecutor(max_workers=workers) as ex:
+                # FLAC segments: lossless and about half the bytes of WAV to write and read back
+                for segment_path in iter_audio_segments(temp_audio_wav_path, temp_spleeter_segments_dir,
+                                                        segment_seconds, flac=True,
+                                                        overlap_seconds=overlap_seconds):
+                    split_audio_paths.append(segment_path)
+                    source_seconds.append(sf.info(segment_path).duration)
+                    key = _content_key(segment_path)
+                    if _restore_cached_vocals(key, _vocals_path(spleeter_out_path, segment_path)):
+                        log.info("Reusing cached Spleeter vocals for %s", os.path.basename(segment_path))
+                        os.remove(segment_path)
+                        continue
+                    pending_keys[segment_path] = key
+                    group.append(segment_path)
+                    if len(group) == group_size:
+                        futures.append(ex.submit(run_group, group))
+                        group = []
+                if group:
+                    futures.append(ex.submit(run_group, group))
+                log.info("\n\N{check mark} Audio splitted into %s segments for Spleeter.", len(split_audio_paths))
+                with logging_redirect_tqdm(loggers=[log]):
+                    for future in tqdm(as_completed(futures), total=len(futures), desc="Spleeter runs", unit="run"):
+                        future.result()
 
-                current_start_time += segment_duration
-                segment_index += 1
-
-            print(f"\n{Fore.GREEN}\N{check mark} Audio splitted into {len(split_audio_paths)} segments for Spleeter.{Style.RESET_ALL}")
-
-            for i, segment_path in tqdm(enumerate(split_audio_paths), total=len(split_audio_paths), desc="Spleeter segments", unit="seg"):
+            for segment_path in split_audio_paths:
                 segment_base_name = os.path.splitext(os.path.basename(segment_path))[0]
-                
-                spleeter_cmd = [sys.executable, "-m", "spleeter", "separate", "-p", "spleeter:2stems", "-o", spleeter_out_path, segment_path]
-                tqdm.write(f"{Fore.MAGENTA}Processing segment {i+1}/{len(split_audio_paths)} with Spleeter{Style.RESET_ALL}")
-                tracked_run(spleeter_cmd, check=True, capture_output=True, text=True, encoding='utf-8', errors='replace')
-
-                segment_vocal_path = os.path.join(spleeter_out_path, segment_base_name, "vocals.wav")
+                segment_vocal_path = _vocals_path(spleeter_out_path, segment_path)
                 if os.path.exists(segment_vocal_path) and os.path.getsize(segment_vocal_path) > 0:
                     spleeter_segment_vocal_paths.append(segment_vocal_path)
+                    if segment_path in pending_keys:
+                        _store_cached_vocals(pending_keys[segment_path], segment_vocal_path)
                 else:
-                    print(f"{Fore.YELLOW}Warning: Spleeter vocals for segment {segment_base_name} not found or empty. Skipping.{Style.RESET_ALL}")
+                    # Dropping a segment would shift every later one (and the overlap crops)
+                    # out of sync with the source, so the whole Spleeter pass fails instead
+                    log.error("Error: Spleeter vocals for segment %s not found or empty.", segment_base_name)
+                    return None, temp_spleeter_segments_dir
 
             if not spleeter_segment_vocal_paths:
-                print(f"{Fore.RED}Error: No Spleeter vocal segments generated.{Style.RESET_ALL}")
+                log.error("Error: No Spleeter vocal segments generated.")
                 return None, temp_spleeter_segments_dir
             else:
-                concat_list_path = os.path.join(temp_spleeter_segments_dir, "concat_list.txt")
-                with open(concat_list_path, "w") as f:
-                    for p in spleeter_segment_vocal_paths:
-                        f.write(f"file '{os.path.abspath(p)}'\n")
-
+                # Segments share one format, so stream their samples into a single WAV in-process
                 final_spleeter_vocals_temp_path = os.path.join(temp_spleeter_segments_dir, "concatenated_spleeter_vocals.wav")
-                ffmpeg_concat_cmd = [FFMPEG_EXE, "-y", "-loglevel", "error", "-f", "concat", "-safe", "0", "-i", concat_list_path, "-c", "copy", final_spleeter_vocals_temp_path]
-                tracked_run(ffmpeg_concat_cmd, check=True)
+                concat_audio_segments(spleeter_segment_vocal_paths, final_spleeter_vocals_temp_path,
+                                      overlap_seconds=overlap_seconds, expected_seconds=source_seconds)
                 spleeter_vocal_wav_path = final_spleeter_vocals_temp_path
-                print(f"\n{Fore.GREEN}\N{check mark} All Spleeter vocal segments joined successfully.{Style.RESET_ALL}")
+                log.info("\n\N{check mark} All Spleeter vocal segments joined successfully.")
         else:
-            spleeter_cmd = [sys.executable, "-m", "spleeter", "separate", "-p", "spleeter:2stems", "-o", spleeter_out_path, temp_audio_wav_path]
-            print(f"{Fore.MAGENTA}Executing: {' '.join(spleeter_cmd)}{Style.RESET_ALL}\n")
-            tracked_run(spleeter_cmd, check=True, capture_output=True, text=True, encoding='utf-8', errors='replace')
             spleeter_vocal_wav_path = os.path.join(spleeter_out_path, base_audio_name_no_ext, "vocals.wav")
-            print(f"{Fore.GREEN}Spleeter separation complete.{Style.RESET_ALL}")
+            key = _content_key(temp_audio_wav_path)
+            if _restore_cached_vocals(key, spleeter_vocal_wav_path):
+                log.info("Reusing cached Spleeter vocals.")
+            else:
+                _run_spleeter([temp_audio_wav_path], spleeter_out_path, audio_duration)
+                if os.path.exists(spleeter_vocal_wav_path) and os.path.getsize(spleeter_vocal_wav_path) > 0:
+                    _store_cached_vocals(key, spleeter_vocal_wav_path)
+                log.info("Spleeter separation complete.")
         
         if spleeter_vocal_wav_path and not (os.path.exists(spleeter_vocal_wav_path) and os.path.getsize(spleeter_vocal_wav_path) > 0):
-            print(f"{Fore.YELLOW}Warning: Final Spleeter vocals not found or empty at {spleeter_vocal_wav_path}. This might be expected if Spleeter failed.{Style.RESET_ALL}")
+            log.warning("Warning: Final Spleeter vocals not found or empty at %s. This might be expected if Spleeter failed.", spleeter_vocal_wav_path)
             spleeter_vocal_wav_path = None
 
     except subprocess.CalledProcessError as e:
-        print(f"{Fore.RED}Error with spleeter separation: {e}{Style.RESET_ALL}")
+        log.error("Error with spleeter separation: %s", e)
         spleeter_vocal_wav_path = None
     except Exception as e:
-        print(f"{Fore.RED}An unexpected error occurred during Spleeter processing: {e}{Style.RESET_ALL}")
+        log.error("An unexpected error occurred during Spleeter processing: %s", e)
         spleeter_vocal_wav_path = None
     
     return spleeter_vocal_wav_path, temp_spleeter_segments_dir
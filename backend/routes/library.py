@@ -50,7 +50,8 @@ async def get_library():
         AUDIO_EXTENSIONS = {'.mp3', '.m4a', '.wav', '.flac', '.aac', '.ogg', '.wma', '.opus'}
         NOMUSIC_EXTENSIONS = AUDIO_EXTENSIONS | VIDEO_EXTENSIONS
 
-        # Scan download folder
+        # Collect new files from both folders first, so they can be probed in parallel
+        download_candidates = []
         download_folder = "download"
         if os.path.exists(download_folder):
             for root, dirs, files in os.walk(download_folder):
@@ -70,34 +71,13 @@ async def get_library():
                         if task_id in existing_ids:
                             continue
 
-                        metadata = get_file_metadata_cached(file_path)
-                        
-                        # Use file modification time as created_at for existing files
-                        try:
-                            file_mtime = os.path.getmtime(file_path)
-                        except OSError:
-                            file_mtime = time.time()
-
-                        library.insert(0, {
-                            "task_id": task_id,
-                            "status": "completed",
-                            "progress": 100,
-                            "current_step": "Finished",
-                            "result_files": [file_path],
-                            "metadata": metadata,
-                            "url": "",
-                            "filename": filename,
-                            "created_at": file_mtime
-                        })
-
-        # Scan nomusic folder
+                        download_candidates.append((file_path, filename, task_id))
+
+        nomusic_candidates = []
         nomusic_folder = "nomusic"
-        nomusic_added = 0
+        nomusic_total = 0
+        nomusic_skipped_existing = 0
         if os.path.exists(nomusic_folder):
-            nomusic_total = 0
-            nomusic_found = 0
-            nomusic_skipped_existing = 0
-
             for root, dirs, files in os.walk(nomusic_folder):
                 for filename in files:
                     _, ext = os.path.splitext(filename)
@@ -117,29 +97,37 @@ async def get_library():
                         nomusic_skipped_existing += 1
                         continue
 
-                    nomusic_found += 1
-                    nomusic_added += 1
-
-                    metadata = get_file_metadata_cached(file_path)
-                    
-                    # Use file modification time as created_at for existing files
-                    try:
-                        file_mtime = os.path.getmtime(file_path)
-                    except OSError:
-                        file_mtime = time.time()
-
-                    library.insert(0, {
-                        "task_id": task_id,
-                        "status": "completed",
-                        "progress": 100,
-                        "current_step": "Finished",
-                        "result_files": [file_path],
-                        "metadata": metadata,
-                        "url": "",
-                        "filename": filename,
-                        "created_at": file_mtime
-                    })
-            print(f"{Fore.CYAN}[Library Scan] Nomusic: {nomusic_total} total, {nomusic_found} new, {nomusic_skipped_existing} skipped{Style.RESET_ALL}")
+                    nomusic_candidates.append((file_path, filename, task_id))
+
+        # Warm the ffprobe cache concurrently; the metadata lookups below then hit it
+        if download_candidates or nomusic_candidates:
+            from modules.module_ffmpeg import probe_many
+            probe_many([c[0] for c in download_candidates + nomusic_candidates])
+
+        for file_path, filename, task_id in download_candidates + nomusic_candidates:
+            metadata = get_file_metadata_cached(file_path)
+            
+            # Use file modification time as created_at for existing files
+            try:
+                file_mtime = os.path.getmtime(file_path)
+            except OSError:
+                file_mtime = time.time()
+
+            library.insert(0, {
+                "task_id": task_id,
+                "status": "completed",
+                "progress": 100,
+                "current_step": "Finished",
+                "result_files": [file_path],
+                "metadata": metadata,
+                "url": "",
+                "filename": filename,
+                "created_at": file_mtime
+            })
+
+        nomusic_added = len(nomusic_candidates)
+        if os.path.exists(nomusic_folder):
+            print(f"{Fore.CYAN}[Library Scan] Nomusic: {nomusic_total} total, {nomusic_added} new, {nomusic_skipped_existing} skipped{Style.RESET_ALL}")
 
         # Repair existing entries with 'N/A' metadata
         library_changed = False
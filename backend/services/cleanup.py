@@ -4,6 +4,7 @@ Periodic background cleanup tasks and scheduler.
 import os
 import time
 import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from colorama import Fore, Style
 
 from core.constants import TASKS_FILE
@@ -14,6 +15,18 @@ from services.persistence import save_metadata_cache
 
 # ============== Cleanup Functions ==============
 
+# Old temp files are deleted by this many threads; unlinks are disk-latency-bound and
+# release the GIL, so independent trees (segment WAVs, uploads) are removed side by side
+CLEANUP_WORKERS = 4
+
+
+def _remove_all(paths):
+    """Removes paths concurrently with safe_remove; returns how many were removed."""
+    if not paths:
+        return 0
+    with ThreadPoolExecutor(max_workers=min(CLEANUP_WORKERS, len(paths))) as ex:
+        return sum(ex.map(safe_remove, paths))
+
 def cleanup_metadata_cache():
     """Remove cache entries for files that no longer exist."""
     global metadata_cache
@@ -37,27 +50,28 @@ def cleanup_temp_files():
     temp_dirs = ['_temp', 'uploads', 'spleeter_out', 'demucs_out', '_processing_intermediates']
     max_age_seconds = 24 * 60 * 60  # 24 hours
     current_time = time.time()
-    cleaned_count = 0
 
     print(f"\n{Fore.CYAN}=== Cleaning up temporary files ==={Style.RESET_ALL}")
 
     # Cleanup incomplete downloads
     download_dir = os.path.join(os.path.dirname(__file__), '..', 'download')
     if os.path.exists(download_dir):
-        orphan_count = 0
+        orphans = []
         for f in os.listdir(download_dir):
             if f.endswith(('.part', '.ytdl', '.part-Frag')) or '.part-Frag' in f:
                 f_path = os.path.join(download_dir, f)
                 try:
                     file_age = current_time - os.path.getmtime(f_path)
                     if file_age > 3600:
-                        if safe_remove(f_path):
-                            orphan_count += 1
+                        orphans.append(f_path)
                 except (OSError, IOError):
                     pass
+        orphan_count = _remove_all(orphans)
         if orphan_count > 0:
             print(f"  Cleaned up {orphan_count} orphaned partial downloads")
 
+    # Collect first, then delete everything in one parallel pass
+    old_files = []
     for dir_name in temp_dirs:
         dir_path = os.path.join(os.path.dirname(__file__), '..', dir_name)
         if not os.path.exists(dir_path):
@@ -70,12 +84,12 @@ def cleanup_temp_files():
                     try:
                         file_age = current_time - os.path.getmtime(file_path)
                         if file_age > max_age_seconds:
-                            if safe_remove(file_path):
-                                cleaned_count += 1
+                            old_files.append(file_path)
                     except (OSError, IOError):
                         pass
         except (OSError, IOError):
             pass
+    cleaned_count = _remove_all(old_files)
 
     if cleaned_count > 0:
         print(f"{Fore.GREEN}✓ Cleaned {cleaned_count} old files{Style.RESET_ALL}\n")
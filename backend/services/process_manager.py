@@ -10,6 +10,9 @@ USAGE:
     # Instead of subprocess.run(cmd), use:
     result = tracked_run(cmd, ...)
 
+    # Long-lived children talked to over pipes:
+    proc = tracked_popen(cmd, stdin=subprocess.PIPE, ...)
+
     # On shutdown:
     cleanup_all_children()
 """
@@ -45,6 +48,29 @@ def _log_fail(message: str):
         print(f"Failed to write to log.txt: {e}", file=sys.stderr)
 
 
+def _wrap_for_job(cmd):
+    """Prefixes cmd with SpawnWithJob.exe when Windows job objects are available."""
+    if not _USE_JOB_OBJECTS:
+        return cmd
+    # Resolve the actual executable to ensure SpawnWithJob can find it
+    import shutil
+    executable = None
+    if isinstance(cmd, list) and cmd:
+        executable = cmd[0]
+    elif isinstance(cmd, str):
+        # Very basic string split to find the executable part
+        executable = cmd.split()[0].strip('"')
+
+    if executable and shutil.which(executable):
+        # Command exists in PATH or is absolute, we can wrap it
+        if isinstance(cmd, list):
+            return [_SPAWN_EXE] + list(cmd)
+        return f'"{_SPAWN_EXE}" {cmd}'
+    # Command not found in PATH, let normal subprocess handle it
+    # (it will throw FileNotFoundError with a better message)
+    return cmd
+
+
 def tracked_run(cmd, **kwargs):
     """
     Drop-in replacement for subprocess.run() that tracks the child process.
@@ -64,28 +90,7 @@ def tracked_run(cmd, **kwargs):
 
     original_cmd = cmd
     # Use SpawnWithJob.exe if available on Windows to prevent zombies
-    if _USE_JOB_OBJECTS:
-        # Resolve the actual executable to ensure SpawnWithJob can find it
-        import shutil
-        executable = None
-        if isinstance(cmd, list) and cmd:
-            executable = cmd[0]
-        elif isinstance(cmd, str):
-            # Very basic string split to find the executable part
-            executable = cmd.split()[0].strip('"')
-            
-        if executable:
-            resolved_path = shutil.which(executable)
-            if resolved_path:
-                # Command exists in PATH or is absolute, we can wrap it
-                if isinstance(cmd, list):
-                    cmd = [_SPAWN_EXE] + list(cmd)
-                elif isinstance(cmd, str):
-                    cmd = f'"{_SPAWN_EXE}" {cmd}'
-            else:
-                # Command not found in PATH, let normal subprocess handle it 
-                # (it will throw FileNotFoundError with a better message)
-                pass
+    cmd = _wrap_for_job(cmd)
 
     # We need to use Popen to track the PID, then wait for completion
     # Extract timeout from kwargs since Popen doesn't support it directly
@@ -137,6 +142,21 @@ def tracked_run(cmd, **kwargs):
     return result
 
 
+def tracked_popen(cmd, **kwargs):
+    """
+    Drop-in replacement for subprocess.Popen() for long-lived children (e.g. worker
+    processes talked to over pipes). The process is tracked like tracked_run's and
+    terminated on app shutdown; the caller owns its lifetime otherwise.
+    """
+    if _shutdown_initiated:
+        raise RuntimeError("Cannot start new processes during shutdown")
+
+    proc = subprocess.Popen(_wrap_for_job(cmd), **kwargs)
+    with _lock:
+        _active_processes[proc.pid] = proc
+    return proc
+
+
 def _kill_process(proc: subprocess.Popen):
     """Forcefully kill a process and all its children."""
     try: